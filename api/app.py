@@ -0,0 +1,248 @@
+"""
+HTTP inference service for the Insurance Document Analyzer.
+
+Models are loaded once at startup and shared by all requests. Query
+encoding for concurrent clients is micro-batched, ingestion runs as
+background jobs, and per-endpoint latency histograms are exposed at
+/metrics (Prometheus text) and /stats (JSON).
+
+    uvicorn api.app:app --host 0.0.0.0 --port 8000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import uuid
+import threading
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from main import InsuranceDocumentAnalyzer
+from modules.batching import MicroBatcher
+from modules.metrics import Histogram
+from modules.utils import ensure_dir, PipelineProgress
+
+CONFIG_PATH = os.environ.get(
+    'ANALYZER_CONFIG',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.yaml')
+)
+
+class QueryRequest(BaseModel):
+    query: str
+
+class ServiceState:
+    """Shared models, indices, batchers, jobs and metrics for the service."""
+
+    def __init__(self, config_path: str):
+        self.analyzer = InsuranceDocumentAnalyzer(config_path)
+        self.config = self.analyzer.config
+        service_config = self.config.get('service', {})
+
+        # Searches share the indices; ingestion takes them exclusively, but
+        # only to add already encoded documents and save (see index_document)
+        self.index_lock = self.analyzer.index_lock
+        with self.index_lock.write():
+            try:
+                self.analyzer.text_retriever.load_index()
+                self.analyzer.image_retriever.load_index()
+            except Exception as e:
+                print(f"No indices loaded yet: {e}")
+
+        window = service_config.get('batch_window_ms', 10)
+        batch_size = service_config.get('max_batch_size', 32)
+        self.text_batcher = MicroBatcher(
+            lambda queries: list(self.analyzer.text_retriever.encode_queries(queries)),
+            max_batch_size=batch_size, max_wait_ms=window, name='text_encode'
+        )
+        self.image_batcher = MicroBatcher(
+            lambda queries: list(self.analyzer.image_retriever.encode_queries(queries)),
+            max_batch_size=batch_size, max_wait_ms=window, name='clip_text_encode'
+        )
+        self.analyzer.text_retriever.query_encoder = self.text_batcher.submit
+        self.analyzer.image_retriever.query_encoder = self.image_batcher.submit
+
+        # Warm up both encoders so the first request does not pay for it
+        self.text_batcher.submit("warm up")
+        self.image_batcher.submit("warm up")
+
+        self.ingest_executor = ThreadPoolExecutor(
+            max_workers=service_config.get('ingest_workers', 1)
+        )
+        self.jobs: Dict[str, Dict] = {}
+        self.jobs_lock = threading.Lock()
+        self.job_ttl = service_config.get('job_ttl_seconds', 3600)
+        self.max_jobs = service_config.get('max_jobs', 1000)
+
+        self.latency: Dict[str, Histogram] = {}
+        self.latency_lock = threading.Lock()
+
+    def observe(self, endpoint: str, seconds: float):
+        with self.latency_lock:
+            if endpoint not in self.latency:
+                self.latency[endpoint] = Histogram('http_request_duration_seconds')
+            histogram = self.latency[endpoint]
+        histogram.observe(seconds)
+
+    def latency_snapshot(self) -> Dict[str, Histogram]:
+        """Copy of the per-endpoint histograms, safe to iterate while requests arrive."""
+        with self.latency_lock:
+            return dict(self.latency)
+
+    def update_job(self, job_id: str, **updates):
+        with self.jobs_lock:
+            self.jobs[job_id].update(updates)
+
+    def add_job(self, job_id: str, filename: str):
+        """Track a new ingest job, first forgetting finished jobs past the TTL or cap."""
+        now = datetime.now()
+        with self.jobs_lock:
+            finished = sorted(
+                (job['finished'], old_id) for old_id, job in self.jobs.items() if 'finished' in job
+            )
+            excess = len(self.jobs) + 1 - self.max_jobs
+            for position, (finished_at, old_id) in enumerate(finished):
+                expired = (now - datetime.fromisoformat(finished_at)).total_seconds() > self.job_ttl
+                if expired or position < excess:
+                    del self.jobs[old_id]
+            self.jobs[job_id] = {
+                'job_id': job_id,
+                'filename': filename,
+                'status': 'queued',
+                'created': now.isoformat()
+            }
+
+    def run_ingest(self, job_id: str, pdf_path: str):
+        self.update_job(job_id, status='preprocessing', started=datetime.now().isoformat())
+        progress = PipelineProgress()
+
+        def on_event(event):
+            progress.update(event)
+            if event['stage'] in progress.stages:
+                self.update_job(
+                    job_id, stage=event['stage'], pages=progress.total,
+                    progress=round(progress.fraction, 3),
+                    pages_per_second=round(progress.pages_per_second(event['stage']), 2)
+                )
+
+        try:
+            doc_metadata = self.analyzer.preprocessor.process_pdf(
+                pdf_path, dpi=150, event_callback=on_event
+            )
+            self.update_job(job_id, status='indexing', doc_id=doc_metadata.doc_id,
+                            pages=doc_metadata.pages)
+
+            self.analyzer.index_document(doc_metadata, event_callback=on_event)
+
+            self.update_job(job_id, status='completed', finished=datetime.now().isoformat(),
+                            duplicate_of=doc_metadata.duplicate_of)
+        except Exception as e:
+            self.update_job(job_id, status='failed', error=str(e),
+                            finished=datetime.now().isoformat())
+
+state: Optional[ServiceState] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global state
+    state = ServiceState(CONFIG_PATH)
+    yield
+    state.ingest_executor.shutdown(wait=True)
+    state.analyzer.result_log.close()
+
+app = FastAPI(title="Insurance Document Analyzer", lifespan=lifespan)
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get('route')
+    endpoint = route.path if route is not None else request.url.path
+    if state is not None:
+        state.observe(endpoint, time.perf_counter() - start)
+    return response
+
+def save_upload(upload: UploadFile) -> str:
+    """Store an uploaded PDF under a unique name in the raw PDF directory."""
+    raw_dir = state.config['paths']['raw_pdfs']
+    ensure_dir(raw_dir)
+    pdf_path = os.path.join(raw_dir, f"{uuid.uuid4().hex[:8]}_{os.path.basename(upload.filename)}")
+    with open(pdf_path, 'wb') as f:
+        f.write(upload.file.read())
+    return pdf_path
+
+@app.get("/health")
+def health():
+    return {'status': 'ok', **state.analyzer.index_stats()}
+
+@app.post("/classify")
+def classify(file: UploadFile = File(...)):
+    pdf_path = save_upload(file)
+    return state.analyzer.classify_document(pdf_path)
+
+@app.post("/ingest", status_code=202)
+def ingest(file: UploadFile = File(...)):
+    pdf_path = save_upload(file)
+    job_id = uuid.uuid4().hex
+    state.add_job(job_id, file.filename)
+    state.ingest_executor.submit(state.run_ingest, job_id, pdf_path)
+    return {'job_id': job_id, 'status': 'queued'}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    with state.jobs_lock:
+        job = state.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown job")
+        return dict(job)
+
+@app.post("/query")
+def query(request: QueryRequest):
+    with state.index_lock.read():
+        # Local indices, or every shard's when sharding is on
+        if not state.analyzer.index_stats()['text_chunks']:
+            raise HTTPException(status_code=409, detail="No documents have been ingested yet")
+        # Loaded at startup and kept current by ingestion, both under the write lock
+        return state.analyzer.query_document(request.query, load_indices=False)
+
+@app.get("/results")
+def results(doc_id: Optional[str] = None, query: Optional[str] = None,
+            kind: Optional[str] = None, limit: int = 20):
+    return state.analyzer.result_history(doc_id=doc_id, query=query, kind=kind, limit=limit)
+
+@app.get("/stats")
+def stats():
+    return {
+        'latency': {endpoint: h.snapshot() for endpoint, h in state.latency_snapshot().items()},
+        'pipeline': state.analyzer.metrics.to_dict(),
+        'batching': {
+            batcher.batch_sizes.name: {
+                'sizes': batcher.batch_sizes.snapshot(),
+                'latency': batcher.batch_latency.snapshot()
+            }
+            for batcher in (state.text_batcher, state.image_batcher)
+        },
+        'llm': state.analyzer.llm.stats() if state.analyzer.llm is not None else None
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    lines = ['# TYPE http_request_duration_seconds histogram']
+    for endpoint, histogram in state.latency_snapshot().items():
+        lines.extend(histogram.to_prometheus({'endpoint': endpoint}))
+    for batcher in (state.text_batcher, state.image_batcher):
+        for histogram in (batcher.batch_sizes, batcher.batch_latency):
+            lines.append(f'# TYPE {histogram.name} histogram')
+            lines.extend(histogram.to_prometheus())
+    if state.analyzer.llm is not None:
+        histogram = state.analyzer.llm.tokens_per_second
+        lines.append(f'# TYPE {histogram.name} histogram')
+        lines.extend(histogram.to_prometheus())
+    lines.extend(state.analyzer.metrics.to_prometheus())
+    return '\n'.join(lines) + '\n'
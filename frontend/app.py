@@ -4,7 +4,11 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from main import InsuranceDocumentAnalyzer
+from modules.job_queue import JobQueue
+from modules.document_store import DocumentStore
+from modules.utils import PipelineProgress, STAGE_LABELS
 import json
+import time
 from datetime import datetime
 import pandas as pd
 import uuid
@@ -252,8 +256,8 @@ DOCUMENT_TYPES = {
 
 # ==================== SESSION STATE ====================
 def initialize_session():
-    if 'documents' not in st.session_state:
-        st.session_state.documents = []
+    if 'library_page' not in st.session_state:
+        st.session_state.library_page = 0
     if 'selected_doc_id' not in st.session_state:
         st.session_state.selected_doc_id = None
     if 'analyzer' not in st.session_state:
@@ -264,70 +268,71 @@ def initialize_session():
 initialize_session()
 
 # ==================== DOCUMENT MANAGER ====================
+# Documents, classifications and query history live in a SQLite library
+# (library.db_path), so they survive browser sessions and server restarts.
 class DocumentManager:
     @staticmethod
     def add_document(filename, file_path, file_size):
         doc_id = str(uuid.uuid4())[:12]
-        document = {
-            'doc_id': doc_id,
-            'filename': filename,
-            'file_path': file_path,
-            'file_size': file_size,
-            'upload_time': datetime.now(),
-            'status': 'Uploaded',
-            'classification': None,
-            'processed': False,
-            'extraction_results': {},
-            'queries': []
-        }
-        st.session_state.documents.append(document)
+        document_store.add_document(doc_id, filename, file_path, file_size)
         return doc_id
     
     @staticmethod
     def get_document(doc_id):
-        for doc in st.session_state.documents:
-            if doc['doc_id'] == doc_id:
-                return doc
-        return None
+        return document_store.get_document(doc_id)
     
     @staticmethod
     def update_document(doc_id, updates):
-        for doc in st.session_state.documents:
-            if doc['doc_id'] == doc_id:
-                doc.update(updates)
-                break
+        document_store.update_document(doc_id, updates)
     
     @staticmethod
-    def get_all_documents():
-        return sorted(st.session_state.documents, key=lambda x: x['upload_time'], reverse=True)
+    def get_documents_page(page, page_size):
+        return document_store.list_documents(limit=page_size, offset=page * page_size)
     
     @staticmethod
     def delete_document(doc_id):
-        st.session_state.documents = [d for d in st.session_state.documents if d['doc_id'] != doc_id]
+        document_store.delete_document(doc_id)
+    
+    @staticmethod
+    def add_query(doc_id, query, result):
+        document_store.add_query(doc_id, query, result)
+    
+    @staticmethod
+    def get_last_result(doc_id):
+        queries = document_store.get_queries(doc_id, limit=1)
+        return queries[0]['result'] if queries else None
     
     @staticmethod
     def get_status_summary():
-        docs = st.session_state.documents
-        return {
-            'total': len(docs),
-            'uploaded': sum(1 for d in docs if d['status'] == 'Uploaded'),
-            'classified': sum(1 for d in docs if d['classification']),
-            'processed': sum(1 for d in docs if d['processed']),
-            'queried': sum(1 for d in docs if d['queries'])
-        }
+        return document_store.status_summary()
 
 # ==================== INITIALIZE AI ====================
+@st.cache_resource(show_spinner="🚀 Initializing AI System...")
+def get_analyzer(config_path):
+    """One analyzer (models + indices) per server process, shared by all sessions."""
+    analyzer = InsuranceDocumentAnalyzer(config_path)
+    if os.path.exists(os.path.join(analyzer.config['paths']['embeddings'], 'text_index.faiss')):
+        analyzer.load_indices()
+    return analyzer
+
 if st.session_state.analyzer is None:
-    with st.spinner("🚀 Initializing AI System..."):
-        try:
-            config_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                'config.yaml'
-            )
-            st.session_state.analyzer = InsuranceDocumentAnalyzer(config_path)
-        except Exception as e:
-            st.error(f"❌ Initialization Error: {e}")
-            st.stop()
+    try:
+        config_path = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'config.yaml'
+        )
+        st.session_state.analyzer = get_analyzer(config_path)
+    except Exception as e:
+        st.error(f"❌ Initialization Error: {e}")
+        st.stop()
+
+# ==================== LIBRARY & INGEST QUEUE ====================
+# Processing runs in worker processes (scripts/ingest_workers.py); the UI
+# only enqueues jobs and polls their progress.
+library_config = st.session_state.analyzer.config['library']
+document_store = DocumentStore(library_config['db_path'])
+job_queue = JobQueue(st.session_state.analyzer.config['jobs']['db_path'])
+poll_job = False
 
 # ==================== MAIN HEADER ====================
 st.markdown("""
@@ -367,6 +372,8 @@ with st.sidebar:
                         uploaded_file.size
                     )
                     st.session_state.selected_doc_id = doc_id
+                    st.session_state.last_result = None
+                    st.session_state.library_page = 0
                     st.success("✅ Added to library!")
                     st.rerun()
     
@@ -387,7 +394,10 @@ with st.sidebar:
     st.markdown("---")
     st.subheader("📁 Your Documents")
     
-    documents = DocumentManager.get_all_documents()
+    page_size = library_config.get('page_size', 20)
+    page_count = max(1, -(-summary['total'] // page_size))
+    st.session_state.library_page = min(st.session_state.library_page, page_count - 1)
+    documents = DocumentManager.get_documents_page(st.session_state.library_page, page_size)
     
     if documents:
         for doc in documents:
@@ -414,6 +424,7 @@ with st.sidebar:
                     type=btn_style
                 ):
                     st.session_state.selected_doc_id = doc['doc_id']
+                    st.session_state.last_result = DocumentManager.get_last_result(doc['doc_id'])
                     st.rerun()
             
             with col2:
@@ -421,6 +432,21 @@ with st.sidebar:
                     DocumentManager.delete_document(doc['doc_id'])
                     if st.session_state.selected_doc_id == doc['doc_id']:
                         st.session_state.selected_doc_id = None
+                        st.session_state.last_result = None
+                    st.rerun()
+        
+        if page_count > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if st.button("◀", disabled=st.session_state.library_page == 0, use_container_width=True):
+                    st.session_state.library_page -= 1
+                    st.rerun()
+            with col2:
+                st.caption(f"Page {st.session_state.library_page + 1} of {page_count}")
+            with col3:
+                if st.button("▶", disabled=st.session_state.library_page >= page_count - 1,
+                             use_container_width=True):
+                    st.session_state.library_page += 1
                     st.rerun()
     else:
         st.info("No documents yet")
@@ -431,6 +457,10 @@ if not st.session_state.selected_doc_id:
     st.stop()
 
 selected_doc = DocumentManager.get_document(st.session_state.selected_doc_id)
+if selected_doc is None:
+    st.session_state.selected_doc_id = None
+    st.info("👈 Select or upload a document from the sidebar to begin")
+    st.stop()
 
 # ==================== DOCUMENT HEADER ====================
 col1, col2, col3 = st.columns([2, 1, 1])
@@ -490,8 +520,10 @@ with tab1:
         
         if st.button("🔄 Re-classify", use_container_width=True):
             st.session_state.last_result = None
-            selected_doc['classification'] = None
-            selected_doc['status'] = 'Uploaded'
+            DocumentManager.update_document(selected_doc['doc_id'], {
+                'classification': None,
+                'status': 'Uploaded'
+            })
             st.rerun()
     
     else:
@@ -502,9 +534,18 @@ with tab1:
         """, unsafe_allow_html=True)
         
         if st.button("🔍 Classify Document Now", type="primary", use_container_width=True):
+            progress_bar = st.progress(0.0, text="📄 Opening PDF...")
+            progress = PipelineProgress(('rendered', 'ocred'))
+            
+            def show_progress(event):
+                progress.update(event)
+                progress_bar.progress(min(progress.fraction, 1.0), text=f"📄 {progress.describe()}")
+            
             with st.spinner("🔄 Analyzing document..."):
                 try:
-                    classification = st.session_state.analyzer.classify_document(selected_doc['file_path'])
+                    classification = st.session_state.analyzer.classify_document(
+                        selected_doc['file_path'], event_callback=show_progress
+                    )
                     
                     DocumentManager.update_document(selected_doc['doc_id'], {
                         'classification': classification,
@@ -534,52 +575,48 @@ with tab2:
         </div>
         """, unsafe_allow_html=True)
         
-        if st.button("⚙️ Process Document", type="primary", use_container_width=True):
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+        job = job_queue.get(selected_doc['job_id']) if selected_doc.get('job_id') else None
+        
+        if job and job['status'] == 'indexed':
+            # The ingest writer has saved new indices; pick them up
+            st.session_state.analyzer.load_indices()
+            DocumentManager.update_document(selected_doc['doc_id'], {
+                'processed': True,
+                'status': 'Processed'
+            })
+            st.rerun()
+        
+        elif job and job['status'] == 'failed':
+            st.error(f"❌ Error: {job['error']}")
+        
+        elif job:
+            if job['status'] == 'queued':
+                st.info("⏳ Waiting for an ingest worker (python scripts/ingest_workers.py)")
             
-            try:
-                status_text.text("📄 Extracting text...")
-                progress_bar.progress(25)
-                
-                doc_metadata = st.session_state.analyzer.preprocessor.process_pdf(
-                    selected_doc['file_path'], dpi=150
+            pages_done, pages_total = job['pages_done'], job['pages_total']
+            if job['status'] in ('embedded', 'indexing'):
+                label = "💾 Updating indices..."
+                fraction = 1.0
+            elif job['stage'] and pages_total:
+                label = (
+                    f"📄 {STAGE_LABELS.get(job['stage'], job['stage'])}: "
+                    f"{pages_done}/{pages_total} pages ({job['pages_per_second']:.2f} pages/s)"
                 )
-                
-                status_text.text("🔤 Creating text embeddings...")
-                progress_bar.progress(50)
-                
-                st.session_state.analyzer.text_retriever.add_documents(doc_metadata.to_dict())
-                
-                status_text.text("🖼️ Creating image embeddings...")
-                progress_bar.progress(75)
-                
-                st.session_state.analyzer.image_retriever.add_documents(doc_metadata.to_dict())
-                
-                status_text.text("💾 Saving indices...")
-                progress_bar.progress(90)
-                
-                st.session_state.analyzer.text_retriever.save_index()
-                st.session_state.analyzer.image_retriever.save_index()
-                
-                DocumentManager.update_document(selected_doc['doc_id'], {
-                    'processed': True,
-                    'status': 'Processed'
-                })
-                
-                progress_bar.progress(100)
-                status_text.empty()
-                
-                st.markdown(f"""
-                <div class="success-banner">
-                ✅ Successfully processed {doc_metadata.pages} pages!
-                </div>
-                """, unsafe_allow_html=True)
-                
+                fraction = min(job['progress'] or 0.0, 1.0)
+            else:
+                label = "📄 Opening PDF..."
+                fraction = 0.0
+            st.progress(fraction, text=label)
+            poll_job = True
+        
+        if not job or job['status'] == 'failed':
+            if st.button("⚙️ Process Document", type="primary", use_container_width=True):
+                job_id = job_queue.enqueue(
+                    os.path.abspath(selected_doc['file_path']),
+                    selected_doc['filename']
+                )
+                DocumentManager.update_document(selected_doc['doc_id'], {'job_id': job_id})
                 st.rerun()
-                
-            except Exception as e:
-                st.error(f"❌ Error: {e}")
 
 # ==================== TAB 3: QUERY ====================
 with tab3:
@@ -650,16 +687,13 @@ with tab3:
                     # Store in session state
                     st.session_state.last_result = result
                     
-                    # Also store in selected_doc for history
-                    selected_doc['queries'].append({
-                        'query': query,
-                        'result': result,
-                        'timestamp': datetime.now()
+                    # Persist in the document's query history
+                    DocumentManager.add_query(selected_doc['doc_id'], query, result)
+                    DocumentManager.update_document(selected_doc['doc_id'], {
+                        'status': 'Queried',
+                        'extraction_results': result.get('critical_fields', {})
                     })
                     
-                    # Update status
-                    selected_doc['status'] = 'Queried'
-                    
                     st.success("✅ Query complete!")
                     st.rerun()
                     
@@ -837,3 +871,8 @@ st.markdown("""
 Document-Type Aware • Multi-Modal Analysis • Smart Extraction
 </div>
 """, unsafe_allow_html=True)
+
+# Keep refreshing while an ingest job for the selected document is running
+if poll_job:
+    time.sleep(1)
+    st.rerun()
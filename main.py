@@ -5,6 +5,10 @@ import sys
 os.environ['FLAGS_log_level'] = '3'
 
 import argparse
+import cProfile
+import json
+import pstats
+import time
 from modules.document_preprocessor import DocumentPreprocessor
 from modules.text_retriever import TextRetriever
 from modules.image_retriever import ImageRetriever
@@ -14,7 +18,15 @@ from modules.text_agent import TextAgent
 from modules.image_agent import ImageAgent
 from modules.summarizer_agent import SummarizerAgent
 from modules.classifier_agent import DocumentClassifierAgent
-from modules.utils import load_config, save_json
+from modules.id_index import IdentifierIndex
+from modules.dedup import DuplicateDetector
+from modules.sharding import ShardCoordinator
+from modules.result_log import ResultLog
+from modules.llm_client import LLMClient
+from modules.metrics import MetricsRegistry
+from modules.utils import (
+    load_config, save_json, load_json, PipelineProgress, ReadWriteLock, STAGE_LABELS
+)
 
 class InsuranceDocumentAnalyzer:
     """Main pipeline for insurance document analysis and classification."""
@@ -32,74 +44,279 @@ class InsuranceDocumentAnalyzer:
         self.text_agent = TextAgent(config_path)
         self.image_agent = ImageAgent(config_path)
         self.summarizer_agent = SummarizerAgent(config_path)
-        self.classifier_agent = DocumentClassifierAgent(config_path)
+        # Query and classification results, appended in batches
+        self.result_log = ResultLog.from_config(self.config)
+        self.summarizer_agent.result_log = self.result_log
+        # doc_id -> fields extracted at ingest (see get_document_fields)
+        self.document_fields = {}
+        # MinHash/LSH near-duplicate check at ingest (None when disabled)
+        self.dedup = DuplicateDetector.from_config(self.config)
+        # Exact policy/claim/invoice number lookups across every document
+        self.id_index = IdentifierIndex(
+            self.config.get('identifiers', {}).get('db_path', 'data/identifiers.sqlite')
+        )
+        # Indices served by shard processes (None: the local retrievers hold them)
+        self.shards = ShardCoordinator.from_config(self.config)
+        # Held exclusively only while encoded documents are added and saved;
+        # the inference service shares it with its queries
+        self.index_lock = ReadWriteLock()
+        # Same MiniLM model as the text retriever; share one copy
+        self.classifier_agent = DocumentClassifierAgent(
+            config_path, model=self.text_retriever.model
+        )
+        
+        # Span timers and counters for every pipeline stage (see --metrics)
+        self.metrics = MetricsRegistry()
+        self.preprocessor.metrics = self.metrics
+        self.text_retriever.metrics = self.metrics
+        self.image_retriever.metrics = self.metrics
+        if self.shards is not None:
+            self.shards.metrics = self.metrics
+        
+        # One OpenAI-compatible client for every agent (None: heuristics only)
+        self.llm = LLMClient.from_config(self.config)
+        if self.llm is not None:
+            self.llm.metrics = self.metrics
+            for agent in (self.general_agent, self.text_agent, self.summarizer_agent):
+                agent.llm = self.llm
         
         print("✓ Initialization complete!\n")
     
-    def classify_document(self, pdf_path: str) -> dict:
-        """Classify an insurance document."""
+    def _print_ocr_cache(self):
+        cache = self.preprocessor.ocr_cache
+        if cache is not None and cache.hits + cache.misses:
+            print(f"  OCR cache: {cache.hits}/{cache.hits + cache.misses} pages "
+                  f"served from cache ({cache.hit_rate:.0%} hit rate this session)")
+    
+    def _page_events(self, event_callback=None):
+        """Wrap an event callback so per-page stage timings are recorded too."""
+        def callback(event):
+            if event['stage'] != 'started':
+                self.metrics.histogram(f"page.{event['stage']}").observe(event['seconds'])
+            if event['stage'] == 'ocred':
+                self.metrics.count('pages')
+            if event_callback is not None:
+                event_callback(event)
+        return callback
+    
+    def classify_document(self, pdf_path: str, event_callback=None) -> dict:
+        """
+        Classify an insurance document.
+        
+        Only the first agents.classifier.max_pages pages are rendered and
+        OCRed; the document type is almost always clear from them.
+        """
         print(f"\n{'='*60}")
         print(f"Classifying: {os.path.basename(pdf_path)}")
         print(f"{'='*60}\n")
         
+        max_pages = self.config['agents'].get('classifier', {}).get('max_pages') or None
+        pdf_pages = {}
+        record_event = self._page_events(event_callback)
+        
+        def on_event(event):
+            if event['stage'] == 'started':
+                pdf_pages['total'] = event['pdf_pages']
+            record_event(event)
+        
+        start = time.perf_counter()
         print("[1/3] Preprocessing document...")
-        doc_metadata = self.preprocessor.process_pdf(pdf_path, dpi=150)
-        print(f"✓ Extracted {doc_metadata.pages} pages")
+        with self.metrics.span('classify.preprocess') as span:
+            doc_metadata = self.preprocessor.process_pdf(
+                pdf_path, dpi=150, event_callback=on_event, max_pages=max_pages
+            )
+        print(f"✓ Extracted {doc_metadata.pages} of {pdf_pages['total']} pages ({span.seconds:.2f}s)")
+        self._print_ocr_cache()
         
         print("[2/3] Extracting text content...")
-        text_chunks = []
-        for page in doc_metadata.page_metadata:
-            chunks = self.preprocessor.chunk_text(page['text'])
-            text_chunks.extend(chunks)
-        print(f"✓ Extracted {len(text_chunks)} text chunks")
+        with self.metrics.span('classify.chunk') as span:
+            text_chunks = []
+            for page in doc_metadata.page_metadata:
+                chunks = self.text_retriever.chunker.chunk(page['text'])
+                text_chunks.extend(chunks)
+        self.metrics.count('chunks', len(text_chunks))
+        print(f"✓ Extracted {len(text_chunks)} text chunks ({span.seconds:.2f}s)")
         
         print("[3/3] Classifying document...")
-        classification = self.classifier_agent.classify_document(
-            text_chunks,
-            doc_metadata.pages
-        )
-        print("✓ Classification complete")
+        with self.metrics.span('agent.classifier') as span:
+            classification = self.classifier_agent.classify_document(
+                text_chunks,
+                doc_metadata.pages
+            )
+        print(f"✓ Classification complete ({span.seconds:.2f}s)")
         
         classification['filename'] = os.path.basename(pdf_path)
-        classification['pages'] = doc_metadata.pages
+        classification['pages'] = pdf_pages['total']
         classification['doc_id'] = doc_metadata.doc_id
         
-        result_path = os.path.join(
-            self.config['paths']['results'],
-            f"classification_{doc_metadata.doc_id}.json"
-        )
-        save_json(classification, result_path)
+        with self.metrics.span('classify.save'):
+            classification['result_id'] = self.result_log.append(
+                'classification', classification, doc_id=doc_metadata.doc_id
+            )
         
+        self.metrics.histogram('classify.total').observe(time.perf_counter() - start)
+        self.metrics.count('classifications')
         return classification
     
-    def process_document(self, pdf_path: str):
-        """Process a single insurance document."""
+    def process_document(self, pdf_path: str, event_callback=None):
+        """
+        Process a single insurance document.
+        
+        event_callback, if given, receives every per-page event (rendered,
+        ocred, embedded_text, embedded_image; see utils.page_event).
+        """
         print(f"\n{'='*60}")
         print(f"Processing: {os.path.basename(pdf_path)}")
         print(f"{'='*60}\n")
         
+        start = time.perf_counter()
         print("[1/3] Preprocessing document...")
-        doc_metadata = self.preprocessor.process_pdf(pdf_path, dpi=150)
-        print(f"✓ Extracted {doc_metadata.pages} pages")
+        with self.metrics.span('process.preprocess') as span:
+            doc_metadata = self.preprocessor.process_pdf(
+                pdf_path, dpi=150, event_callback=self._page_events(event_callback)
+            )
+        print(f"✓ Extracted {doc_metadata.pages} pages ({span.seconds:.2f}s)")
+        self._print_ocr_cache()
+        
+        self.index_document(doc_metadata, event_callback)
+        
+        self.metrics.histogram('process.total').observe(time.perf_counter() - start)
+        self.metrics.count('documents')
+        return doc_metadata
+    
+    def index_document(self, doc_metadata, event_callback=None):
+        """
+        Extract fields from, embed and index a preprocessed document.
+        
+        Critical fields are extracted once here over every page and saved
+        with the document metadata, so queries can reuse them. Near-duplicates
+        of earlier documents are flagged in doc_metadata.duplicate_of and,
+        per dedup config, not indexed again; a document is registered for
+        those checks only once its indices are saved. Indices saved by
+        earlier runs are loaded before the document is added to them.
+        """
+        event_callback = self._page_events(event_callback)
+        
+        doc_dict, page_images = doc_metadata.to_dict(), doc_metadata.page_images
+        if self.dedup is not None:
+            with self.metrics.span('process.dedup'):
+                skip = self.dedup.check(doc_metadata)
+            duplicate_pages = sum(1 for page in doc_metadata.page_metadata if page.get('duplicate_of'))
+            if doc_metadata.duplicate_of:
+                self.metrics.count('duplicate_documents')
+                print(f"⚠ Near-duplicate of document {doc_metadata.duplicate_of['doc_id']} "
+                      f"({doc_metadata.duplicate_of['similarity']:.0%} similar)"
+                      f"{'; not indexing it again' if skip else ''}")
+            if duplicate_pages:
+                self.metrics.count('duplicate_pages', duplicate_pages)
+                print(f"  {duplicate_pages} page(s) duplicate pages of earlier documents")
+            if skip:
+                self.preprocessor.wait_for_writes()
+                return doc_metadata
+            doc_dict, page_images = self.dedup.index_view(doc_metadata)
+        
+        if not doc_metadata.fields:
+            with self.metrics.span('process.extract_fields') as span:
+                doc_metadata.fields = self.critical_agent.extract_document_fields(doc_metadata)
+            print(f"✓ Extracted {len(doc_metadata.fields['critical_fields'])} critical fields "
+                  f"({span.seconds:.2f}s)")
         
         print("[2/3] Generating embeddings...")
-        self.text_retriever.add_documents(doc_metadata.to_dict())
-        self.image_retriever.add_documents(doc_metadata.to_dict())
-        print("✓ Embeddings generated and indexed")
-        
-        print("[3/3] Saving indices...")
-        self.text_retriever.save_index()
-        self.image_retriever.save_index()
-        print("✓ Indices saved")
-        
-        metadata_path = os.path.join(
-            self.config['paths']['results'],
-            f"{doc_metadata.doc_id}_metadata.json"
-        )
-        save_json(doc_metadata.to_dict(), metadata_path)
+        # Embed without holding the index lock; queries keep running meanwhile
+        with self.metrics.span('process.index_text') as text_span:
+            text_encoded = self.text_retriever.encode_documents(doc_dict, event_callback)
+        with self.metrics.span('process.index_images') as image_span:
+            image_encoded = self.image_retriever.encode_documents(
+                doc_dict, images=page_images, event_callback=event_callback
+            )
+        print(f"✓ Embeddings generated "
+              f"(text {text_span.seconds:.2f}s, images {image_span.seconds:.2f}s)")
+        
+        print("[3/3] Indexing and saving...")
+        with self.index_lock.write(), self.metrics.span('process.save_index') as span:
+            if self.shards is None:
+                self._load_saved_indices()
+                if text_encoded is not None:
+                    self.text_retriever.add_encoded(*text_encoded)
+                if image_encoded is not None:
+                    self.image_retriever.add_encoded(*image_encoded)
+                self.text_retriever.save_index()
+                self.image_retriever.save_index()
+            else:
+                # Index on the document's shard
+                self.shards.add(doc_metadata.doc_id, text_encoded, image_encoded)
+                self.shards.save()
+        self.preprocessor.wait_for_writes()
+        print(f"✓ Indices updated and saved ({span.seconds:.2f}s)")
+        
+        if self.dedup is not None:
+            # Only an indexed document may mark later ones as its duplicates
+            self.dedup.register(doc_metadata.doc_id, doc_metadata.page_metadata)
+        
+        # Like dedup, identifiers only point at documents that are indexed
+        with self.metrics.span('process.index_identifiers'):
+            identifiers = self.critical_agent.extract_identifiers(doc_metadata)
+            self.id_index.add_document(doc_metadata.doc_id, identifiers, doc_metadata.filename)
+        self.metrics.count('identifiers', len(identifiers))
+        
+        with self.metrics.span('process.save_metadata'):
+            metadata_path = os.path.join(
+                self.config['paths']['results'],
+                f"{doc_metadata.doc_id}_metadata.json"
+            )
+            save_json(doc_metadata.to_dict(), metadata_path)
+        self.document_fields[doc_metadata.doc_id] = doc_metadata.fields
         
         return doc_metadata
     
+    def _load_saved_indices(self):
+        """Load indices saved by earlier runs before adding to them, so saving keeps them."""
+        embeddings_dir = self.config['paths']['embeddings']
+        for retriever, filename in ((self.text_retriever, 'text_index.faiss'),
+                                    (self.image_retriever, 'image_index.faiss')):
+            if not retriever.index.ntotal and os.path.exists(os.path.join(embeddings_dir, filename)):
+                retriever.load_index()
+    
+    def lookup_identifier(self, value: str, id_type: str = None) -> list:
+        """
+        Documents and pages carrying a policy, claim or invoice number.
+        
+        An exact lookup in the identifier index; separators and case are
+        ignored ("clm 2024/0042" finds CLM-2024-0042).
+        """
+        with self.metrics.span('lookup.identifier'):
+            return self.id_index.lookup(value, id_type)
+    
+    def get_document_fields(self, doc_id: str) -> dict:
+        """Fields extracted at ingest, read from the document's saved metadata."""
+        if doc_id not in self.document_fields:
+            metadata_path = os.path.join(
+                self.config['paths']['results'], f"{doc_id}_metadata.json"
+            )
+            fields = {}
+            if os.path.exists(metadata_path):
+                fields = load_json(metadata_path).get('fields', {})
+            self.document_fields[doc_id] = fields
+        return self.document_fields[doc_id]
+    
+    def result_history(self, doc_id: str = None, query: str = None, kind: str = None,
+                       limit: int = 20) -> list:
+        """Logged query/classification results, newest first (see ResultLog.history)."""
+        return self.result_log.history(doc_id=doc_id, query=query, kind=kind, limit=limit)
+    
+    def index_stats(self) -> dict:
+        """Indexed text chunks and page images, summed over the shards that answered."""
+        if self.shards is None:
+            return {
+                'text_chunks': len(self.text_retriever.text_chunks),
+                'images': len(self.image_retriever.image_paths)
+            }
+        shard_stats = [stats for stats in self.shards.stats() if stats]
+        return {
+            name: sum(stats[name] for stats in shard_stats)
+            for name in ('text_chunks', 'images')
+        }
+    
     def load_indices(self):
         """Load pre-built indices for querying."""
         print("Loading indices...")
@@ -113,9 +330,17 @@ class InsuranceDocumentAnalyzer:
             print("  python main.py --mode process --pdf data/raw_pdfs/your_document.pdf")
             return False
     
-    def query_document(self, query: str) -> dict:
-        """Query the processed documents."""
-        if not self.text_retriever.text_chunks or not self.image_retriever.image_paths:
+    def query_document(self, query: str, load_indices: bool = True) -> dict:
+        """
+        Query the processed documents.
+        
+        Saved indices are loaded first if either retriever is empty, unless
+        load_indices is False: a caller that shares the retrievers between
+        threads (the HTTP service) loads them itself under index_lock.
+        """
+        if load_indices and self.shards is None and (
+            not self.text_retriever.text_chunks or not self.image_retriever.image_paths
+        ):
             if not self.load_indices():
                 return None
         
@@ -123,36 +348,67 @@ class InsuranceDocumentAnalyzer:
         print(f"Query: {query}")
         print(f"{'='*60}\n")
         
+        start = time.perf_counter()
+        self.metrics.count('queries')
+        
         print("[1/5] General Agent - Retrieving context...")
-        text_results = self.text_retriever.search(query)
-        image_results = self.image_retriever.search(query)
-        general_context = self.general_agent.process(query, text_results, image_results)
-        print(f"✓ Retrieved {len(text_results)} text chunks and {len(image_results)} images")
+        with self.metrics.span('query.text_search') as text_span:
+            if self.shards is None:
+                text_results = self.text_retriever.search(query)
+            else:
+                # Embed once here; every shard searches with the same vector
+                text_results = self.shards.search_text(
+                    query, self.text_retriever.encode_query(query)
+                )
+        with self.metrics.span('query.image_search') as image_span:
+            if self.shards is None:
+                image_results = self.image_retriever.search(query)
+            else:
+                image_results = self.shards.search_image(
+                    query, self.image_retriever.encode_query(query)
+                )
+        with self.metrics.span('agent.general'):
+            general_context = self.general_agent.process(query, text_results, image_results)
+        print(f"✓ Retrieved {len(text_results)} text chunks and {len(image_results)} images "
+              f"(text {text_span.seconds:.3f}s, images {image_span.seconds:.3f}s)")
         
         print("[2/5] Critical Agent - Extracting fields...")
-        critical_output = self.critical_agent.process(general_context)
-        print(f"✓ Extracted {len(critical_output['critical_fields'])} critical fields")
+        with self.metrics.span('agent.critical') as span:
+            # Fields of the best evidence page's document were extracted at
+            # ingest; only fields missing there are searched for again
+            evidence = general_context.get('evidence', [])
+            document_fields = self.get_document_fields(evidence[0]['doc_id']) if evidence else None
+            critical_output = self.critical_agent.process(general_context, document_fields)
+        print(f"✓ Extracted {len(critical_output['critical_fields'])} critical fields "
+              f"({span.seconds:.3f}s)")
         
         print("[3/5] Text Agent - Analyzing text...")
-        text_output = self.text_agent.process(
-            query, general_context, critical_output['critical_fields']
-        )
-        print("✓ Textual analysis complete")
+        with self.metrics.span('agent.text') as span:
+            text_output = self.text_agent.process(
+                query, general_context, critical_output['critical_fields']
+            )
+        print(f"✓ Textual analysis complete ({span.seconds:.3f}s)")
         
         print("[4/5] Image Agent - Analyzing visuals...")
-        image_output = self.image_agent.process(
-            query, general_context, critical_output['critical_fields']
-        )
-        print("✓ Visual analysis complete")
+        with self.metrics.span('agent.image') as span:
+            image_output = self.image_agent.process(
+                query, general_context, critical_output['critical_fields']
+            )
+        print(f"✓ Visual analysis complete ({span.seconds:.3f}s)")
         
         print("[5/5] Summarizer Agent - Synthesizing results...")
-        final_result = self.summarizer_agent.process(
-            query, general_context, critical_output, text_output, image_output
-        )
-        print("✓ Analysis complete")
-        
-        result_path = self.summarizer_agent.save_result(final_result)
-        print(f"\n✓ Results saved to: {result_path}")
+        with self.metrics.span('agent.summarizer') as span:
+            final_result = self.summarizer_agent.process(
+                query, general_context, critical_output, text_output, image_output
+            )
+        print(f"✓ Analysis complete ({span.seconds:.3f}s)")
+        
+        with self.metrics.span('query.save_result'):
+            final_result['result_id'] = self.summarizer_agent.save_result(
+                final_result, doc_id=evidence[0]['doc_id'] if evidence else None
+            )
+        print(f"\n✓ Result logged as {final_result['result_id']} ({self.result_log.db_path})")
+        self.metrics.histogram('query.total').observe(time.perf_counter() - start)
         
         # Ensure the result has all necessary keys for Streamlit UI
         if not isinstance(final_result, dict):
@@ -181,6 +437,9 @@ class InsuranceDocumentAnalyzer:
         if 'evidence_pages' not in final_result:
             final_result['evidence_pages'] = critical_output.get('evidence_pages', [])
         
+        if 'field_locations' not in final_result:
+            final_result['field_locations'] = critical_output.get('field_locations', {})
+        
         return final_result
 
     
@@ -222,37 +481,121 @@ class InsuranceDocumentAnalyzer:
         print(f"{'='*60}\n")
 
 
+def print_page_events(stages: tuple = ('rendered', 'ocred', 'embedded_text', 'embedded_image')):
+    """Event callback printing per-page timings and throughput to the console."""
+    progress = PipelineProgress(stages)
+    
+    def callback(event):
+        progress.update(event)
+        if event['stage'] in progress.stages:
+            print(
+                f"  {STAGE_LABELS[event['stage']]:16s} page {event['page']}/{event['total']} "
+                f"in {event['seconds']:.2f}s "
+                f"({progress.pages_per_second(event['stage']):.2f} pages/s)"
+                f"{' [cached]' if event.get('cached') else ''}"
+            )
+    
+    return callback
+
 def main():
     parser = argparse.ArgumentParser(
         description="Insurance Document Analyzer - Extract & Classify Insurance PDFs"
     )
     parser.add_argument(
         '--mode', 
-        choices=['process', 'query', 'classify', 'both'],
+        choices=['process', 'query', 'classify', 'both', 'lookup', 'history'],
         required=True,
-        help='Mode: process (index), query (ask questions), classify (document type), or both'
+        help='Mode: process (index), query (ask questions), classify (document type), '
+             'both, lookup (find documents by policy/claim/invoice number), '
+             'or history (logged results, filtered by --doc-id/--query)'
     )
     parser.add_argument('--pdf', help='Path to PDF file to process')
     parser.add_argument('--query', help='Question to ask about the documents')
+    parser.add_argument('--id', help='Policy, claim or invoice number for lookup mode')
+    parser.add_argument('--doc-id', help='Document ID to filter history mode by')
+    parser.add_argument('--limit', type=int, default=20, help='Results shown in history mode')
     parser.add_argument('--config', default='config.yaml', help='Path to configuration file')
+    parser.add_argument(
+        '--profile', nargs='?', const='profile.pstats', metavar='FILE',
+        help='Run under cProfile, dump stats to FILE (default: profile.pstats) and print the top functions'
+    )
+    parser.add_argument(
+        '--metrics', metavar='FILE',
+        help='Write stage timings and counters to FILE (.prom for Prometheus text, otherwise JSON)'
+    )
     
     args = parser.parse_args()
     
     analyzer = InsuranceDocumentAnalyzer(args.config)
     
+    # Model loading is excluded; only the requested work is profiled
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        run_mode(analyzer, args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"\n⏱ Profile saved to {args.profile}")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+        
+        print("\n⏱ Stage timings:")
+        print(analyzer.metrics.report())
+        if args.metrics:
+            write_metrics(analyzer.metrics, args.metrics)
+            print(f"\n✓ Metrics written to {args.metrics}")
+
+def write_metrics(metrics: MetricsRegistry, path: str):
+    """Export a metrics registry as Prometheus text (.prom) or JSON."""
+    with open(path, 'w') as f:
+        if path.endswith('.prom'):
+            f.write('\n'.join(metrics.to_prometheus()) + '\n')
+        else:
+            json.dump(metrics.to_dict(), f, indent=2)
+
+def run_mode(analyzer: InsuranceDocumentAnalyzer, args):
     if args.mode == 'classify':
         if not args.pdf:
             print("Error: --pdf required for classify mode")
             return
-        classification = analyzer.classify_document(args.pdf)
+        classification = analyzer.classify_document(
+            args.pdf, event_callback=print_page_events(('rendered', 'ocred'))
+        )
         analyzer.print_classification(classification)
         return
     
+    if args.mode == 'lookup':
+        if not args.id:
+            print("Error: --id required for lookup mode")
+            return
+        matches = analyzer.lookup_identifier(args.id)
+        if not matches:
+            print(f"No documents found for {args.id}")
+        for match in matches:
+            print(f"  {match['id_type']:15s} {match['raw_value']:20s} "
+                  f"{match['filename'] or match['doc_id']}  page {match['page_id']}  "
+                  f"(doc_id {match['doc_id']})")
+        return
+    
+    if args.mode == 'history':
+        entries = analyzer.result_history(doc_id=args.doc_id, query=args.query, limit=args.limit)
+        if not entries:
+            print("No logged results")
+        for entry in entries:
+            result = entry['result']
+            detail = entry['query'] or result.get('document_type', '')
+            confidence = f"{entry['confidence']:.0%}" if entry['confidence'] is not None else '-'
+            print(f"  {entry['created_at'][:19]}  {entry['kind']:14s} {confidence:>5s}  "
+                  f"{entry['doc_id'] or '-'}  {detail}")
+        return
+    
     if args.mode in ['process', 'both']:
         if not args.pdf:
             print("Error: --pdf required for process mode")
             return
-        analyzer.process_document(args.pdf)
+        analyzer.process_document(args.pdf, event_callback=print_page_events())
     
     if args.mode in ['query', 'both']:
         if not args.query:
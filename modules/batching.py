@@ -0,0 +1,68 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Any
+from .metrics import Histogram
+
+class MicroBatcher:
+    """
+    Collect single requests from many threads into batched calls.
+
+    submit() blocks the calling thread until its item has been processed.
+    A background thread waits up to max_wait_ms after the first queued item
+    for more to arrive, then calls batch_fn once with up to max_batch_size
+    items; batch_fn must return one result per item, in order. An
+    exception instance returned as an item's result is raised in that
+    item's caller only; one raised by batch_fn fails the whole batch.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 32, max_wait_ms: float = 10.0, name: str = 'batch'):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batch_sizes = Histogram(
+            f'{name}_batch_size', buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+        )
+        self.batch_latency = Histogram(f'{name}_batch_seconds')
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f'{name}-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Any:
+        future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            items = [item for item, _ in batch]
+            start = time.perf_counter()
+            try:
+                results = self.batch_fn(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batch_latency.observe(time.perf_counter() - start)
+            self.batch_sizes.observe(len(batch))
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
@@ -0,0 +1,166 @@
+import re
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+
+# Stand-in tokens when no encoder tokenizer is loaded: words and single
+# punctuation marks, roughly what BERT's basic tokenizer produces
+FALLBACK_TOKEN = re.compile(r'\w+|[^\w\s]')
+
+class TokenChunker:
+    """
+    Split page text into encoder-sized windows of character offsets.
+
+    Windows are measured in the encoder's own tokens (minus the two special
+    tokens), so no chunk is silently truncated, and start and end on word
+    boundaries. A word is a whitespace-delimited run, so an identifier
+    such as POL-123456 is never split between chunks. Only (start, end,
+    token count) triples are produced; the text itself stays in the page
+    it came from.
+    """
+
+    def __init__(self, tokenizer=None, max_tokens: int = 256, overlap: int = 32):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+
+    @classmethod
+    def from_config(cls, config: Dict, model=None) -> 'TokenChunker':
+        """Chunker for a SentenceTransformer (or None), capped at its max_seq_length."""
+        embeddings = config['embeddings']
+        max_tokens = embeddings.get('chunk_size', 256)
+        tokenizer = None
+        if model is not None:
+            tokenizer = getattr(model, 'tokenizer', None)
+            max_tokens = min(max_tokens, getattr(model, 'max_seq_length', None) or max_tokens)
+        return cls(tokenizer, max_tokens, embeddings.get('chunk_overlap', 32))
+
+    def tokenize(self, text: str) -> Tuple[List[Tuple[int, int]], List[int]]:
+        """
+        Character offsets and word ids of the tokens in text.
+
+        Word ids follow whitespace, not the tokenizer's own word split,
+        which breaks at punctuation ("POL", "-", "123456").
+        """
+        if self.tokenizer is not None and getattr(self.tokenizer, 'is_fast', False):
+            encoding = self.tokenizer(
+                text, add_special_tokens=False, return_offsets_mapping=True,
+                truncation=False, verbose=False
+            )
+            offsets = [tuple(offset) for offset in encoding['offset_mapping']]
+        else:
+            offsets = [match.span() for match in FALLBACK_TOKEN.finditer(text)]
+
+        word_ids = []
+        word, previous_end = -1, None
+        for start, end in offsets:
+            # Whitespace before the token (or leading it, as in SentencePiece
+            # offsets) starts a new word
+            if previous_end is None or start > previous_end or text[start:start + 1].isspace():
+                word += 1
+            word_ids.append(word)
+            previous_end = end
+        return offsets, word_ids
+
+    def spans(self, text: str) -> List[Tuple[int, int, int]]:
+        """(start, end, tokens) windows covering text, overlapping by self.overlap tokens."""
+        offsets, word_ids = self.tokenize(text)
+        count = len(offsets)
+        budget = max(1, self.max_tokens - 2)  # [CLS] and [SEP]
+        step = max(1, budget - self.overlap)
+
+        def is_word_start(i: int) -> bool:
+            return i == 0 or i >= count or word_ids[i] != word_ids[i - 1]
+
+        spans = []
+        start = 0
+        while start < count:
+            end = min(start + budget, count)
+            # Move back to the start of the word the window cuts into; a
+            # single word longer than the budget has to be cut
+            boundary = end
+            while boundary > start and not is_word_start(boundary):
+                boundary -= 1
+            if boundary > start:
+                end = boundary
+            spans.append((offsets[start][0], offsets[end - 1][1], end - start))
+            if end >= count:
+                break
+            # Next window starts at the first word start at or after
+            # start + step (or at end, so no text is skipped)
+            start = min(start + step, end)
+            while start < end and not is_word_start(start):
+                start += 1
+        return spans
+
+    def chunk(self, text: str) -> List[str]:
+        """Chunk texts for callers that need strings (e.g. classification)."""
+        return [text[start:end] for start, end, _ in self.spans(text)]
+
+def length_sorted_batches(lengths: List[int], batch_size: int) -> List[np.ndarray]:
+    """
+    Group item indices into batches of similar length.
+
+    Encoders pad every batch to its longest item, so sorting by token
+    count keeps short chunks (last lines of a page, forms) from paying
+    for long ones.
+    """
+    order = np.argsort(np.asarray(lengths), kind='stable')
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+class ChunkStore:
+    """
+    Chunk texts as (page key, start, end) views over stored page texts.
+
+    Behaves like the list of chunk strings it replaces (len, indexing,
+    iteration), but overlapping chunks share one copy of their page in
+    memory and in the saved index metadata.
+    """
+
+    def __init__(self):
+        self.pages = {}   # page key -> page text
+        self.spans = []   # (page key, start, end)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __getitem__(self, index: int) -> str:
+        key, start, end = self.spans[index]
+        return self.pages[key][start:end]
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self.spans)):
+            yield self[index]
+
+    def add_page(self, key: str, text: str):
+        self.pages[key] = text
+
+    def add(self, key: str, start: int, end: int):
+        self.spans.append((key, start, end))
+
+    def extend(self, chunks):
+        """Append another ChunkStore (or plain chunk strings, one page each)."""
+        if isinstance(chunks, ChunkStore):
+            self.pages.update(chunks.pages)
+            self.spans.extend(chunks.spans)
+            return
+        for text in chunks:
+            key = f"chunk:{len(self.spans)}"
+            self.add_page(key, text)
+            self.add(key, 0, len(text))
+
+    def to_dict(self) -> Dict:
+        return {'pages': self.pages, 'spans': [list(span) for span in self.spans]}
+
+    @classmethod
+    def from_dict(cls, data) -> 'ChunkStore':
+        """Load to_dict() output, or the plain list of strings older indices saved."""
+        store = cls()
+        if isinstance(data, dict):
+            store.pages = dict(data['pages'])
+            store.spans = [tuple(span) for span in data['spans']]
+        else:
+            store.extend(data)
+        return store
+
+def page_key(doc_id: str, page_id: int) -> str:
+    return f"{doc_id}:{page_id}"
@@ -1,15 +1,22 @@
 import numpy as np
 from typing import Dict, List
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 from .utils import load_config
+from .encoders import get_encoder_backend, load_text_encoder
 
 class DocumentClassifierAgent:
     """Classifies insurance documents based on content."""
     
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", model=None):
         self.config = load_config(config_path)
-        self.model = SentenceTransformer(self.config['models']['text_encoder'])
+        
+        # Reuse an already loaded text encoder (e.g. the TextRetriever's) when given
+        if model is None:
+            model = load_text_encoder(
+                self.config['models']['text_encoder'],
+                get_encoder_backend(self.config)
+            )
+        self.model = model
         
         # Define document type characteristics
         self.document_types = {
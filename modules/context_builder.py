@@ -0,0 +1,100 @@
+from typing import Dict, List
+
+class ContextBuilder:
+    """
+    Merge retrieved chunks into contiguous page spans under a size budget.
+
+    Consecutive chunks of a page overlap by chunk_overlap tokens, so the
+    raw hit list repeats text. Hits whose character ranges (metadata start
+    and end, see TextRetriever.encode_documents) overlap or are at most
+    max_gap characters apart are stitched back into one span per run. Spans
+    keep the shape of a retrieval result (text, score, metadata) with the
+    best member score, and are kept best-first until max_chars is spent.
+    """
+
+    def __init__(self, max_chars: int = 4000, max_gap: int = 2):
+        self.max_chars = max_chars
+        self.max_gap = max_gap
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'ContextBuilder':
+        retrieval = config['retrieval']
+        return cls(retrieval.get('context_max_chars', 4000), retrieval.get('context_max_gap', 2))
+
+    def merge(self, text_results: List[Dict]) -> List[Dict]:
+        """Spans of overlapping/adjacent hits, best score first (no budget applied)."""
+        pages = {}
+        spans = []
+        for result in text_results:
+            metadata = result['metadata']
+            if metadata.get('start') is None or metadata.get('end') is None:
+                # Indices built before offsets were stored: keep the chunk as it is
+                spans.append(self._span(result, [result]))
+                continue
+            pages.setdefault((metadata['doc_id'], metadata['page_id']), []).append(result)
+
+        for results in pages.values():
+            results.sort(key=lambda r: r['metadata']['start'])
+            run = [results[0]]
+            for result in results[1:]:
+                if result['metadata']['start'] - max(r['metadata']['end'] for r in run) <= self.max_gap:
+                    run.append(result)
+                else:
+                    spans.append(self._span(run[0], run))
+                    run = [result]
+            spans.append(self._span(run[0], run))
+
+        return sorted(spans, key=lambda span: span['score'], reverse=True)
+
+    def _span(self, first: Dict, run: List[Dict]) -> Dict:
+        text = first['text']
+        end = first['metadata'].get('end')
+        for result in run[1:]:
+            start = result['metadata']['start']
+            if result['metadata']['end'] <= end:
+                continue  # contained in the span already
+            if start >= end:
+                text += ' ' + result['text']
+            else:
+                text += result['text'][end - start:]
+            end = result['metadata']['end']
+
+        metadata = dict(first['metadata'])
+        if end is not None:
+            metadata['end'] = end
+        metadata['chunk_ids'] = [r['metadata'].get('chunk_id') for r in run]
+        metadata.pop('chunk_id', None)
+        return {
+            'text': text,
+            'score': max(r['score'] for r in run),
+            'metadata': metadata
+        }
+
+    def build(self, text_results: List[Dict]) -> List[Dict]:
+        """
+        Merged spans that fit in max_chars, best score first.
+
+        The best span is cut to the budget if it is longer on its own;
+        after that, spans that do not fit are skipped in favour of
+        lower-scored ones that do.
+        """
+        kept = []
+        remaining = self.max_chars
+        for span in self.merge(text_results):
+            if len(span['text']) > remaining:
+                if kept:
+                    continue
+                span = dict(span, text=span['text'][:remaining], metadata=dict(span['metadata']))
+                if span['metadata'].get('start') is not None:
+                    span['metadata']['end'] = span['metadata']['start'] + len(span['text'])
+            kept.append(span)
+            remaining -= len(span['text'])
+        return kept
+
+    @staticmethod
+    def format(spans: List[Dict]) -> str:
+        """Spans as one prompt-ready string with page headers."""
+        return "\n\n".join(
+            f"[Page {span['metadata']['page_id']}, Score: {span['score']:.3f}]\n{span['text']}"
+            for span in spans
+        )
@@ -1,12 +1,50 @@
 import re
 from typing import Dict, List, Optional
 from .utils import load_config
+from .layout import PageLayout
+from .id_index import IDENTIFIER_FIELDS
+
+AMOUNT_VALUE = r'(\d[\d,]*(?:\.\d{2})?)'
+DATE_VALUE = (
+    r'(\d{1,2}[\-/]\d{1,2}[\-/]\d{2,4}|\d{4}[\-/]\d{1,2}[\-/]\d{1,2}'
+    r'|\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})'
+)
+NUMBER_VALUE = r'([A-Z0-9][A-Z0-9\-/]{2,})'
 
 class CriticalAgent:
     """Enhanced Critical Agent with better invoice extraction."""
     
     def __init__(self, config_path: str = "config.yaml"):
         self.config = load_config(config_path)
+        # Word layouts are saved next to the extracted page text
+        self.layout_dir = self.config['paths']['extracted_text']
+        
+        # Form labels for layout lookups: the value is whatever OCR placed
+        # right of (or under) the label, so no value pattern has to guess
+        # where a field ends
+        self.labels = {
+            'invoice_number': [r'Invoice\s*(?:Number|No\.?|#)', r'Bill\s*(?:No|Number)'],
+            'amount_due': [r'Amount\s+Due', r'Grand\s+Total', r'Total\s+Amount',
+                           r'Net\s+Amount', r'Balance\s+Due'],
+            'vendor_name': [r'Vendor(?:\s+Name)?', r'Supplier', r'Billed\s+by'],
+            'payment_terms': [r'Payment\s+Terms?'],
+            'date': [r'(?:Invoice\s+|Bill\s+)?Date'],
+            'policy_number': [r'Policy\s*(?:Number|No\.?|#|ID)'],
+            'claim_number': [r'Claim\s*(?:Number|No\.?|#|ID)'],
+            'claim_amount': [r'Claim\s+Amount', r'Amount\s+Claimed'],
+            'status': [r'(?:Claim\s+)?Status'],
+            'insured_name': [r'Insured(?:\s+Name)?', r'Policy\s*Holder'],
+        }
+        # Optional shape a labelled value must have; the first match is kept
+        self.value_patterns = {
+            'invoice_number': NUMBER_VALUE,
+            'policy_number': NUMBER_VALUE,
+            'claim_number': NUMBER_VALUE,
+            'amount_due': AMOUNT_VALUE,
+            'claim_amount': AMOUNT_VALUE,
+            'date': DATE_VALUE,
+            'status': r'(Approved|Pending|Under\s+Review|Rejected|Processing|Active|Settled)',
+        }
         
         # Enhanced patterns for better extraction
         self.patterns = {
@@ -92,23 +130,51 @@ class CriticalAgent:
             ],
         }
     
-    def process(self, context: Dict) -> Dict:
-        """Extract critical fields from context with fallback strategies."""
-        text_context = context['text_context']
+    def process(self, context: Dict, document_fields: Dict = None) -> Dict:
+        """
+        Extract critical fields from context with fallback strategies.
+        
+        Fields already in document_fields (extract_document_fields output
+        saved at ingest) are reused as they are. The rest are looked up in
+        the word layouts of the evidence pages first, then regex patterns
+        over each merged text span (see ContextBuilder). field_locations
+        maps each field to the page and box (page fractions) it was read
+        from, for highlighting.
+        """
+        if 'text_spans' in context:
+            span_texts = [span['text'] for span in context['text_spans']]
+        else:
+            span_texts = [context['text_context']]
         
         extracted_fields = {}
         confidence_scores = {}
+        field_locations = {}
+        
+        if document_fields:
+            extracted_fields.update(document_fields.get('critical_fields', {}))
+            confidence_scores.update(document_fields.get('confidence_scores', {}))
+            field_locations.update(document_fields.get('field_locations', {}))
+        
+        missing = [name for name in self.patterns if name not in extracted_fields]
+        layouts = self._load_layouts(context) if missing else []
         
-        # Extract each field type
-        for field_name, patterns in self.patterns.items():
-            value, confidence = self._extract_field_with_fallback(
-                text_context, 
-                patterns,
-                field_name
-            )
+        # Extract each remaining field type
+        for field_name in missing:
+            patterns = self.patterns[field_name]
+            found = self._extract_from_layouts(layouts, field_name)
+            if found:
+                extracted_fields[field_name] = found['value']
+                confidence_scores[field_name] = found['confidence']
+                field_locations[field_name] = found['location']
+                continue
+            
+            value, confidence = self._extract_from_spans(span_texts, patterns, field_name)
             if value:
                 extracted_fields[field_name] = value
                 confidence_scores[field_name] = confidence
+                location = self._locate(layouts, value)
+                if location:
+                    field_locations[field_name] = location
         
         # Identify evidence pages
         evidence_pages = self._identify_evidence_pages(context)
@@ -116,10 +182,134 @@ class CriticalAgent:
         return {
             'critical_fields': extracted_fields,
             'confidence_scores': confidence_scores,
+            'field_locations': field_locations,
             'evidence_pages': evidence_pages,
             'extraction_summary': self._generate_summary(extracted_fields)
         }
     
+    def extract_document_fields(self, doc_metadata) -> Dict:
+        """
+        Extract every field once from a whole document at ingest.
+        
+        Each page is searched (layout lookup, then patterns over that
+        page's full text) and the most confident value wins, earlier pages
+        breaking ties. Returns critical_fields, confidence_scores,
+        source_pages and field_locations, ready to pass to process().
+        """
+        doc_id = doc_metadata.doc_id
+        pages = doc_metadata.page_metadata
+        layouts = doc_metadata.page_layouts
+        if len(layouts) != len(pages):
+            layouts = [
+                PageLayout.load(self.layout_dir, doc_id, page['page_id']) for page in pages
+            ]
+        
+        best = {}
+        for page, layout in zip(pages, layouts):
+            page_layouts = [(doc_id, page['page_id'], layout)] if layout is not None else []
+            for field_name, patterns in self.patterns.items():
+                found = self._extract_from_layouts(page_layouts, field_name)
+                if found is None:
+                    value, confidence = self._extract_field_with_fallback(
+                        page['text'], patterns, field_name
+                    )
+                    if not value:
+                        continue
+                    found = {
+                        'value': value,
+                        'confidence': confidence,
+                        'location': self._locate(page_layouts, value)
+                    }
+                if field_name not in best or found['confidence'] > best[field_name][1]['confidence']:
+                    best[field_name] = (page['page_id'], found)
+        
+        return {
+            'critical_fields': {name: found['value'] for name, (_, found) in best.items()},
+            'confidence_scores': {name: found['confidence'] for name, (_, found) in best.items()},
+            'source_pages': {name: page_id for name, (page_id, _) in best.items()},
+            'field_locations': {
+                name: found['location'] for name, (_, found) in best.items() if found['location']
+            }
+        }
+    
+    def extract_identifiers(self, doc_metadata) -> List[Dict]:
+        """
+        Every policy, claim and invoice number on every page, for IdentifierIndex.
+        
+        Unlike extract_document_fields, which keeps one value per field,
+        all matches are returned: bundles often carry several claims.
+        """
+        identifiers = {}
+        for page in doc_metadata.page_metadata:
+            for field_name in IDENTIFIER_FIELDS:
+                for pattern in self.patterns[field_name]:
+                    for match in re.finditer(pattern, page['text'], re.IGNORECASE | re.MULTILINE):
+                        value = match.group(1).strip()
+                        if self._validate_match(value, field_name):
+                            identifiers[(field_name, value, page['page_id'])] = None
+        
+        # Ingest-time fields may come from layouts rather than patterns
+        fields = doc_metadata.fields or {}
+        for field_name in IDENTIFIER_FIELDS:
+            value = fields.get('critical_fields', {}).get(field_name)
+            page_id = fields.get('source_pages', {}).get(field_name)
+            if value and page_id is not None:
+                identifiers[(field_name, value, page_id)] = None
+        
+        return [
+            {'id_type': field_name, 'value': value, 'page_id': page_id}
+            for field_name, value, page_id in identifiers
+        ]
+    
+    def _load_layouts(self, context: Dict) -> List[tuple]:
+        """(doc_id, page_id, PageLayout) for the evidence pages, best first."""
+        layouts = []
+        for page in context.get('evidence', []):
+            layout = PageLayout.load(self.layout_dir, page['doc_id'], page['page_id'])
+            if layout is not None and len(layout):
+                layouts.append((page['doc_id'], page['page_id'], layout))
+        return layouts
+    
+    def _extract_from_layouts(self, layouts: List[tuple], field_name: str) -> Optional[Dict]:
+        """First valid value found next to one of the field's labels."""
+        value_pattern = self.value_patterns.get(field_name)
+        for doc_id, page_id, layout in layouts:
+            for label in self.labels.get(field_name, []):
+                for candidate in layout.key_values(label):
+                    value = candidate['value']
+                    if value_pattern:
+                        match = re.search(value_pattern, value, re.IGNORECASE)
+                        if not match:
+                            continue
+                        value = match.group(1)
+                    if not self._validate_match(value, field_name):
+                        continue
+                    return {
+                        'value': value,
+                        'confidence': round(0.6 + 0.39 * candidate['confidence'], 2),
+                        'location': {'doc_id': doc_id, 'page_id': page_id,
+                                     'box': candidate['box']}
+                    }
+        return None
+    
+    def _locate(self, layouts: List[tuple], value: str) -> Optional[Dict]:
+        """Where a regex-extracted value appears on the evidence pages."""
+        for doc_id, page_id, layout in layouts:
+            boxes = layout.find(value)
+            if boxes:
+                return {'doc_id': doc_id, 'page_id': page_id, 'box': boxes[0]}
+        return None
+    
+    def _extract_from_spans(self, span_texts: List[str], patterns: List[str],
+                            field_name: str) -> tuple:
+        """Most confident match over spans scanned one at a time (best span wins ties)."""
+        best_value, best_confidence = None, 0.0
+        for text in span_texts:
+            value, confidence = self._extract_field_with_fallback(text, patterns, field_name)
+            if value and confidence > best_confidence:
+                best_value, best_confidence = value, confidence
+        return best_value, best_confidence
+    
     def _extract_field_with_fallback(self, text: str, patterns: List[str], 
                                      field_name: str) -> tuple:
         """Extract field with multiple fallback strategies."""
@@ -207,6 +397,13 @@ class CriticalAgent:
         """Identify which pages contain critical information."""
         evidence_pages = set()
         
+        # Prefer the fused page ranking from the General Agent
+        if 'evidence' in context:
+            for page in context['evidence']:
+                if page['score'] > 0.4:
+                    evidence_pages.add(page['page_id'])
+            return sorted(list(evidence_pages))
+        
         for result in context.get('text_results', []):
             page_id = result['metadata']['page_id']
             if result['score'] > 0.4:
@@ -0,0 +1,269 @@
+import os
+import re
+import zlib
+import hashlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .utils import ensure_dir, sqlite_connection
+
+# Mersenne prime 2^31 - 1: a * hash + b stays below 2^63 for 32-bit hashes
+_PRIME = np.uint64((1 << 31) - 1)
+
+def shingle_hashes(text: str, size: int = 5) -> np.ndarray:
+    """CRC32 of every run of size lowercase words (unique), as uint64."""
+    words = re.findall(r'\w+', text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    if len(words) < size:
+        shingles = [' '.join(words)]
+    else:
+        shingles = [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.fromiter(
+        (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+        dtype=np.uint64, count=len(shingles)
+    ))
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    (bands, rows) with bands * rows == num_perm whose LSH threshold
+    (1/bands)^(1/rows) is closest to the similarity threshold.
+    """
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+
+class MinHasher:
+    """
+    MinHash signatures from universal hashing (a * x + b) mod p.
+
+    The estimated Jaccard similarity of two shingle sets is the fraction
+    of equal signature positions. A seeded generator keeps signatures
+    comparable across processes and runs.
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: np.ndarray) -> Optional[np.ndarray]:
+        """uint32 signature of a set of shingle hashes, or None if it is empty."""
+        if len(hashes) == 0:
+            return None
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    return float(np.mean(first == second))
+
+class LSHIndex:
+    """
+    Persistent MinHash LSH index in SQLite.
+
+    Signatures are cut into bands; two entries become candidates when any
+    band hashes to the same bucket, and candidates are then confirmed by
+    their estimated similarity.
+    """
+
+    def __init__(self, db_path: str, num_perm: int = 128, threshold: float = 0.9):
+        self.db_path = db_path
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        ensure_dir(os.path.dirname(db_path) or '.')
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS signatures (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    page_id INTEGER,
+                    signature BLOB NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    kind TEXT NOT NULL,
+                    band INTEGER NOT NULL,
+                    bucket BLOB NOT NULL,
+                    key TEXT NOT NULL,
+                    PRIMARY KEY (kind, band, bucket, key)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_signatures_doc ON signatures (doc_id)")
+
+    def _connect(self):
+        return sqlite_connection(self.db_path)
+
+    def _buckets(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(),
+                            digest_size=8).digest()
+            for band in range(self.bands)
+        ]
+
+    def add(self, entries: List[Tuple[str, str, str, Optional[int], np.ndarray]]):
+        """Store (key, kind, doc_id, page_id, signature) entries in one transaction."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for key, kind, doc_id, page_id, signature in entries:
+                conn.execute(
+                    "INSERT OR REPLACE INTO signatures (key, kind, doc_id, page_id, signature) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, kind, doc_id, page_id, signature.astype(np.uint32).tobytes())
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO buckets (kind, band, bucket, key) VALUES (?, ?, ?, ?)",
+                    [(kind, band, bucket, key) for band, bucket in enumerate(self._buckets(signature))]
+                )
+            conn.execute("COMMIT")
+
+    def query(self, signature: np.ndarray, kind: str, exclude_doc: str = None) -> List[Dict]:
+        """Stored entries of a kind at or above the threshold, most similar first."""
+        buckets = self._buckets(signature)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT s.doc_id, s.page_id, s.signature FROM buckets b "
+                "JOIN signatures s ON s.key = b.key "
+                f"WHERE b.kind = ? AND ({' OR '.join('(b.band = ? AND b.bucket = ?)' for _ in buckets)})",
+                (kind, *[value for band, bucket in enumerate(buckets) for value in (band, bucket)])
+            ).fetchall()
+        matches = []
+        for doc_id, page_id, blob in rows:
+            if doc_id == exclude_doc:
+                continue
+            score = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score >= self.threshold:
+                matches.append({'doc_id': doc_id, 'page_id': page_id, 'similarity': score})
+        return sorted(matches, key=lambda match: match['similarity'], reverse=True)
+
+    def remove_document(self, doc_id: str):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM buckets WHERE key IN (SELECT key FROM signatures WHERE doc_id = ?)",
+                (doc_id,)
+            )
+            conn.execute("DELETE FROM signatures WHERE doc_id = ?", (doc_id,))
+            conn.execute("COMMIT")
+
+class DuplicateDetector:
+    """
+    Near-duplicate documents and pages by MinHash over page text.
+
+    A document's signature is the element-wise minimum of its page
+    signatures (the MinHash of all its shingles), which catches resubmitted
+    forms. A policy forwarded with a new cover page differs as a whole, so
+    a document also counts as a duplicate when at least page_overlap of
+    its pages duplicate pages of one earlier document. Per config,
+    duplicates are skipped or only flagged.
+    """
+
+    def __init__(self, db_path: str, threshold: float = 0.9, num_perm: int = 128,
+                 shingle_size: int = 5, documents: str = 'skip', pages: str = 'flag',
+                 page_overlap: float = 0.75):
+        for name, action in (('documents', documents), ('pages', pages)):
+            if action not in ('skip', 'flag'):
+                raise ValueError(f"dedup.{name} must be 'skip' or 'flag', not '{action}'")
+        self.hasher = MinHasher(num_perm)
+        self.index = LSHIndex(db_path, num_perm, threshold)
+        self.shingle_size = shingle_size
+        self.page_overlap = page_overlap
+        self.skip_documents = documents == 'skip'
+        self.skip_pages = pages == 'skip'
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional['DuplicateDetector']:
+        dedup_config = config.get('dedup', {})
+        if not dedup_config.get('enabled', True):
+            return None
+        return cls(
+            dedup_config.get('db_path', 'data/dedup.sqlite'),
+            threshold=dedup_config.get('threshold', 0.9),
+            num_perm=dedup_config.get('num_perm', 128),
+            shingle_size=dedup_config.get('shingle_size', 5),
+            documents=dedup_config.get('documents', 'skip'),
+            pages=dedup_config.get('pages', 'flag'),
+            page_overlap=dedup_config.get('page_overlap', 0.75)
+        )
+
+    def signatures(self, page_metadata: List[Dict]) -> Tuple[Optional[np.ndarray], Dict[int, np.ndarray]]:
+        """(document signature, page_id -> page signature); pages without words have none."""
+        page_signatures = {}
+        for page in page_metadata:
+            signature = self.hasher.signature(shingle_hashes(page['text'], self.shingle_size))
+            if signature is not None:
+                page_signatures[page['page_id']] = signature
+        if not page_signatures:
+            return None, page_signatures
+        return np.min(np.vstack(list(page_signatures.values())), axis=0), page_signatures
+
+    def check(self, doc_metadata) -> bool:
+        """
+        Annotate a document with its near-duplicates; True if it should be skipped.
+
+        Sets doc_metadata.duplicate_of (doc_id and similarity of the
+        closest earlier document) and 'duplicate_of' on matching pages.
+        Nothing is stored: call register() once the document is indexed.
+        """
+        doc_signature, page_signatures = self.signatures(doc_metadata.page_metadata)
+        if doc_signature is None:
+            return False
+
+        doc_id = doc_metadata.doc_id
+        matched_pages = {}  # earlier doc_id -> pages of this document it contains
+        for page in doc_metadata.page_metadata:
+            signature = page_signatures.get(page['page_id'])
+            page_matches = (
+                self.index.query(signature, 'page', exclude_doc=doc_id)
+                if signature is not None else []
+            )
+            page['duplicate_of'] = page_matches[0] if page_matches else None
+            for other in {match['doc_id'] for match in page_matches}:
+                matched_pages[other] = matched_pages.get(other, 0) + 1
+        
+        matches = self.index.query(doc_signature, 'document', exclude_doc=doc_id)
+        if matches:
+            doc_metadata.duplicate_of = {
+                'doc_id': matches[0]['doc_id'], 'similarity': matches[0]['similarity']
+            }
+        elif matched_pages:
+            other, count = max(matched_pages.items(), key=lambda item: item[1])
+            overlap = count / len(page_signatures)
+            doc_metadata.duplicate_of = (
+                {'doc_id': other, 'similarity': overlap, 'matched_pages': count}
+                if overlap >= self.page_overlap else None
+            )
+        else:
+            doc_metadata.duplicate_of = None
+
+        return bool(doc_metadata.duplicate_of and self.skip_documents)
+
+    def register(self, doc_id: str, page_metadata: List[Dict]):
+        """
+        Store a document's signatures so later documents are checked against it.
+
+        Called only after the document's indices are saved, so a document
+        that failed to index is not reported as the original of its retry.
+        """
+        doc_signature, page_signatures = self.signatures(page_metadata)
+        if doc_signature is None:
+            return
+        self.index.add(
+            [(doc_id, 'document', doc_id, None, doc_signature)] +
+            [(f"{doc_id}:{page_id}", 'page', doc_id, page_id, signature)
+             for page_id, signature in page_signatures.items()]
+        )
+
+    def index_view(self, doc_metadata) -> Tuple[Dict, list]:
+        """(doc dict, page images) to embed: duplicate pages are left out when skipping them."""
+        doc_dict = doc_metadata.to_dict()
+        images = doc_metadata.page_images
+        if not self.skip_pages:
+            return doc_dict, images
+        keep = [i for i, page in enumerate(doc_dict['page_metadata']) if not page.get('duplicate_of')]
+        doc_dict['page_metadata'] = [doc_dict['page_metadata'][i] for i in keep]
+        if len(images) == len(doc_metadata.page_metadata):
+            images = [images[i] for i in keep]
+        return doc_dict, images
@@ -1,15 +1,90 @@
 import os
-from pdf2image import convert_from_path
+import time
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
 import pytesseract
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator
 import uuid
 import numpy as np
-from .utils import load_config, ensure_dir, DocumentMetadata
+from concurrent.futures import ThreadPoolExecutor
+from .utils import load_config, ensure_dir, DocumentMetadata, page_event
+from .ocr_cache import OCRCache, page_hash
+from .ocr_preprocessing import (
+    prepare_for_ocr, unrotate_words, tesseract_config, ocr_pages, ocr_settings
+)
+from .layout import PageLayout, empty_words, layout_path, save_words
+from .visual_elements import detect_visual_elements
+from .metrics import MetricsRegistry
 import logging
 
 logging.getLogger("ppocr").setLevel(logging.ERROR)
 
+# Supported page image storage formats: name -> (PIL format, file extension)
+IMAGE_FORMATS = {
+    'png': ('PNG', 'png'),
+    'jpeg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp'),
+}
+
+def save_page_image(image: Image, fp, fmt: str = 'png', quality: int = 85):
+    """Encode a page image in the configured storage format."""
+    pil_format, _ = IMAGE_FORMATS[fmt]
+    if pil_format == 'PNG':
+        # optimize=True re-runs the PNG encoder several times; skip it
+        image.save(fp, format=pil_format)
+    elif pil_format == 'JPEG':
+        image.convert('RGB').save(fp, format=pil_format, quality=quality)
+    else:
+        image.save(fp, format=pil_format, quality=quality, method=4)
+
+def resize_shortest_side(image: Image, size: int) -> Image:
+    """Downscale so the shortest side equals size (never upscales)."""
+    width, height = image.size
+    scale = size / min(width, height)
+    if scale >= 1:
+        return image.convert('RGB')
+    new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return image.convert('RGB').resize(new_size, Image.BICUBIC)
+
+def build_thumbnail_pyramid(image: Image, sizes: Dict[str, int]) -> Dict[str, Image]:
+    """Build thumbnails largest-first, each level resized from the previous one."""
+    pyramid = {}
+    source = image
+    for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        source = resize_shortest_side(source, size)
+        pyramid[name] = source
+    return pyramid
+
+class PageImageWriter:
+    """Write rendered page images to disk on a background thread."""
+    
+    def __init__(self, background: bool = True, fmt: str = 'png', quality: int = 85):
+        if fmt not in IMAGE_FORMATS:
+            raise ValueError(
+                f"Unsupported image format '{fmt}'. "
+                f"Choose one of: {', '.join(IMAGE_FORMATS)}"
+            )
+        self.fmt = fmt
+        self.quality = quality
+        self.extension = IMAGE_FORMATS[fmt][1]
+        self.executor = ThreadPoolExecutor(max_workers=1) if background else None
+        self.pending = []
+    
+    def submit(self, image: Image, image_path: str):
+        if self.executor is None:
+            self._write(image, image_path)
+            return
+        self.pending.append(self.executor.submit(self._write, image, image_path))
+    
+    def wait(self):
+        """Block until every queued image has been written."""
+        pending, self.pending = self.pending, []
+        for future in pending:
+            future.result()
+    
+    def _write(self, image: Image, image_path: str):
+        save_page_image(image, image_path, self.fmt, self.quality)
+
 class DocumentPreprocessor:
     """Extract text and images from insurance PDFs - Optimized."""
     
@@ -26,77 +101,235 @@ class DocumentPreprocessor:
                     "Please install it using: sudo apt-get install tesseract-ocr"
                 )
         
+        image_config = self.config.get('images', {})
+        self.save_pages = image_config.get('save_pages', True)
+        self.save_thumbnails = image_config.get('save_thumbnails', True)
+        self.thumbnail_sizes = dict(image_config.get('thumbnails', {}))
+        self.thumbnail_sizes.setdefault('clip', 224)
+        self.detect_elements = image_config.get('detect_elements', True)
+        self.detect_max_side = image_config.get('detect_max_side', 1200)
+        self.image_writer = PageImageWriter(
+            background=image_config.get('background_writer', True),
+            fmt=image_config.get('format', 'png'),
+            quality=image_config.get('quality', 85)
+        )
+        
+        ocr_config = self.config.get('ocr', {})
+        self.ocr_lang = ocr_config.get('lang', 'eng')
+        self.tesseract_config = tesseract_config(ocr_config.get('psm', 4), ocr_config.get('oem', 1))
+        self.ocr_preprocess = ocr_config.get('preprocess', True)
+        self.ocr_deskew = ocr_config.get('deskew', True)
+        self.ocr_text_height = ocr_config.get('target_text_height', 20)
+        self.ocr_batch_pages = max(1, ocr_config.get('batch_pages', 4))
+        # Everything that changes Tesseract's output must be part of the cache key
+        # ('words' keeps entries cached before word layouts were stored from matching,
+        # 'unrotated' those whose boxes were left in the deskewed page's frame)
+        self.ocr_settings = self.ocr_engine + '|words|unrotated|' + ocr_settings(
+            self.ocr_lang, self.tesseract_config, self.ocr_preprocess,
+            {'deskew': self.ocr_deskew, 'text_height': self.ocr_text_height}
+        )
+        self.ocr_cache = None
+        if ocr_config.get('cache', True):
+            self.ocr_cache = OCRCache(ocr_config.get('cache_path', 'data/ocr_cache.sqlite'))
+        
+        # Cache hit/miss counters; the analyzer swaps in its shared registry
+        self.metrics = MetricsRegistry()
+        
         ensure_dir(self.config['paths']['extracted_text'])
         ensure_dir(self.config['paths']['images'])
     
-    def process_pdf(self, pdf_path: str, dpi: int = 200) -> DocumentMetadata:
+    def process_pdf(self, pdf_path: str, dpi: int = 200, progress_callback=None,
+                    event_callback=None, max_pages: int = None) -> DocumentMetadata:
         """
         Process PDF with optimized DPI for faster processing.
         
         Args:
             pdf_path: Path to PDF file
             dpi: Resolution (lower=faster, higher=better quality, default 150)
+            progress_callback: Optional callable(page_num, total_pages)
+                invoked after each page is processed
+            event_callback: Optional callable(event) receiving every
+                per-page event from iter_pdf
+            max_pages: Only process the first max_pages pages
             
         Returns:
             DocumentMetadata object with processed information
         """
+        metadata = None
+        for event in self.iter_pdf(pdf_path, dpi, max_pages):
+            metadata = event['document']
+            if event_callback is not None:
+                event_callback(event)
+            if progress_callback is not None and event['stage'] == 'ocred':
+                progress_callback(event['page'], event['total'])
+        
+        return metadata
+    
+    def iter_pdf(self, pdf_path: str, dpi: int = 200,
+                 max_pages: int = None) -> Iterator[Dict]:
+        """
+        Render and OCR a PDF one page at a time, yielding per-page events.
+        
+        Emits one 'started' event, then 'rendered' and 'ocred' events for
+        each page (see utils.page_event). Every event carries the
+        DocumentMetadata being filled in under 'document', so callers can
+        act on early pages (e.g. classify) before the whole PDF is done.
+        Pages are OCRed in groups of ocr.batch_pages, so 'ocred' events
+        arrive in bursts.
+        """
         doc_id = str(uuid.uuid4())
         filename = os.path.basename(pdf_path)
         
-        print(f"Converting PDF to images (DPI: {dpi})...")
-        # Convert PDF pages to images
-        pages = convert_from_path(pdf_path, dpi=dpi, fmt='png')
+        pdf_pages = pdfinfo_from_path(pdf_path)['Pages']
+        total = min(pdf_pages, max_pages) if max_pages else pdf_pages
         
-        metadata = DocumentMetadata(doc_id, filename, len(pages))
+        metadata = DocumentMetadata(doc_id, filename, total)
+        yield page_event('started', 0, total, 0.0, document=metadata, pdf_pages=pdf_pages)
         
-        for page_num, page_image in enumerate(pages, start=1):
-            # Progress update every 10 pages
-            if page_num % 10 == 0:
-                print(f"Processing page {page_num}/{len(pages)}...")
+        pending = []  # rendered pages waiting for the next OCR batch
+        for page_num in range(1, total + 1):
+            # Render one page at a time (PPM avoids a PNG encode/decode
+            # round trip) so at most one OCR batch of full-resolution pages is held
+            start = time.perf_counter()
+            page_image = convert_from_path(
+                pdf_path, dpi=dpi, first_page=page_num, last_page=page_num
+            )[0]
+            yield page_event('rendered', page_num, total, time.perf_counter() - start,
+                             document=metadata)
             
-            # Save page image with compression
-            image_path = os.path.join(
-                self.config['paths']['images'],
-                f"{doc_id}_page_{page_num}.png"
-            )
-            page_image.save(image_path, quality=85, optimize=True)
+            start = time.perf_counter()
+            width, height = page_image.size
             
-            # Extract text using OCR
-            text = self._extract_text(page_image)
+            # Hand the page image to the background writer
+            image_path = self._image_path(doc_id, page_num)
+            if self.save_pages:
+                self.image_writer.submit(page_image, image_path)
             
-            # Save extracted text
-            text_path = os.path.join(
-                self.config['paths']['extracted_text'],
-                f"{doc_id}_page_{page_num}.txt"
-            )
-            with open(text_path, 'w', encoding='utf-8') as f:
-                f.write(text)
+            # Build the thumbnail pyramid once; the CLIP level stays in memory
+            pyramid = build_thumbnail_pyramid(page_image, self.thumbnail_sizes)
+            metadata.page_images.append(pyramid['clip'])
             
-            # Add to metadata
-            metadata.add_page(page_num, text, image_path)
-        
-        return metadata
+            thumbnails = {}
+            if self.save_thumbnails:
+                for name, thumbnail in pyramid.items():
+                    thumbnails[name] = self._image_path(doc_id, page_num, name)
+                    self.image_writer.submit(thumbnail, thumbnails[name])
+            
+            pending.append({
+                'page_num': page_num,
+                'image': page_image,
+                'image_path': image_path,
+                'width': width,
+                'height': height,
+                'thumbnails': thumbnails,
+                'seconds': time.perf_counter() - start
+            })
+            if len(pending) < self.ocr_batch_pages and page_num < total:
+                continue
+            
+            # Extract text using OCR, one Tesseract call per batch
+            # (repeated pages come from the cache)
+            start = time.perf_counter()
+            results = self._ocr_pages([page['image'] for page in pending])
+            ocr_seconds = (time.perf_counter() - start) / len(pending)
+            
+            for page, (text, words, cached) in zip(pending, results):
+                # Save extracted text and its word boxes
+                text_dir = self.config['paths']['extracted_text']
+                text_path = os.path.join(text_dir, f"{doc_id}_page_{page['page_num']}.txt")
+                with open(text_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                words_path = layout_path(text_dir, doc_id, page['page_num'])
+                save_words(words_path, words)
+                
+                # Tables, stamps, signatures and logos, found once here so
+                # the Image Agent only reads page metadata at query time.
+                # Runs on the render the boxes are stored for; the OCR words
+                # were mapped back onto it from the deskewed page
+                visual_elements = None
+                if self.detect_elements:
+                    with self.metrics.span('preprocess.visual_elements'):
+                        visual_elements = detect_visual_elements(
+                            page['image'], words, self.detect_max_side
+                        )
+                
+                # Add to metadata
+                metadata.add_page(
+                    page['page_num'], text, page['image_path'],
+                    width=page['width'], height=page['height'],
+                    thumbnails=page['thumbnails'], layout_path=words_path,
+                    visual_elements=visual_elements
+                )
+                metadata.page_layouts.append(PageLayout(text, words))
+                
+                yield page_event('ocred', page['page_num'], total, page['seconds'] + ocr_seconds,
+                                 document=metadata, cached=cached)
+            
+            # Drop the batch so the full-resolution renders can be freed
+            pending = []
     
-    def _extract_text(self, image: Image) -> str:
-        """Extract text from image using OCR."""
-        if self.ocr_engine == 'tesseract':
-            text = pytesseract.image_to_string(image, lang='eng')
-        else:
-            text = ""
+    def wait_for_writes(self):
+        """Wait for queued page images to reach disk."""
+        self.image_writer.wait()
+    
+    def _image_path(self, doc_id: str, page_num: int, variant: str = None) -> str:
+        """Path of a stored page image or one of its thumbnails."""
+        suffix = f"_{variant}" if variant else ""
+        return os.path.join(
+            self.config['paths']['images'],
+            f"{doc_id}_page_{page_num}{suffix}.{self.image_writer.extension}"
+        )
+    
+    def _ocr_pages(self, images: List[Image.Image]) -> List[Tuple[str, np.ndarray, bool]]:
+        """OCR pages through the cache; returns (text, words, served from cache) per page."""
+        results = [None] * len(images)
+        keys = [None] * len(images)
+        misses = []
+        
+        for i, image in enumerate(images):
+            if self.ocr_cache is not None:
+                keys[i] = page_hash(image, self.ocr_settings)
+                cached = self.ocr_cache.get(keys[i])
+                if cached is not None:
+                    self.metrics.count('ocr_cache.hits')
+                    results[i] = (*cached, True)
+                    continue
+                self.metrics.count('ocr_cache.misses')
+            misses.append(i)
+        
+        if misses:
+            pages = self._extract_pages([images[i] for i in misses])
+            for i, (text, words) in zip(misses, pages):
+                results[i] = (text, words, False)
+                if self.ocr_cache is not None:
+                    self.ocr_cache.put(keys[i], text, words)
         
-        return text.strip()
+        return results
     
-    def chunk_text(self, text: str) -> List[str]:
-        """Split text into overlapping chunks."""
-        chunk_size = self.config['embeddings']['chunk_size']
-        overlap = self.config['embeddings']['chunk_overlap']
+    def _extract_pages(self, images: List[Image.Image]) -> List[Tuple[str, np.ndarray]]:
+        """
+        OCR several pages with a single Tesseract invocation.
         
-        words = text.split()
-        chunks = []
+        Returns (text, word array) per page. Word boxes are page fractions,
+        which absorbs the rescaling; boxes read from a deskewed page are
+        rotated back so they line up with the original render.
+        """
+        if self.ocr_engine != 'tesseract':
+            return [("", empty_words()) for _ in images]
         
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = ' '.join(words[i:i + chunk_size])
-            if chunk.strip():
-                chunks.append(chunk)
+        if not self.ocr_preprocess:
+            return ocr_pages(images, self.ocr_lang, self.tesseract_config)
         
-        return chunks
+        prepared = [
+            prepare_for_ocr(image, self.ocr_deskew, self.ocr_text_height)
+            for image in images
+        ]
+        pages = ocr_pages([page for page, _ in prepared], self.ocr_lang, self.tesseract_config)
+        return [
+            (text, unrotate_words(words, angle, *image.size))
+            for (text, words), image, (_, angle) in zip(pages, images, prepared)
+        ]
+    
+    def _extract_text(self, image: Image) -> str:
+        """Extract text from image using OCR."""
+        return self._extract_pages([image])[0][0]
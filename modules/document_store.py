@@ -0,0 +1,216 @@
+import os
+import json
+import hashlib
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional
+from .utils import ensure_dir, sqlite_connection
+
+# Columns holding JSON documents rather than scalars
+_JSON_COLUMNS = ('classification', 'extraction_results')
+
+def file_sha256(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """Content hash used to recognise a PDF that was uploaded before."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class DocumentStore:
+    """
+    SQLite-backed document library for the UI.
+
+    Holds uploaded documents, their cached classification and extraction
+    results, and the query history, so none of it is lost (or recomputed)
+    when a browser session ends.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        ensure_dir(os.path.dirname(db_path) or '.')
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    doc_id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    file_size INTEGER DEFAULT 0,
+                    file_hash TEXT,
+                    upload_time TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    classification TEXT,
+                    processed INTEGER DEFAULT 0,
+                    extraction_results TEXT,
+                    job_id TEXT,
+                    query_count INTEGER DEFAULT 0
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS queries (
+                    query_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    doc_id TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    result TEXT,
+                    timestamp TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_status ON documents (status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_upload ON documents (upload_time)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents (file_hash)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_queries_doc ON queries (doc_id, timestamp)")
+
+    def _connect(self):
+        return sqlite_connection(self.db_path, sqlite3.Row)
+
+    @staticmethod
+    def _to_document(row: sqlite3.Row) -> Dict:
+        document = dict(row)
+        for column in _JSON_COLUMNS:
+            document[column] = json.loads(document[column]) if document[column] else None
+        document['extraction_results'] = document['extraction_results'] or {}
+        document['processed'] = bool(document['processed'])
+        return document
+
+    def add_document(self, doc_id: str, filename: str, file_path: str,
+                     file_size: int) -> Dict:
+        """
+        Register an uploaded PDF.
+
+        If a byte-identical file is already in the library, its
+        classification, extraction results and indexing state are reused.
+        """
+        file_hash = file_sha256(file_path) if os.path.exists(file_path) else None
+        previous = self.find_by_hash(file_hash) if file_hash else None
+
+        document = {
+            'doc_id': doc_id,
+            'filename': filename,
+            'file_path': file_path,
+            'file_size': file_size,
+            'file_hash': file_hash,
+            'upload_time': datetime.now().isoformat(),
+            'status': 'Uploaded',
+            'classification': None,
+            'processed': False,
+            'extraction_results': {},
+            'job_id': None,
+            'query_count': 0
+        }
+        if previous:
+            for key in ('status', 'classification', 'processed', 'extraction_results', 'job_id'):
+                document[key] = previous[key]
+            if document['status'] == 'Queried':
+                document['status'] = 'Processed'
+
+        columns = [name for name in document]
+        values = [
+            json.dumps(document[name], default=str) if name in _JSON_COLUMNS else document[name]
+            for name in columns
+        ]
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO documents ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                values
+            )
+        return document
+
+    def get_document(self, doc_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return self._to_document(row) if row else None
+
+    def find_by_hash(self, file_hash: str) -> Optional[Dict]:
+        """Most useful earlier upload of the same file (classified/processed first)."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM documents WHERE file_hash = ? "
+                "ORDER BY processed DESC, classification IS NULL, upload_time DESC LIMIT 1",
+                (file_hash,)
+            ).fetchone()
+        return self._to_document(row) if row else None
+
+    def update_document(self, doc_id: str, updates: Dict):
+        if not updates:
+            return
+        values = [
+            json.dumps(value, default=str) if name in _JSON_COLUMNS else value
+            for name, value in updates.items()
+        ]
+        columns = ', '.join(f"{name} = ?" for name in updates)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE documents SET {columns} WHERE doc_id = ?", (*values, doc_id))
+
+    def delete_document(self, doc_id: str):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM queries WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            conn.execute("COMMIT")
+
+    def list_documents(self, limit: int = 20, offset: int = 0,
+                       status: str = None) -> List[Dict]:
+        """One page of documents, newest upload first."""
+        with self._connect() as conn:
+            if status:
+                rows = conn.execute(
+                    "SELECT * FROM documents WHERE status = ? "
+                    "ORDER BY upload_time DESC LIMIT ? OFFSET ?",
+                    (status, limit, offset)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM documents ORDER BY upload_time DESC LIMIT ? OFFSET ?",
+                    (limit, offset)
+                ).fetchall()
+        return [self._to_document(row) for row in rows]
+
+    def count_documents(self, status: str = None) -> int:
+        with self._connect() as conn:
+            if status:
+                row = conn.execute(
+                    "SELECT COUNT(*) FROM documents WHERE status = ?", (status,)
+                ).fetchone()
+            else:
+                row = conn.execute("SELECT COUNT(*) FROM documents").fetchone()
+        return row[0]
+
+    def status_summary(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            row = conn.execute("""
+                SELECT COUNT(*) AS total,
+                       COALESCE(SUM(status = 'Uploaded'), 0) AS uploaded,
+                       COALESCE(SUM(classification IS NOT NULL AND classification != 'null'), 0) AS classified,
+                       COALESCE(SUM(processed), 0) AS processed,
+                       COALESCE(SUM(query_count > 0), 0) AS queried
+                FROM documents
+            """).fetchone()
+        return dict(row)
+
+    def add_query(self, doc_id: str, query: str, result: Dict):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO queries (doc_id, query, result, timestamp) VALUES (?, ?, ?, ?)",
+                (doc_id, query, json.dumps(result, default=str), datetime.now().isoformat())
+            )
+            conn.execute(
+                "UPDATE documents SET query_count = query_count + 1 WHERE doc_id = ?", (doc_id,)
+            )
+            conn.execute("COMMIT")
+
+    def get_queries(self, doc_id: str, limit: int = 50) -> List[Dict]:
+        """Query history for a document, newest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT query, result, timestamp FROM queries WHERE doc_id = ? "
+                "ORDER BY timestamp DESC LIMIT ?",
+                (doc_id, limit)
+            ).fetchall()
+        return [{
+            'query': row['query'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'timestamp': row['timestamp']
+        } for row in rows]
@@ -0,0 +1,180 @@
+import os
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+from transformers import CLIPModel
+from typing import Dict
+from .utils import ensure_dir
+
+ENCODER_BACKENDS = ('torch', 'int8', 'onnx')
+
+# Minimum cosine similarity to the fp32 embedding for a backend to pass
+MIN_COSINE_SIMILARITY = 0.99
+
+def get_encoder_backend(config: Dict) -> str:
+    """Read and validate the configured encoder backend."""
+    backend = config['models'].get('encoder_backend', 'torch')
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(
+            f"Unknown encoder backend '{backend}'. "
+            f"Choose one of: {', '.join(ENCODER_BACKENDS)}"
+        )
+    return backend
+
+def load_text_encoder(model_name: str, backend: str = 'torch') -> SentenceTransformer:
+    """
+    Load a SentenceTransformer on CPU with the requested backend.
+
+    Args:
+        model_name: HuggingFace model id
+        backend: 'torch' (fp32), 'int8' (dynamic quantization) or 'onnx'
+
+    Returns:
+        SentenceTransformer exposing the usual encode() API
+    """
+    if backend == 'onnx':
+        try:
+            return SentenceTransformer(model_name, device='cpu', backend='onnx')
+        except (TypeError, ImportError) as e:
+            raise RuntimeError(
+                "The onnx backend needs sentence-transformers>=3.2 with ONNX Runtime. "
+                "Please install it using: pip install 'sentence-transformers[onnx]'"
+            ) from e
+
+    model = SentenceTransformer(model_name, device='cpu')
+
+    if backend == 'int8':
+        torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+
+    return model
+
+def load_image_encoder(model_name: str, backend: str = 'torch', cache_dir: str = None):
+    """
+    Load CLIP on CPU with the requested backend.
+
+    The returned object exposes get_image_features() and get_text_features()
+    returning torch tensors for every backend.
+    """
+    model = CLIPModel.from_pretrained(model_name)
+    model.eval()
+
+    if backend == 'int8':
+        torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    elif backend == 'onnx':
+        if cache_dir is None:
+            cache_dir = os.path.join('data', 'models')
+        export_dir = os.path.join(cache_dir, model_name.replace('/', '__') + '_onnx')
+        return OnnxCLIPModel.from_torch(model, export_dir)
+
+    return model
+
+class _ImageFeatures(torch.nn.Module):
+    def __init__(self, model: CLIPModel):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model.get_image_features(pixel_values=pixel_values)
+
+class _TextFeatures(torch.nn.Module):
+    def __init__(self, model: CLIPModel):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model.get_text_features(
+            input_ids=input_ids, attention_mask=attention_mask
+        )
+
+class OnnxCLIPModel:
+    """CLIP image/text towers exported to ONNX and run with ONNX Runtime."""
+
+    def __init__(self, image_model_path: str, text_model_path: str):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError(
+                "ONNX Runtime is not installed. "
+                "Please install it using: pip install onnxruntime"
+            ) from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        providers = ['CPUExecutionProvider']
+        self.image_session = ort.InferenceSession(
+            image_model_path, options, providers=providers
+        )
+        self.text_session = ort.InferenceSession(
+            text_model_path, options, providers=providers
+        )
+
+    @classmethod
+    def from_torch(cls, model: CLIPModel, export_dir: str) -> 'OnnxCLIPModel':
+        """Export both towers once and reuse the exported files afterwards."""
+        image_path = os.path.join(export_dir, 'image_features.onnx')
+        text_path = os.path.join(export_dir, 'text_features.onnx')
+
+        if not (os.path.exists(image_path) and os.path.exists(text_path)):
+            ensure_dir(export_dir)
+            image_size = model.config.vision_config.image_size
+
+            with torch.no_grad():
+                torch.onnx.export(
+                    _ImageFeatures(model),
+                    (torch.zeros(1, 3, image_size, image_size),),
+                    image_path,
+                    input_names=['pixel_values'],
+                    output_names=['features'],
+                    dynamic_axes={'pixel_values': {0: 'batch'}, 'features': {0: 'batch'}},
+                    opset_version=14
+                )
+                torch.onnx.export(
+                    _TextFeatures(model),
+                    (torch.ones(1, 8, dtype=torch.long), torch.ones(1, 8, dtype=torch.long)),
+                    text_path,
+                    input_names=['input_ids', 'attention_mask'],
+                    output_names=['features'],
+                    dynamic_axes={
+                        'input_ids': {0: 'batch', 1: 'sequence'},
+                        'attention_mask': {0: 'batch', 1: 'sequence'},
+                        'features': {0: 'batch'}
+                    },
+                    opset_version=14
+                )
+
+        return cls(image_path, text_path)
+
+    def get_image_features(self, pixel_values, **kwargs) -> torch.Tensor:
+        outputs = self.image_session.run(
+            None, {'pixel_values': pixel_values.numpy().astype(np.float32)}
+        )
+        return torch.from_numpy(outputs[0])
+
+    def get_text_features(self, input_ids, attention_mask=None, **kwargs) -> torch.Tensor:
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        outputs = self.text_session.run(None, {
+            'input_ids': input_ids.numpy().astype(np.int64),
+            'attention_mask': attention_mask.numpy().astype(np.int64)
+        })
+        return torch.from_numpy(outputs[0])
+
+def compare_embeddings(reference: np.ndarray, candidate: np.ndarray) -> Dict:
+    """Compare candidate embeddings against fp32 reference embeddings row by row."""
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+
+    ref_norm = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cand_norm = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosine = np.sum(ref_norm * cand_norm, axis=1)
+
+    return {
+        'min_cosine': float(cosine.min()),
+        'mean_cosine': float(cosine.mean()),
+        'max_abs_diff': float(np.abs(reference - candidate).max()),
+        'passed': bool(cosine.min() >= MIN_COSINE_SIMILARITY)
+    }
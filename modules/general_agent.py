@@ -1,6 +1,15 @@
 import numpy as np
 from typing import Dict, List
 from .utils import load_config, normalize_vector
+from .context_builder import ContextBuilder
+
+# Fixed per agent so every request shares a cacheable prompt prefix
+SYSTEM_PROMPT = (
+    "You review retrieved excerpts of insurance documents (policies, claims, "
+    "invoices). In two or three sentences, say what kind of document the "
+    "excerpts come from and which parts are relevant to the user's question. "
+    "Use only the excerpts; do not invent numbers or names."
+)
 
 class GeneralAgent:
     """
@@ -12,6 +21,12 @@ class GeneralAgent:
         self.config = load_config(config_path)
         self.alpha = self.config['embeddings']['alpha']  # text weight
         self.beta = self.config['embeddings']['beta']    # image weight
+        self.evidence_budget = self.config['retrieval'].get('evidence_budget', 5)
+        self.context_builder = ContextBuilder.from_config(self.config)
+        self.temperature = self.config['agents']['general']['temperature']
+        self.max_tokens = self.config['agents']['general']['max_tokens']
+        # LLMClient set by the analyzer when llm.enabled; template output otherwise
+        self.llm = None
     
     def process(self, query: str, text_results: List[Dict], 
                 image_results: List[Dict]) -> Dict:
@@ -26,11 +41,17 @@ class GeneralAgent:
         Returns:
             Unified context dictionary
         """
-        # Extract relevant text chunks
-        text_context = "\n\n".join([
-            f"[Text Chunk {i+1}, Score: {r['score']:.3f}]\n{r['text']}"
-            for i, r in enumerate(text_results)
-        ])
+        # Merge both result lists into one ranked list of pages
+        evidence = self._fuse_results(text_results, image_results)
+        
+        # Downstream agents only see hits from the top fused pages
+        text_results = [r for page in evidence for r in page['text_results']]
+        image_results = [page['image_result'] for page in evidence if page['image_result']]
+        
+        # Overlapping chunks of a page become one span; the best spans
+        # within the context budget are what downstream agents read
+        text_spans = self.context_builder.build(text_results)
+        text_context = ContextBuilder.format(text_spans)
         
         # Extract relevant image information
         image_context = "\n".join([
@@ -45,7 +66,9 @@ class GeneralAgent:
             'text_context': text_context,
             'image_context': image_context,
             'text_results': text_results,
+            'text_spans': text_spans,
             'image_results': image_results,
+            'evidence': evidence,
             'fusion_weights': {
                 'text_weight': self.alpha,
                 'image_weight': self.beta
@@ -60,6 +83,52 @@ class GeneralAgent:
         
         return unified_context
     
+    def _fuse_results(self, text_results: List[Dict], 
+                      image_results: List[Dict]) -> List[Dict]:
+        """
+        Weighted page-level fusion of text and image hits.
+        
+        Scores are normalised per modality by the best hit, combined as
+        alpha * text + beta * image per (doc_id, page_id), and only the
+        top evidence_budget pages are kept.
+        """
+        pages = {}
+        
+        def page_entry(result: Dict) -> Dict:
+            metadata = result['metadata']
+            key = (metadata['doc_id'], metadata['page_id'])
+            if key not in pages:
+                pages[key] = {
+                    'doc_id': metadata['doc_id'],
+                    'page_id': metadata['page_id'],
+                    'image_path': metadata.get('image_path'),
+                    'text_score': 0.0,
+                    'image_score': 0.0,
+                    'text_results': [],
+                    'image_result': None
+                }
+            return pages[key]
+        
+        text_max = max((r['score'] for r in text_results), default=0.0) or 1.0
+        for result in text_results:
+            entry = page_entry(result)
+            entry['text_score'] = max(entry['text_score'], result['score'] / text_max)
+            entry['text_results'].append(result)
+        
+        image_max = max((r['score'] for r in image_results), default=0.0) or 1.0
+        for result in image_results:
+            entry = page_entry(result)
+            score = result['score'] / image_max
+            if score > entry['image_score']:
+                entry['image_score'] = score
+                entry['image_result'] = result
+        
+        for entry in pages.values():
+            entry['score'] = self.alpha * entry['text_score'] + self.beta * entry['image_score']
+        
+        ranked = sorted(pages.values(), key=lambda p: p['score'], reverse=True)
+        return ranked[:self.evidence_budget]
+    
     def _generate_interpretation(self, query: str, text_ctx: str, 
                                  image_ctx: str) -> str:
         """Generate preliminary interpretation of the document."""
@@ -76,6 +145,17 @@ class GeneralAgent:
         Based on the retrieved context, this appears to be an insurance document containing:
         """
         
-        # In production, this would call an LLM
-        # For now, return a structured template
-        return prompt
+        if self.llm is None:
+            return prompt
+        
+        try:
+            return self.llm.generate(
+                f"Question: {query}\n\nText excerpts:\n{text_ctx}\n\nPage images:\n{image_ctx}",
+                system=SYSTEM_PROMPT,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                agent='general'
+            )
+        except Exception as e:
+            print(f"Warning: LLM interpretation failed, using template: {e}")
+            return prompt
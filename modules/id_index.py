@@ -0,0 +1,107 @@
+import os
+import re
+import sqlite3
+from datetime import datetime
+from typing import Dict, List
+from .utils import ensure_dir, sqlite_connection
+
+# CriticalAgent fields that identify a document
+IDENTIFIER_FIELDS = ('policy_number', 'claim_number', 'invoice_number')
+
+def normalize_identifier(value: str) -> str:
+    """
+    Canonical form of an identifier for exact lookups.
+
+    Case, whitespace and separators vary between forms and OCR output, so
+    "clm-2024-0042", "CLM 2024 0042" and "CLM/2024/0042" all become
+    "CLM20240042" (the same joining the BM25 tokenizer applies).
+    """
+    return re.sub(r'[^A-Z0-9]', '', value.upper())
+
+class IdentifierIndex:
+    """
+    Persistent map from normalized identifiers to the pages they appear on.
+
+    A WITHOUT ROWID table keyed by (value, doc_id, page_id, id_type) keeps
+    each lookup a single B-tree probe however many documents are indexed.
+    Documents are added incrementally at ingest; re-adding one replaces
+    its rows.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        ensure_dir(os.path.dirname(db_path) or '.')
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS identifiers (
+                    value TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    page_id INTEGER NOT NULL,
+                    id_type TEXT NOT NULL,
+                    raw_value TEXT NOT NULL,
+                    filename TEXT,
+                    added_at TEXT NOT NULL,
+                    PRIMARY KEY (value, doc_id, page_id, id_type)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_identifiers_doc ON identifiers (doc_id)")
+
+    def _connect(self):
+        return sqlite_connection(self.db_path, sqlite3.Row)
+
+    def add_document(self, doc_id: str, identifiers: List[Dict], filename: str = None) -> int:
+        """
+        Index a document's identifiers, replacing any rows it already had.
+
+        identifiers are dicts with id_type, value and page_id (see
+        CriticalAgent.extract_identifiers). Returns the number of rows stored.
+        """
+        now = datetime.now().isoformat()
+        rows = {
+            (normalize_identifier(entry['value']), doc_id, entry['page_id'], entry['id_type']):
+                (entry['value'], filename, now)
+            for entry in identifiers
+            if normalize_identifier(entry['value'])
+        }
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM identifiers WHERE doc_id = ?", (doc_id,))
+            conn.executemany(
+                "INSERT INTO identifiers (value, doc_id, page_id, id_type, raw_value, filename, added_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [key + row for key, row in rows.items()]
+            )
+            conn.execute("COMMIT")
+        return len(rows)
+
+    def lookup(self, value: str, id_type: str = None) -> List[Dict]:
+        """Every page an identifier appears on, grouped by document."""
+        normalized = normalize_identifier(value)
+        if not normalized:
+            return []
+        with self._connect() as conn:
+            if id_type:
+                rows = conn.execute(
+                    "SELECT * FROM identifiers WHERE value = ? AND id_type = ? "
+                    "ORDER BY doc_id, page_id",
+                    (normalized, id_type)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM identifiers WHERE value = ? ORDER BY doc_id, page_id",
+                    (normalized,)
+                ).fetchall()
+        return [dict(row) for row in rows]
+
+    def remove_document(self, doc_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM identifiers WHERE doc_id = ?", (doc_id,))
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS entries, COUNT(DISTINCT value) AS identifiers, "
+                "COUNT(DISTINCT doc_id) AS documents FROM identifiers"
+            ).fetchone()
+        return dict(row)
@@ -1,12 +1,15 @@
 from typing import Dict, List
-from PIL import Image
 from .utils import load_config
-import os
+from .visual_elements import ELEMENT_KINDS, ELEMENT_LABELS
 
 class ImageAgent:
     """
     Visual reasoning on insurance document images.
     Decodes visual data from layouts, tables, stamps, signatures.
+    
+    Elements are detected once per page at ingest (see visual_elements.py)
+    and stored in the image index metadata, so answering a query is a
+    metadata lookup with no image I/O.
     """
     
     def __init__(self, config_path: str = "config.yaml"):
@@ -54,47 +57,46 @@ class ImageAgent:
             'has_stamps': False,
             'has_signatures': False,
             'has_logos': False,
-            'layout_type': 'unknown'
+            'layout_type': 'unknown',
+            'element_pages': {kind: [] for kind in ELEMENT_KINDS}
         }
         
-        # In production, this would use a vision model
-        # For now, use heuristics based on image properties
         for result in image_results:
-            image_path = result['image_path']
+            metadata = result['metadata']
+            width = metadata.get('width')
+            height = metadata.get('height')
             
-            if os.path.exists(image_path):
-                img = Image.open(image_path)
-                width, height = img.size
-                
-                # Simple heuristics
+            if width and height:
                 aspect_ratio = width / height
                 
                 if 0.7 < aspect_ratio < 0.8:
                     findings['layout_type'] = 'standard_form'
                 elif aspect_ratio > 1.2:
-                    findings['has_tables'] = True
+                    findings['layout_type'] = 'landscape'
+            
+            # Pages indexed before detection existed have no entry
+            elements = metadata.get('visual_elements') or {}
+            for kind in ELEMENT_KINDS:
+                if elements.get(kind):
+                    findings[f'has_{kind}'] = True
+                    findings['element_pages'][kind].append(metadata['page_id'])
         
         return findings
     
     def _detect_visual_elements(self, image_results: List[Dict]) -> List[str]:
-        """Detect specific visual elements in images."""
+        """Visual elements stored for the retrieved pages, best page first."""
         elements = []
         
-        # Check for common insurance document visual elements
-        common_elements = [
-            'Header section detected',
-            'Table structure identified',
-            'Signature field present',
-            'Official stamp area visible',
-            'Barcode/QR code detected'
-        ]
-        
-        # In production, use actual vision model detection
-        # For now, return placeholder
-        for result in image_results[:2]:
-            elements.extend(common_elements[:2])
+        for result in image_results:
+            metadata = result['metadata']
+            page_elements = metadata.get('visual_elements') or {}
+            for kind in ELEMENT_KINDS:
+                count = len(page_elements.get(kind, []))
+                if count:
+                    label = ELEMENT_LABELS[kind] + (f" x{count}" if count > 1 else "")
+                    elements.append(f"{label} on page {metadata['page_id']}")
         
-        return list(set(elements))
+        return elements
     
     def _cross_validate_with_text(self, visual_findings: Dict, 
                                   critical_fields: Dict) -> Dict:
@@ -115,4 +117,9 @@ class ImageAgent:
                 'Status validated by stamp presence'
             )
         
+        if visual_findings['has_signatures'] and 'claim_number' in critical_fields:
+            validation['matched_fields'].append(
+                'Claim form carries a signature'
+            )
+        
         return validation
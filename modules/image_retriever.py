@@ -1,78 +1,168 @@
 import os
-import faiss
+import time
 import numpy as np
 import torch
 from PIL import Image
-from transformers import CLIPProcessor, CLIPModel
-from typing import List, Dict
-from .utils import load_config, save_json, load_json, ensure_dir
+from transformers import CLIPProcessor
+from typing import List, Dict, Optional, Tuple
+from .utils import (
+    load_config, save_json, load_json, ensure_dir,
+    ReadWriteLock, read_locked, write_locked, page_event
+)
+from .vector_index import VectorIndex
+from .encoders import get_encoder_backend, load_image_encoder
+from .metrics import MetricsRegistry
 
 class ImageRetriever:
     """Image embedding and retrieval using CLIP (CPU only)."""
     
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", load_model: bool = True):
         self.config = load_config(config_path)
         
-        print(f"  Image Retriever using device: CPU")
+        self.backend = get_encoder_backend(self.config)
         
-        # Load CLIP model on CPU
-        model_name = self.config['models']['image_encoder']
-        self.model = CLIPModel.from_pretrained(model_name)
-        self.processor = CLIPProcessor.from_pretrained(model_name)
+        # Load CLIP model on CPU (index-only instances, e.g. the ingest writer, skip it)
+        self.model = None
+        self.processor = None
+        if load_model:
+            print(f"  Image Retriever using device: CPU ({self.backend})")
+            model_name = self.config['models']['image_encoder']
+            self.model = load_image_encoder(
+                model_name, self.backend, self.config['paths'].get('models')
+            )
+            self.processor = CLIPProcessor.from_pretrained(model_name)
         self.embedding_dim = self.config['embeddings']['image_dim']
         
-        # Use CPU-only FAISS index
-        self.index = faiss.IndexFlatL2(self.embedding_dim)
+        # CPU-only FAISS index, optionally compressed (see index.type)
+        self.index = VectorIndex.from_config(self.embedding_dim, self.config)
         
         self.image_paths = []
         self.metadata = []
+        self.doc_ids = set()
+        
+        # Optional callable(query) -> embedding, e.g. a MicroBatcher.submit
+        self.query_encoder = None
+        
+        # Concurrent searches share the index; adds, loads and saves are exclusive
+        self.lock = ReadWriteLock()
+        
+        # Stage timings; the analyzer swaps in its shared registry
+        self.metrics = MetricsRegistry()
         
         ensure_dir(self.config['paths']['embeddings'])
     
-    def add_documents(self, doc_metadata: Dict):
-        """Add document page images to the index with batch processing."""
-        images = []
-        image_info = []
+    def add_documents(self, doc_metadata: Dict, images: List[Image.Image] = None,
+                      event_callback=None):
+        """
+        Add document page images to the index with batch processing.
+        
+        Args:
+            doc_metadata: Document metadata dictionary
+            images: Optional in-memory page renders aligned with
+                page_metadata; pages are read from disk when omitted
+            event_callback: Optional callable(event) for per-page events
+        """
+        encoded = self.encode_documents(doc_metadata, images, event_callback)
+        if encoded is None:
+            print("No images found to process")
+            return
         
-        # Load all images first
-        for page in doc_metadata['page_metadata']:
-            image_path = page['image_path']
-            try:
-                image = Image.open(image_path).convert('RGB')
-                images.append(image)
-                image_info.append((image_path, page))
-            except Exception as e:
-                print(f"Warning: Could not load image {image_path}: {e}")
+        self.add_encoded(*encoded)
+    
+    def encode_documents(self, doc_metadata: Dict, images: List[Image.Image] = None,
+                         event_callback=None) -> Optional[Tuple[np.ndarray, List[Dict]]]:
+        """
+        Embed a document's pages without touching the index.
+        
+        With an event_callback, pages are encoded in batches of 16 and an
+        'embedded_image' event is emitted for each page as its batch finishes.
+        
+        Returns:
+            (embeddings, page metadata entries), or None if there are no images
+        """
+        if images is None:
+            images, pages = self._load_images(doc_metadata['page_metadata'])
+        else:
+            pages = doc_metadata['page_metadata']
         
         if not images:
-            print("No images found to process")
-            return
+            return None
         
         # Batch process all images at once for efficiency
         print(f"  Processing {len(images)} images...")
+        self.metrics.count('images', len(images))
+        batch_size = len(images) if event_callback is None else 16
+        batches = []
+        with self.metrics.span('image.embed_pages'):
+            for start in range(0, len(images), batch_size):
+                batch_start = time.perf_counter()
+                batches.append(self._encode_images(images[start:start + batch_size]))
+                
+                if event_callback is not None:
+                    seconds = (time.perf_counter() - batch_start) / len(batches[-1])
+                    for page in pages[start:start + batch_size]:
+                        event_callback(page_event('embedded_image', page['page_id'], len(pages), seconds))
+        embeddings = np.vstack(batches)
+        
+        metadata = [{
+            'doc_id': doc_metadata['doc_id'],
+            'page_id': page['page_id'],
+            'image_path': page['image_path'],
+            'width': page.get('width'),
+            'height': page.get('height'),
+            'visual_elements': page.get('visual_elements')
+        } for page in pages]
+        
+        return embeddings, metadata
+    
+    @write_locked
+    def add_encoded(self, embeddings: np.ndarray, metadata: List[Dict]):
+        """Add pre-computed page embeddings to the index."""
+        # Add all embeddings to index
+        self.index.add(embeddings.astype('float32'))
+        
+        # Store metadata
+        for entry in metadata:
+            self.image_paths.append(entry['image_path'])
+            self.metadata.append(entry)
+            self.doc_ids.add(entry['doc_id'])
+    
+    @read_locked
+    def has_document(self, doc_id: str) -> bool:
+        """True if pages of the document are already in the index."""
+        return doc_id in self.doc_ids
+    
+    def _encode_images(self, images: List[Image.Image]) -> np.ndarray:
+        """Encode a batch of images to normalized embeddings."""
         inputs = self.processor(images=images, return_tensors="pt")
         
         with torch.no_grad():
             image_features = self.model.get_image_features(**inputs)
         
-        # Normalize and add all at once
+        # Normalize
         image_features = image_features / image_features.norm(dim=-1, keepdim=True)
-        embeddings = image_features.cpu().numpy()
+        return image_features.cpu().numpy()
+    
+    def _load_images(self, page_metadata: List[Dict]):
+        """Load page images from disk for documents without in-memory renders."""
+        images = []
+        pages = []
         
-        # Add all embeddings to index
-        self.index.add(embeddings.astype('float32'))
+        for page in page_metadata:
+            image_path = page['image_path']
+            try:
+                image = Image.open(image_path).convert('RGB')
+                images.append(image)
+                pages.append(page)
+            except Exception as e:
+                print(f"Warning: Could not load image {image_path}: {e}")
         
-        # Store metadata
-        for i, (image_path, page) in enumerate(image_info):
-            self.image_paths.append(image_path)
-            self.metadata.append({
-                'doc_id': doc_metadata['doc_id'],
-                'page_id': page['page_id'],
-                'image_path': image_path
-            })
+        return images, pages
     
-    def search(self, query: str, top_k: int = None) -> List[Dict]:
-        """Search for relevant images using text query."""
+    @read_locked
+    def search(self, query: str, top_k: int = None,
+               query_embedding: np.ndarray = None) -> List[Dict]:
+        """Search for relevant images using text query (or its precomputed CLIP embedding)."""
         if top_k is None:
             top_k = self.config['retrieval']['top_k_image']
         
@@ -84,16 +174,19 @@ class ImageRetriever:
         top_k = min(top_k, len(self.image_paths))
         
         # Encode text query
-        query_embedding = self._encode_text(query)
+        if query_embedding is None:
+            with self.metrics.span('image.encode_query'):
+                query_embedding = self.encode_query(query)
         query_embedding = np.array([query_embedding]).astype('float32')
         
         # Search
-        distances, indices = self.index.search(query_embedding, top_k)
+        with self.metrics.span('image.faiss_search'):
+            distances, indices = self.index.search(query_embedding, top_k)
         
         # Prepare results
         results = []
         for idx, distance in zip(indices[0], distances[0]):
-            if idx < len(self.image_paths):
+            if 0 <= idx < len(self.image_paths):
                 results.append({
                     'image_path': self.image_paths[idx],
                     'metadata': self.metadata[idx],
@@ -102,6 +195,7 @@ class ImageRetriever:
         
         return results
     
+    @read_locked
     def search_by_image(self, image: Image, top_k: int = None) -> List[Dict]:
         """Search for similar images."""
         if top_k is None:
@@ -122,7 +216,7 @@ class ImageRetriever:
         # Prepare results
         results = []
         for idx, distance in zip(indices[0], distances[0]):
-            if idx < len(self.image_paths):
+            if 0 <= idx < len(self.image_paths):
                 results.append({
                     'image_path': self.image_paths[idx],
                     'metadata': self.metadata[idx],
@@ -143,9 +237,19 @@ class ImageRetriever:
         
         return image_features.cpu().numpy()[0]
     
+    def encode_query(self, query: str) -> np.ndarray:
+        """CLIP text embedding of one query, through query_encoder when one is set."""
+        if self.query_encoder is not None:
+            return self.query_encoder(query)
+        return self._encode_text(query)
+    
     def _encode_text(self, text: str) -> np.ndarray:
         """Encode text to embedding vector."""
-        inputs = self.processor(text=[text], return_tensors="pt", padding=True)
+        return self.encode_queries([text])[0]
+    
+    def encode_queries(self, texts: List[str]) -> np.ndarray:
+        """Encode several text queries in one forward pass."""
+        inputs = self.processor(text=texts, return_tensors="pt", padding=True)
         
         with torch.no_grad():
             text_features = self.model.get_text_features(**inputs)
@@ -153,8 +257,9 @@ class ImageRetriever:
         # Normalize
         text_features = text_features / text_features.norm(dim=-1, keepdim=True)
         
-        return text_features.cpu().numpy()[0]
+        return text_features.cpu().numpy()
     
+    @write_locked
     def save_index(self, index_path: str = None):
         """Save FAISS index and metadata."""
         if index_path is None:
@@ -163,7 +268,7 @@ class ImageRetriever:
                 'image_index.faiss'
             )
         
-        faiss.write_index(self.index, index_path)
+        self.index.save(index_path)
         
         metadata_path = index_path.replace('.faiss', '_metadata.json')
         save_json({
@@ -173,6 +278,7 @@ class ImageRetriever:
         
         print(f"  ✓ Image index saved")
     
+    @write_locked
     def load_index(self, index_path: str = None):
         """Load FAISS index and metadata."""
         if index_path is None:
@@ -181,11 +287,12 @@ class ImageRetriever:
                 'image_index.faiss'
             )
         
-        self.index = faiss.read_index(index_path)
+        self.index.load(index_path)
         
         metadata_path = index_path.replace('.faiss', '_metadata.json')
         data = load_json(metadata_path)
         self.image_paths = data['image_paths']
         self.metadata = data['metadata']
+        self.doc_ids = {entry['doc_id'] for entry in self.metadata}
         
         print(f"  ✓ Image index loaded: {len(self.image_paths)} images")
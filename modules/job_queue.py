@@ -0,0 +1,366 @@
+import os
+import time
+import uuid
+import sqlite3
+import multiprocessing
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from .utils import (
+    load_config, save_json, load_json, ensure_dir, sqlite_connection, PipelineProgress
+)
+from .chunker import ChunkStore
+from .id_index import IdentifierIndex
+from .dedup import DuplicateDetector
+from .sharding import ShardCoordinator
+
+# queued -> processing -> embedded -> indexing -> indexed, or failed at any step
+JOB_STATUSES = ('queued', 'processing', 'embedded', 'indexing', 'indexed', 'failed')
+
+class JobQueue:
+    """
+    SQLite-backed ingestion queue shared by the UI, workers and the writer.
+
+    Every call opens its own short-lived connection, so one JobQueue can be
+    used from several threads and each process simply creates its own.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        ensure_dir(os.path.dirname(db_path) or '.')
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    pdf_path TEXT NOT NULL,
+                    filename TEXT,
+                    status TEXT NOT NULL,
+                    worker_id TEXT,
+                    doc_id TEXT,
+                    pages_done INTEGER DEFAULT 0,
+                    pages_total INTEGER DEFAULT 0,
+                    stage TEXT,
+                    progress REAL DEFAULT 0,
+                    pages_per_second REAL DEFAULT 0,
+                    duplicate_of TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            
+            # Databases created before per-page progress / dedup lack these columns
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, declaration in (('stage', 'TEXT'), ('progress', 'REAL DEFAULT 0'),
+                                      ('pages_per_second', 'REAL DEFAULT 0'),
+                                      ('duplicate_of', 'TEXT')):
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {declaration}")
+
+    def _connect(self):
+        return sqlite_connection(self.db_path, sqlite3.Row)
+
+    def enqueue(self, pdf_path: str, filename: str = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, pdf_path, filename, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, pdf_path, filename or os.path.basename(pdf_path), now, now)
+            )
+        return job_id
+
+    def claim(self, worker_id: str, status: str = 'queued',
+              new_status: str = 'processing') -> Optional[Dict]:
+        """Atomically take the oldest job in `status` and move it to `new_status`."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (status,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, updated_at = ? WHERE job_id = ?",
+                (new_status, worker_id, datetime.now().isoformat(), row['job_id'])
+            )
+            conn.execute("COMMIT")
+        job = dict(row)
+        job['status'] = new_status
+        return job
+
+    def update(self, job_id: str, **fields):
+        fields['updated_at'] = datetime.now().isoformat()
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {columns} WHERE job_id = ?",
+                (*fields.values(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_jobs(self, status: str = None, limit: int = 50) -> List[Dict]:
+        with self._connect() as conn:
+            if status:
+                rows = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                    (status, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+                ).fetchall()
+        return [dict(row) for row in rows]
+
+    def requeue_stale(self) -> int:
+        """Reset jobs interrupted by a dead worker or writer so they run again."""
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            processing = conn.execute(
+                "UPDATE jobs SET status = 'queued', pages_done = 0, stage = NULL, progress = 0, "
+                "updated_at = ? "
+                "WHERE status = 'processing'",
+                (now,)
+            ).rowcount
+            indexing = conn.execute(
+                "UPDATE jobs SET status = 'embedded', updated_at = ? WHERE status = 'indexing'",
+                (now,)
+            ).rowcount
+        return processing + indexing
+
+def _spool_paths(spool_dir: str, job_id: str):
+    return (
+        os.path.join(spool_dir, f"{job_id}.npz"),
+        os.path.join(spool_dir, f"{job_id}.json")
+    )
+
+def worker_main(config_path: str, worker_id: str, threads: int = None):
+    """Worker process: OCR and embed queued documents, then hand them to the writer."""
+    # Imported here so the spawn start method only loads models in workers
+    import torch
+    from .document_preprocessor import DocumentPreprocessor
+    from .text_retriever import TextRetriever
+    from .image_retriever import ImageRetriever
+    from .critical_agent import CriticalAgent
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    config = load_config(config_path)
+    job_config = config['jobs']
+    queue = JobQueue(job_config['db_path'])
+    spool_dir = job_config['spool_dir']
+    ensure_dir(spool_dir)
+
+    preprocessor = DocumentPreprocessor(config_path)
+    text_retriever = TextRetriever(config_path)
+    image_retriever = ImageRetriever(config_path)
+    critical_agent = CriticalAgent(config_path)
+    dedup = DuplicateDetector.from_config(config)
+
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            time.sleep(job_config.get('poll_interval', 1.0))
+            continue
+
+        job_id = job['job_id']
+        progress = PipelineProgress()
+        
+        def on_event(event, job_id=job_id, progress=progress):
+            progress.update(event)
+            stage = event['stage']
+            if stage not in progress.stages:
+                return
+            queue.update(
+                job_id, stage=stage, pages_done=progress.done[stage],
+                pages_total=progress.total, progress=progress.fraction,
+                pages_per_second=progress.pages_per_second(stage)
+            )
+        
+        try:
+            doc_metadata = preprocessor.process_pdf(
+                job['pdf_path'], dpi=150, event_callback=on_event
+            )
+            index_dict, page_images = doc_metadata.to_dict(), doc_metadata.page_images
+            if dedup is not None:
+                # Checked against indexed documents; the index writer registers this one
+                if dedup.check(doc_metadata):
+                    preprocessor.wait_for_writes()
+                    queue.update(job_id, status='indexed', doc_id=doc_metadata.duplicate_of['doc_id'],
+                                 duplicate_of=doc_metadata.duplicate_of['doc_id'])
+                    continue
+                index_dict, page_images = dedup.index_view(doc_metadata)
+            doc_metadata.fields = critical_agent.extract_document_fields(doc_metadata)
+            identifiers = critical_agent.extract_identifiers(doc_metadata)
+            doc_dict = doc_metadata.to_dict()
+            text_encoded = text_retriever.encode_documents(index_dict, event_callback=on_event)
+            image_encoded = image_retriever.encode_documents(
+                index_dict, images=page_images, event_callback=on_event
+            )
+            preprocessor.wait_for_writes()
+
+            arrays_path, manifest_path = _spool_paths(spool_dir, job_id)
+            arrays = {}
+            manifest = {'doc_metadata': doc_dict, 'identifiers': identifiers}
+            if text_encoded is not None:
+                arrays['text_embeddings'] = text_encoded[0]
+                manifest['text_chunks'] = text_encoded[1].to_dict()
+                manifest['text_metadata'] = text_encoded[2]
+            if image_encoded is not None:
+                arrays['image_embeddings'] = image_encoded[0]
+                manifest['image_metadata'] = image_encoded[1]
+            np.savez(arrays_path, **arrays)
+
+            # The manifest is written last and atomically; the writer relies on it
+            save_json(manifest, manifest_path + '.tmp')
+            os.replace(manifest_path + '.tmp', manifest_path)
+
+            queue.update(job_id, status='embedded', doc_id=doc_metadata.doc_id)
+        except Exception as e:
+            queue.update(job_id, status='failed', error=str(e))
+
+class IndexWriter:
+    """
+    The single process allowed to modify the on-disk indices.
+
+    Merges spooled embeddings from workers into the text and image indices
+    (or, with sharding enabled, sends them to each document's shard) and
+    saves them once per batch of finished jobs. Merged documents are
+    registered for near-duplicate checks only after that save. Documents
+    already in the indices are not added again, so jobs requeued after a
+    crash between the save and marking them 'indexed' are merged safely.
+    """
+
+    def __init__(self, config_path: str = "config.yaml"):
+        from .text_retriever import TextRetriever
+        from .image_retriever import ImageRetriever
+
+        self.config = load_config(config_path)
+        self.queue = JobQueue(self.config['jobs']['db_path'])
+        self.spool_dir = self.config['jobs']['spool_dir']
+
+        self.text_retriever = TextRetriever(config_path, load_model=False)
+        self.image_retriever = ImageRetriever(config_path, load_model=False)
+        self.id_index = IdentifierIndex(
+            self.config.get('identifiers', {}).get('db_path', 'data/identifiers.sqlite')
+        )
+        self.dedup = DuplicateDetector.from_config(self.config)
+        # Shard servers own the indices when sharding is on
+        self.shards = ShardCoordinator.from_config(self.config)
+
+        embeddings_dir = self.config['paths']['embeddings']
+        if self.shards is None:
+            if os.path.exists(os.path.join(embeddings_dir, 'text_index.faiss')):
+                self.text_retriever.load_index()
+            if os.path.exists(os.path.join(embeddings_dir, 'image_index.faiss')):
+                self.image_retriever.load_index()
+
+    def run_once(self) -> int:
+        """Index every embedded job; returns how many were merged."""
+        merged = {}  # job_id -> doc metadata dict
+        while True:
+            job = self.queue.claim('writer', status='embedded', new_status='indexing')
+            if job is None:
+                break
+            try:
+                merged[job['job_id']] = self._merge(job['job_id'])
+            except Exception as e:
+                self.queue.update(job['job_id'], status='failed', error=str(e))
+
+        if merged:
+            if self.shards is None:
+                self.text_retriever.save_index()
+                self.image_retriever.save_index()
+            else:
+                self.shards.save()
+            for job_id, doc_metadata in merged.items():
+                if self.dedup is not None:
+                    self.dedup.register(doc_metadata['doc_id'], doc_metadata['page_metadata'])
+                self.queue.update(job_id, status='indexed')
+                for path in _spool_paths(self.spool_dir, job_id):
+                    os.remove(path)
+
+        return len(merged)
+
+    def _merge(self, job_id: str) -> Dict:
+        arrays_path, manifest_path = _spool_paths(self.spool_dir, job_id)
+        manifest = load_json(manifest_path)
+        arrays = np.load(arrays_path)
+
+        text_encoded = image_encoded = None
+        if 'text_embeddings' in arrays:
+            text_encoded = (
+                arrays['text_embeddings'], ChunkStore.from_dict(manifest['text_chunks']),
+                manifest['text_metadata']
+            )
+        if 'image_embeddings' in arrays:
+            image_encoded = (arrays['image_embeddings'], manifest['image_metadata'])
+
+        doc_metadata = manifest['doc_metadata']
+        doc_id = doc_metadata['doc_id']
+        if self.shards is not None:
+            self.shards.add(doc_id, text_encoded, image_encoded)
+        else:
+            # A writer that died after saving but before marking its jobs
+            # 'indexed' merges them again on restart; skip what is already in
+            if text_encoded is not None and not self.text_retriever.has_document(doc_id):
+                self.text_retriever.add_encoded(*text_encoded)
+            if image_encoded is not None and not self.image_retriever.has_document(doc_id):
+                self.image_retriever.add_encoded(*image_encoded)
+
+        self.id_index.add_document(doc_id, manifest.get('identifiers', []), doc_metadata['filename'])
+        save_json(doc_metadata, os.path.join(
+            self.config['paths']['results'], f"{doc_id}_metadata.json"
+        ))
+        return doc_metadata
+
+    def run_forever(self):
+        poll_interval = self.config['jobs'].get('poll_interval', 1.0)
+        while True:
+            if not self.run_once():
+                time.sleep(poll_interval)
+
+def run_pool(config_path: str = "config.yaml", workers: int = None):
+    """Start worker processes and run the index writer in this process."""
+    config = load_config(config_path)
+    job_config = config['jobs']
+    workers = workers or job_config.get('workers', 2)
+    ensure_dir(config['paths']['results'])
+
+    queue = JobQueue(job_config['db_path'])
+    requeued = queue.requeue_stale()
+    if requeued:
+        print(f"Re-queued {requeued} interrupted jobs")
+
+    # Split cores between workers so torch threads don't oversubscribe
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(
+            target=worker_main, args=(config_path, f"worker-{i}", threads), daemon=True
+        )
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    print(f"Started {workers} ingest workers ({threads} threads each)")
+
+    writer = IndexWriter(config_path)
+    try:
+        writer.run_forever()
+    except KeyboardInterrupt:
+        print("Stopping ingest workers...")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
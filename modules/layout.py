@@ -0,0 +1,210 @@
+import os
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+# One record per OCR word. Boxes are fractions of the page size, so they
+# apply to the stored page image and every thumbnail regardless of the
+# scale OCR ran at; start/end index into the page text.
+WORD_DTYPE = np.dtype([
+    ('x0', 'f4'), ('y0', 'f4'), ('x1', 'f4'), ('y1', 'f4'),
+    ('conf', 'i1'),     # Tesseract word confidence, 0-100 (-1 if unknown)
+    ('block', 'u2'),
+    ('line', 'u2'),     # running line number on the page
+    ('start', 'u4'), ('end', 'u4'),
+])
+
+# Tesseract TSV levels
+PAGE_LEVEL = 1
+WORD_LEVEL = 5
+
+def empty_words() -> np.ndarray:
+    return np.zeros(0, dtype=WORD_DTYPE)
+
+def from_tesseract_data(data: Dict) -> List[Tuple[str, np.ndarray]]:
+    """
+    Split pytesseract.image_to_data(output_type=DICT) output into pages.
+
+    Returns (text, words) per page in page order. The text is rebuilt from
+    the words the way image_to_string lays it out (lines joined by
+    newlines, blank lines between paragraphs), so the character offsets in
+    words index straight into it.
+    """
+    pages = {}
+    sizes = {}
+    for i, level in enumerate(data['level']):
+        page_num = int(data['page_num'][i])
+        if level == PAGE_LEVEL:
+            sizes[page_num] = (max(1, int(data['width'][i])), max(1, int(data['height'][i])))
+            pages.setdefault(page_num, [])
+        elif level == WORD_LEVEL and str(data['text'][i]).strip():
+            pages.setdefault(page_num, []).append(i)
+
+    results = []
+    for page_num in sorted(pages):
+        width, height = sizes.get(page_num, (1, 1))
+        rows = pages[page_num]
+        words = np.zeros(len(rows), dtype=WORD_DTYPE)
+        parts = []
+        offset = 0
+        line = 0
+        previous = None
+        for n, i in enumerate(rows):
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            if previous is not None:
+                if key[:2] != previous[:2]:
+                    separator = '\n\n'
+                elif key != previous:
+                    separator = '\n'
+                else:
+                    separator = ' '
+                if separator != ' ':
+                    line += 1
+                parts.append(separator)
+                offset += len(separator)
+            previous = key
+
+            word = str(data['text'][i]).strip()
+            left, top = int(data['left'][i]), int(data['top'][i])
+            words[n] = (
+                left / width, top / height,
+                (left + int(data['width'][i])) / width, (top + int(data['height'][i])) / height,
+                max(-1, min(100, int(float(data['conf'][i])))),
+                int(data['block_num'][i]), line,
+                offset, offset + len(word)
+            )
+            parts.append(word)
+            offset += len(word)
+        results.append((''.join(parts), words))
+    return results
+
+def to_bytes(words: np.ndarray) -> bytes:
+    return np.ascontiguousarray(words, dtype=WORD_DTYPE).tobytes()
+
+def from_bytes(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=WORD_DTYPE).copy()
+
+def layout_path(directory: str, doc_id: str, page_id: int) -> str:
+    """Word array file stored next to the page's extracted text."""
+    return os.path.join(directory, f"{doc_id}_page_{page_id}_words.npy")
+
+def save_words(path: str, words: np.ndarray):
+    np.save(path, np.asarray(words, dtype=WORD_DTYPE), allow_pickle=False)
+
+class PageLayout:
+    """
+    Page text plus its word array, with indexed spatial lookups.
+
+    Words are in reading order with increasing character offsets, so a
+    text span maps to its words by binary search, and "the value next to
+    this label" is a comparison over one line's rows instead of another
+    regex pass over the whole document.
+    """
+
+    def __init__(self, text: str, words: np.ndarray):
+        self.text = text
+        self.words = words
+
+    @classmethod
+    def load(cls, directory: str, doc_id: str, page_id: int) -> Optional['PageLayout']:
+        """Load a page saved by DocumentPreprocessor, or None if it has no layout."""
+        words_path = layout_path(directory, doc_id, page_id)
+        text_path = os.path.join(directory, f"{doc_id}_page_{page_id}.txt")
+        if not (os.path.exists(words_path) and os.path.exists(text_path)):
+            return None
+        with open(text_path, encoding='utf-8') as f:
+            text = f.read()
+        return cls(text, np.load(words_path, allow_pickle=False))
+
+    def __len__(self):
+        return len(self.words)
+
+    def word_text(self, index: int) -> str:
+        word = self.words[index]
+        return self.text[word['start']:word['end']]
+
+    def span_words(self, start: int, end: int) -> np.ndarray:
+        """Indices of the words overlapping text[start:end]."""
+        first = np.searchsorted(self.words['end'], start, side='right')
+        last = np.searchsorted(self.words['start'], end, side='left')
+        return np.arange(first, last)
+
+    def bbox(self, indices: np.ndarray) -> Optional[Tuple[float, float, float, float]]:
+        """Union box of some words, as page fractions."""
+        if len(indices) == 0:
+            return None
+        words = self.words[indices]
+        return (float(words['x0'].min()), float(words['y0'].min()),
+                float(words['x1'].max()), float(words['y1'].max()))
+
+    def find(self, value: str) -> List[Tuple[float, float, float, float]]:
+        """Boxes of every occurrence of value on the page (case-insensitive)."""
+        boxes = []
+        if not value:
+            return boxes
+        for match in re.finditer(re.escape(value), self.text, re.IGNORECASE):
+            box = self.bbox(self.span_words(match.start(), match.end()))
+            if box is not None:
+                boxes.append(box)
+        return boxes
+
+    def words_in(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        """Indices of the words intersecting a region."""
+        words = self.words
+        mask = (words['x1'] > x0) & (words['x0'] < x1) & (words['y1'] > y0) & (words['y0'] < y1)
+        return np.flatnonzero(mask)
+
+    def key_values(self, label: str, max_gap_chars: float = 4.0) -> Iterator[Dict]:
+        """
+        Values laid out next to a label, for each place the label occurs.
+
+        The value is the run of words right of the label on its line, up
+        to the first gap wider than max_gap_chars label characters; if
+        nothing follows on the line, the words directly below it on the
+        next line. Yields dicts with value, confidence (0-1) and box.
+        """
+        words = self.words
+        for match in re.finditer(label, self.text, re.IGNORECASE):
+            label_words = self.span_words(match.start(), match.end())
+            if len(label_words) == 0:
+                continue
+            first, last = label_words[0], label_words[-1]
+            line = words['line'][last]
+            x0, _, x1, _ = self.bbox(label_words)
+            char_width = (x1 - x0) / max(1, match.end() - match.start())
+
+            value = []
+            # Punctuation glued to the label ("No.:") stays with the label
+            start = max(match.end(), int(words['end'][last]))
+            i = last + 1
+            previous_x1 = words['x1'][last]
+            while i < len(words) and words['line'][i] == line:
+                if words['x0'][i] - previous_x1 > max_gap_chars * char_width:
+                    break
+                value.append(i)
+                previous_x1 = words['x1'][i]
+                i += 1
+
+            if value:
+                text = self.text[start:words['end'][value[-1]]]
+            else:
+                below = np.flatnonzero(
+                    (words['line'] == line + 1) & (words['x1'] > x0) & (words['x0'] < x1 + (x1 - x0))
+                )
+                if len(below) == 0:
+                    continue
+                value = list(below)
+                text = ' '.join(self.word_text(i) for i in value)
+
+            text = text.strip().lstrip(':#-').strip()
+            if not text:
+                continue
+            confidences = words['conf'][value]
+            confidences = confidences[confidences >= 0]
+            yield {
+                'label': self.text[match.start():match.end()],
+                'value': text,
+                'confidence': float(confidences.mean()) / 100 if len(confidences) else 0.0,
+                'box': self.bbox(np.asarray(value)),
+                'label_box': self.bbox(np.arange(first, last + 1)),
+            }
@@ -0,0 +1,174 @@
+import re
+import math
+import numpy as np
+from array import array
+from collections import Counter
+from typing import List, Tuple
+
+# Words plus identifiers joined by - or / (e.g. CLM-2024-0042, 12/05/2024)
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+(?:[\-/][a-z0-9]+)*')
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase tokens for BM25.
+
+    Compound identifiers are indexed whole, with separators stripped and as
+    their parts, so "CLM-2024-0042", "CLM20240042" and "2024" all match.
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if '-' in token or '/' in token:
+            parts = re.split(r'[\-/]', token)
+            tokens.append(''.join(parts))
+            tokens.extend(parts)
+    return tokens
+
+def is_identifier_query(query: str) -> bool:
+    """True when the query is a single token containing digits, like an ID."""
+    tokens = TOKEN_PATTERN.findall(query.lower())
+    return len(tokens) == 1 and any(c.isdigit() for c in tokens[0])
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring.
+
+    Postings are kept as compact unsigned arrays per term and extended in
+    place as chunks are added, so documents can be indexed incrementally.
+    Document ids are positions, matching the FAISS ids of the same chunks.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, max_df_ratio: float = 0.5):
+        self.k1 = k1
+        self.b = b
+        self.max_df_ratio = max_df_ratio
+        self.postings = {}  # term -> (array of doc ids, array of term frequencies)
+        self.doc_lengths = array('I')
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, texts: List[str]):
+        """Index texts, assigning ids after the ones already present."""
+        for text in texts:
+            doc_id = len(self.doc_lengths)
+            counts = Counter(tokenize(text))
+            length = sum(counts.values())
+            self.doc_lengths.append(length)
+            self.total_length += length
+
+            for term, tf in counts.items():
+                if term not in self.postings:
+                    self.postings[term] = (array('I'), array('I'))
+                ids, tfs = self.postings[term]
+                ids.append(doc_id)
+                tfs.append(tf)
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """Return up to top_k (doc_id, score) pairs, best first."""
+        n_docs = len(self.doc_lengths)
+        if n_docs == 0:
+            return []
+
+        avg_length = self.total_length / n_docs
+
+        terms = [t for t in set(tokenize(query)) if t in self.postings]
+        # Terms found in most chunks barely move BM25 but have the longest
+        # postings; skip them unless the query has nothing rarer
+        rare_terms = [t for t in terms if len(self.postings[t][0]) <= self.max_df_ratio * n_docs]
+        if rare_terms:
+            terms = rare_terms
+
+        if not terms:
+            return []
+
+        doc_lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32)
+        all_ids = []
+        all_scores = []
+
+        for term in terms:
+            ids, tfs = self.postings[term]
+            ids = np.frombuffer(ids, dtype=np.uint32)
+            tfs = np.frombuffer(tfs, dtype=np.uint32).astype(np.float32)
+            df = len(ids)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[ids] / avg_length)
+            all_ids.append(ids)
+            all_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+        # Sum per-term contributions for chunks matching several terms
+        doc_ids, inverse = np.unique(np.concatenate(all_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+
+        k = min(top_k, len(doc_ids))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(doc_ids[i]), float(scores[i])) for i in best]
+
+    def save(self, path: str):
+        """Write the index as flat CSR-style arrays."""
+        terms = list(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(self.postings[term][0])
+
+        doc_ids = np.empty(offsets[-1], dtype=np.uint32)
+        tfs = np.empty(offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(terms):
+            ids, freqs = self.postings[term]
+            doc_ids[offsets[i]:offsets[i + 1]] = ids
+            tfs[offsets[i]:offsets[i + 1]] = np.minimum(freqs, np.iinfo(np.uint16).max)
+
+        np.savez_compressed(
+            path,
+            terms=np.array('\n'.join(terms)),
+            offsets=offsets,
+            doc_ids=doc_ids,
+            tfs=tfs,
+            doc_lengths=np.frombuffer(self.doc_lengths, dtype=np.uint32),
+            params=np.array([self.k1, self.b])
+        )
+
+    def load(self, path: str):
+        data = np.load(path)
+        joined = str(data['terms'])
+        terms = joined.split('\n') if joined else []
+        offsets = data['offsets']
+        doc_ids = data['doc_ids']
+        tfs = data['tfs'].astype(np.uint32)
+
+        self.k1, self.b = (float(x) for x in data['params'])
+        self.postings = {
+            term: (
+                array('I', doc_ids[offsets[i]:offsets[i + 1]].tobytes()),
+                array('I', tfs[offsets[i]:offsets[i + 1]].tobytes())
+            )
+            for i, term in enumerate(terms)
+        }
+        self.doc_lengths = array('I', data['doc_lengths'].astype(np.uint32).tobytes())
+        self.total_length = int(sum(self.doc_lengths))
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuse ranked id lists with reciprocal-rank fusion.
+
+    Scores are normalised so an id ranked first in every non-empty list
+    scores 1.0.
+    """
+    rankings = [r for r in rankings if r]
+    if not rankings:
+        return []
+
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+
+    best_possible = len(rankings) / (k + 1)
+    return sorted(
+        ((doc_id, score / best_possible) for doc_id, score in fused.items()),
+        key=lambda item: item[1],
+        reverse=True
+    )
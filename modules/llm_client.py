@@ -0,0 +1,195 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from .batching import MicroBatcher
+from .metrics import Histogram, MetricsRegistry
+
+# Generation speed buckets (completion tokens per second)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+class LLMClient:
+    """
+    Chat client for an OpenAI-compatible server (vLLM, llama.cpp, TGI,
+    or scripts/llm_stub_server.py), shared by the agents.
+
+    Prompts are (system, user) pairs. Each agent keeps its instructions in a
+    fixed system prompt, so every request of that agent starts with the same
+    tokens and the server's prefix cache can reuse them. Concurrent prompts
+    with the same sampling settings are collected by a MicroBatcher. Each
+    batch is deduplicated and grouped by system prompt. One request per
+    group is sent first to warm that prefix; the rest of the group follows
+    in parallel and lands in the server's continuous batch together.
+    Full responses are kept in an LRU cache keyed by prompt and settings.
+    """
+
+    def __init__(self, base_url: str, model: str, api_key: str = 'not-needed',
+                 timeout: float = 60.0, max_batch_size: int = 8, max_wait_ms: float = 20.0,
+                 max_concurrency: int = 8, cache_size: int = 1024):
+        try:
+            from openai import OpenAI
+        except ImportError as e:
+            raise RuntimeError(
+                "The openai package is not installed. "
+                "Please install it using: pip install openai"
+            ) from e
+
+        self.client = OpenAI(base_url=base_url, api_key=api_key, timeout=timeout)
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._batchers: Dict[Tuple[float, int], MicroBatcher] = {}
+        self._batchers_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+        self.tokens_per_second = Histogram('llm_tokens_per_second', buckets=TOKENS_PER_SECOND_BUCKETS)
+        # Request timings and token counts; the analyzer swaps in its shared registry
+        self.metrics = MetricsRegistry()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional['LLMClient']:
+        llm_config = config.get('llm', {})
+        if not llm_config.get('enabled', False):
+            return None
+        return cls(
+            llm_config.get('base_url', 'http://127.0.0.1:8001/v1'),
+            llm_config.get('model') or config['models']['text_llm'],
+            api_key=llm_config.get('api_key', 'not-needed'),
+            timeout=llm_config.get('timeout', 60),
+            max_batch_size=llm_config.get('max_batch_size', 8),
+            max_wait_ms=llm_config.get('batch_window_ms', 20),
+            max_concurrency=llm_config.get('max_concurrency', 8),
+            cache_size=llm_config.get('cache_size', 1024)
+        )
+
+    def _cache_key(self, system: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (self.model, system or '', prompt, f"{temperature}:{max_tokens}"):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _cached(self, key: str) -> Optional[str]:
+        with self._cache_lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        return None
+
+    def _store(self, key: str, text: str):
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self.cache[key] = text
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def _batcher(self, temperature: float, max_tokens: int) -> MicroBatcher:
+        settings = (float(temperature), int(max_tokens))
+        with self._batchers_lock:
+            if settings not in self._batchers:
+                self._batchers[settings] = MicroBatcher(
+                    lambda items: self._run_batch(items, *settings),
+                    max_batch_size=self.max_batch_size,
+                    max_wait_ms=self.max_wait_ms,
+                    name='llm'
+                )
+            return self._batchers[settings]
+
+    def generate(self, prompt: str, system: str = None, temperature: float = 0.0,
+                 max_tokens: int = 256, agent: str = 'llm') -> str:
+        """Completion text for one prompt; blocks until its batch has run."""
+        key = self._cache_key(system, prompt, temperature, max_tokens)
+        cached = self._cached(key)
+        if cached is not None:
+            self.metrics.count('llm_cache_hits')
+            return cached
+        with self.metrics.span(f"llm.{agent}"):
+            return self._batcher(temperature, max_tokens).submit((system, prompt))
+
+    def generate_many(self, prompts: List[str], system: str = None, temperature: float = 0.0,
+                      max_tokens: int = 256, agent: str = 'llm') -> List[str]:
+        """Completions for several prompts from one caller, sent as one batch."""
+        keys = [self._cache_key(system, prompt, temperature, max_tokens) for prompt in prompts]
+        results = [self._cached(key) for key in keys]
+        missing = [(system, prompt) for prompt, result in zip(prompts, results) if result is None]
+        self.metrics.count('llm_cache_hits', len(prompts) - len(missing))
+        if missing:
+            with self.metrics.span(f"llm.{agent}"):
+                generated = self._run_batch(missing, temperature, max_tokens)
+            for result in generated:
+                if isinstance(result, Exception):
+                    raise result
+            generated = iter(generated)
+            results = [result if result is not None else next(generated) for result in results]
+        return results
+
+    def _run_batch(self, items: List[Tuple[str, str]], temperature: float,
+                   max_tokens: int) -> List:
+        """
+        Completion per item, or the exception its request raised.
+
+        A failed request only fails the prompts that asked for it; the
+        MicroBatcher raises it in their callers alone.
+        """
+        unique = list(dict.fromkeys(items))
+        groups = {}
+        for item in unique:
+            groups.setdefault(item[0], []).append(item)
+
+        def chat(item):
+            try:
+                return self._chat(item[0], item[1], temperature, max_tokens)
+            except Exception as e:
+                self.metrics.count('llm_errors')
+                return e
+
+        leaders = [group[0] for group in groups.values()]
+        followers = [item for group in groups.values() for item in group[1:]]
+        texts = {}
+        for wave in (leaders, followers):
+            for item, text in zip(wave, self.executor.map(chat, wave)):
+                texts[item] = text
+        self.metrics.count('llm_requests', len(unique))
+        return [texts[item] for item in items]
+
+    def _chat(self, system: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        messages = [{'role': 'system', 'content': system}] if system else []
+        messages.append({'role': 'user', 'content': prompt})
+
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        seconds = time.perf_counter() - start
+
+        self.metrics.histogram('llm.request').observe(seconds)
+        usage = response.usage
+        if usage is not None:
+            self.metrics.count('llm_prompt_tokens', usage.prompt_tokens or 0)
+            self.metrics.count('llm_completion_tokens', usage.completion_tokens or 0)
+            if usage.completion_tokens and seconds > 0:
+                self.tokens_per_second.observe(usage.completion_tokens / seconds)
+
+        text = (response.choices[0].message.content or '').strip()
+        self._store(self._cache_key(system, prompt, temperature, max_tokens), text)
+        return text
+
+    def stats(self) -> Dict:
+        return {
+            'model': self.model,
+            'cached_responses': len(self.cache),
+            'tokens_per_second': self.tokens_per_second.snapshot(),
+            'batching': {
+                f"{temperature}/{max_tokens}": batcher.batch_sizes.snapshot()
+                for (temperature, max_tokens), batcher in self._batchers.items()
+            }
+        }
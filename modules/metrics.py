@@ -0,0 +1,175 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+# Default latency buckets in seconds (upper bounds, Prometheus style)
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+class Histogram:
+    """Thread-safe cumulative histogram (latencies in seconds by default)."""
+
+    def __init__(self, name: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[slot] += 1
+            self.total += seconds
+            self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket containing it."""
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+        if count == 0:
+            return 0.0
+
+        target = q * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            seen += bucket_count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.total, self.count
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], counts))
+        }
+
+    def to_prometheus(self, labels: Dict[str, str] = None, name: str = None) -> List[str]:
+        """Render as Prometheus text exposition lines (optionally renamed)."""
+        name = name or self.name
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.total, self.count
+
+        label_text = ','.join(f'{k}="{v}"' for k, v in (labels or {}).items())
+        prefix = label_text + ',' if label_text else ''
+        suffix = '{' + label_text + '}' if label_text else ''
+
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip([str(b) for b in self.buckets] + ['+Inf'], counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{suffix} {total}')
+        lines.append(f'{name}_count{suffix} {count}')
+        return lines
+
+class Counter:
+    """Thread-safe monotonically increasing counter."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+class SpanTimer:
+    """Handle yielded by MetricsRegistry.span; holds the duration once it exits."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+
+class MetricsRegistry:
+    """
+    Named span timers and counters for one pipeline.
+
+    Spans are timed with `with registry.span('query.encode'):` and recorded
+    in a Histogram per name; counters track pages, chunks, cache hits and
+    the like. Dots in names become underscores in Prometheus output.
+    """
+
+    def __init__(self, prefix: str = 'analyzer'):
+        self.prefix = prefix
+        self.spans: Dict[str, Histogram] = {}
+        self.counters: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str) -> Histogram:
+        with self._lock:
+            if name not in self.spans:
+                self.spans[name] = Histogram(name)
+            return self.spans[name]
+
+    def counter(self, name: str) -> Counter:
+        with self._lock:
+            if name not in self.counters:
+                self.counters[name] = Counter(name)
+            return self.counters[name]
+
+    @contextmanager
+    def span(self, name: str):
+        timer = SpanTimer(name)
+        start = time.perf_counter()
+        try:
+            yield timer
+        finally:
+            timer.seconds = time.perf_counter() - start
+            self.histogram(name).observe(timer.seconds)
+
+    def count(self, name: str, amount: int = 1):
+        self.counter(name).inc(amount)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            spans = dict(self.spans)
+            counters = dict(self.counters)
+        return {
+            'spans': {name: histogram.snapshot() for name, histogram in sorted(spans.items())},
+            'counters': {name: counter.value for name, counter in sorted(counters.items())}
+        }
+
+    def to_prometheus(self) -> List[str]:
+        """Spans as one labelled histogram, counters as one metric each."""
+        with self._lock:
+            spans = dict(self.spans)
+            counters = dict(self.counters)
+
+        span_metric = f'{self.prefix}_span_seconds'
+        lines = [f'# TYPE {span_metric} histogram']
+        for name, histogram in sorted(spans.items()):
+            lines.extend(histogram.to_prometheus({'span': name}, name=span_metric))
+        for name, counter in sorted(counters.items()):
+            metric = f"{self.prefix}_{name.replace('.', '_')}_total"
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {counter.value}')
+        return lines
+
+    def report(self) -> str:
+        """Human-readable table of span timings and counters."""
+        data = self.to_dict()
+        lines = [f"{'span':32s} {'count':>6s} {'total':>9s} {'mean':>9s}"]
+        for name, snapshot in data['spans'].items():
+            lines.append(
+                f"{name:32s} {snapshot['count']:6d} "
+                f"{snapshot['sum']:8.3f}s {snapshot['mean']:8.3f}s"
+            )
+        for name, value in data['counters'].items():
+            lines.append(f"{name:32s} {value:6d}")
+        return '\n'.join(lines)
@@ -0,0 +1,99 @@
+import os
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import numpy as np
+from PIL import Image
+from .utils import ensure_dir, sqlite_connection
+from .layout import to_bytes, from_bytes, empty_words
+
+def page_hash(image: Image, settings: str) -> str:
+    """
+    Exact hash of a rendered page plus the OCR settings that read it.
+
+    Pages rendered from the same PDF content at the same DPI are
+    byte-identical, so repeated boilerplate pages hash the same while two
+    forms differing in a single claim number never do.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(settings.encode('utf-8'))
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}".encode('ascii'))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+class OCRCache:
+    """
+    Persistent OCR results keyed by page_hash, shared across processes.
+
+    Hit and miss counts for this instance are kept in memory; lifetime hits
+    per entry are stored alongside the text and its word array.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        ensure_dir(os.path.dirname(db_path) or '.')
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ocr_cache (
+                    page_hash TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    words BLOB,
+                    hits INTEGER DEFAULT 0,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(ocr_cache)")}
+            if 'words' not in columns:
+                conn.execute("ALTER TABLE ocr_cache ADD COLUMN words BLOB")
+
+    def _connect(self):
+        return sqlite_connection(self.db_path)
+
+    def get(self, key: str) -> Optional[Tuple[str, np.ndarray]]:
+        """(text, word array) for a page hash, or None on a miss."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT text, words FROM ocr_cache WHERE page_hash = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE ocr_cache SET hits = hits + 1 WHERE page_hash = ?", (key,))
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            return None
+        return row[0], from_bytes(row[1]) if row[1] else empty_words()
+
+    def put(self, key: str, text: str, words: np.ndarray = None):
+        blob = to_bytes(words) if words is not None else None
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (page_hash, text, words, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, text, blob, datetime.now().isoformat())
+            )
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            entries, lifetime_hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM ocr_cache"
+            ).fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'entries': entries,
+            'lifetime_hits': lifetime_hits
+        }
@@ -0,0 +1,174 @@
+import os
+import tempfile
+from typing import Dict, List, Tuple
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+from .layout import from_tesseract_data, empty_words
+
+# Target median glyph height (mixed case) in pixels. Tesseract's accuracy
+# falls off below an x-height of ~10 px and gains little above ~30 px
+DEFAULT_TEXT_HEIGHT = 20
+
+def to_grayscale(image: Image) -> np.ndarray:
+    array = np.asarray(image.convert('RGB'))
+    return cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    """Otsu threshold: black text (0) on white (255)."""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+def median_text_height(binary: np.ndarray) -> float:
+    """Median height of glyph-sized connected components, 0 if there is no text."""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(255 - binary, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    # Drop specks and rules/boxes so only characters are measured
+    glyphs = heights[(heights >= 4) & (heights <= 200) & (widths <= 4 * heights)]
+    return float(np.median(glyphs)) if len(glyphs) else 0.0
+
+def auto_scale(gray: np.ndarray, binary: np.ndarray,
+               target_height: int = DEFAULT_TEXT_HEIGHT):
+    """
+    Resample so glyphs are near target_height, i.e. pick the DPI per page.
+
+    Large renders are shrunk (fewer pixels for Tesseract to read), small
+    text is enlarged; scales within 15% of 1 are left alone.
+    """
+    height = median_text_height(binary)
+    if not height:
+        return gray, 1.0
+    scale = float(np.clip(target_height / height, 0.5, 2.0))
+    if abs(scale - 1.0) < 0.15:
+        return gray, 1.0
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation), scale
+
+def skew_angle(binary: np.ndarray, max_angle: float = 15.0) -> float:
+    """Estimate page skew in degrees from the minimum-area box around the ink."""
+    coords = cv2.findNonZero(255 - binary)
+    if coords is None or len(coords) < 100:
+        return 0.0
+    angle = cv2.minAreaRect(coords)[-1]
+    # OpenCV reports angles in [0, 90) (>= 4.5) or [-90, 0); fold into (-45, 45]
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    return angle if abs(angle) <= max_angle else 0.0
+
+def deskew(gray: np.ndarray, angle: float) -> np.ndarray:
+    if abs(angle) < 0.3:
+        return gray
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(
+        gray, matrix, (width, height),
+        flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=255
+    )
+
+def unrotate_words(words: np.ndarray, angle: float, width: int, height: int) -> np.ndarray:
+    """
+    Map word boxes read from a deskewed page back onto the original render.
+
+    deskew() rotates about the page centre without resizing the canvas, so
+    each box is rotated back by -angle in pixels of a width x height page
+    and replaced by the axis-aligned box around its corners.
+    """
+    if abs(angle) < 0.3 or not len(words):
+        return words
+    inverse = cv2.invertAffineTransform(
+        cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    )
+    x0, y0 = words['x0'] * width, words['y0'] * height
+    x1, y1 = words['x1'] * width, words['y1'] * height
+    corners = np.stack([
+        np.stack([x0, y0], axis=-1), np.stack([x1, y0], axis=-1),
+        np.stack([x0, y1], axis=-1), np.stack([x1, y1], axis=-1)
+    ], axis=1)  # (words, 4, 2)
+    mapped = corners @ inverse[:, :2].T + inverse[:, 2]
+
+    words = words.copy()
+    words['x0'] = np.clip(mapped[..., 0].min(axis=1) / width, 0, 1)
+    words['x1'] = np.clip(mapped[..., 0].max(axis=1) / width, 0, 1)
+    words['y0'] = np.clip(mapped[..., 1].min(axis=1) / height, 0, 1)
+    words['y1'] = np.clip(mapped[..., 1].max(axis=1) / height, 0, 1)
+    return words
+
+def prepare_for_ocr(image: Image, deskew_pages: bool = True,
+                    target_height: int = DEFAULT_TEXT_HEIGHT) -> Tuple[Image.Image, float]:
+    """
+    Grayscale, rescale, deskew and binarize a rendered page for Tesseract.
+
+    Returns a 1-bit image, which Tesseract gets as a small PNG/TIFF
+    instead of a full-resolution RGB one, and the angle it was rotated by
+    (0.0 if it was not), for unrotate_words().
+    """
+    gray = to_grayscale(image)
+    binary = binarize(gray)
+    if target_height:
+        gray, scale = auto_scale(gray, binary, target_height)
+        if scale != 1.0:
+            binary = binarize(gray)
+    angle = 0.0
+    if deskew_pages:
+        angle = skew_angle(binary)
+        if abs(angle) >= 0.3:
+            binary = binarize(deskew(gray, angle))
+        else:
+            angle = 0.0
+    return Image.fromarray(binary).convert('1'), angle
+
+def tesseract_config(psm: int = 4, oem: int = 1) -> str:
+    """
+    Tesseract CLI options.
+
+    PSM 4 (single column of variable-size text) keeps form labels and their
+    values on one line; PSM 3 (full auto layout) tends to split them into
+    separate blocks.
+    """
+    return f"--oem {oem} --psm {psm}"
+
+def ocr_data(image, lang: str, config: str) -> List[Tuple[str, np.ndarray]]:
+    """One image_to_data pass: (text, word array) for each page in image."""
+    data = pytesseract.image_to_data(
+        image, lang=lang, config=config, output_type=pytesseract.Output.DICT
+    )
+    return from_tesseract_data(data)
+
+def ocr_pages(images: List[Image.Image], lang: str = 'eng',
+              config: str = '') -> List[Tuple[str, np.ndarray]]:
+    """
+    OCR several pages in one Tesseract invocation via a multi-page TIFF.
+
+    Returns (text, word array) per page (see layout.WORD_DTYPE), both from
+    the same image_to_data pass. If the page numbers in the output do not
+    line up with the input, pages are re-run one at a time.
+    """
+    if len(images) == 1:
+        return ocr_data(images[0], lang, config)[:1] or [('', empty_words())]
+
+    fd, tiff_path = tempfile.mkstemp(suffix='.tif')
+    os.close(fd)
+    try:
+        compression = 'group4' if all(image.mode == '1' for image in images) else 'tiff_lzw'
+        images[0].save(
+            tiff_path, format='TIFF', save_all=True,
+            append_images=images[1:], compression=compression
+        )
+        pages = ocr_data(tiff_path, lang, config)
+    finally:
+        os.remove(tiff_path)
+
+    if len(pages) != len(images):
+        return [page for image in images for page in ocr_pages([image], lang, config)]
+    return pages
+
+def ocr_settings(lang: str, config: str, preprocess: bool, options: Dict) -> str:
+    """Stable description of everything that affects OCR output (for cache keys)."""
+    parts = [lang, config, f"preprocess={preprocess}"]
+    if preprocess:
+        parts.extend(f"{name}={options[name]}" for name in sorted(options))
+    return '|'.join(parts)
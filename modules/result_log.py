@@ -0,0 +1,195 @@
+import os
+import json
+import zlib
+import uuid
+import atexit
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from .utils import ensure_dir, sqlite_connection
+
+def encode_result(result: Dict) -> bytes:
+    """Compact JSON, deflated at the fastest level."""
+    return zlib.compress(
+        json.dumps(result, separators=(',', ':'), default=str).encode('utf-8'), 1
+    )
+
+def decode_result(blob: bytes) -> Dict:
+    return json.loads(zlib.decompress(blob))
+
+class ResultLog:
+    """
+    Append-only log of query and classification results in SQLite.
+
+    Replaces one JSON file per result. append() only serializes the result
+    and queues the row; a writer thread inserts queued rows in one
+    transaction once batch_size are waiting or flush_interval seconds
+    have passed. Rows are indexed by doc_id, query and time, so history
+    lookups never scan the results directory. Queued rows are flushed
+    before reads and at interpreter exit.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 64, flush_interval: float = 1.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        ensure_dir(os.path.dirname(db_path) or '.')
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    result_id TEXT NOT NULL UNIQUE,
+                    kind TEXT NOT NULL,
+                    doc_id TEXT,
+                    query TEXT,
+                    created_at TEXT NOT NULL,
+                    confidence REAL,
+                    result BLOB NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_doc ON results (doc_id, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_query ON results (query, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_time ON results (created_at)")
+
+        self._pending = []
+        self._appended = 0
+        self._written = 0
+        self._flush_requested = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='result-log', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'ResultLog':
+        log_config = config.get('result_log', {})
+        return cls(
+            log_config.get('db_path', 'data/results.sqlite'),
+            batch_size=log_config.get('batch_size', 64),
+            flush_interval=log_config.get('flush_interval', 1.0)
+        )
+
+    def _connect(self):
+        return sqlite_connection(self.db_path, sqlite3.Row)
+
+    def append(self, kind: str, result: Dict, doc_id: str = None, query: str = None) -> str:
+        """
+        Queue a result ('query' or 'classification') and return its result_id.
+
+        The result is serialized here, so later changes to the dict are
+        not logged.
+        """
+        result_id = uuid.uuid4().hex
+        confidence = result.get('confidence_score', result.get('confidence'))
+        row = (
+            result_id, kind, doc_id, query, datetime.now().isoformat(),
+            float(confidence) if isinstance(confidence, (int, float)) else None,
+            encode_result(result)
+        )
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Result log is closed")
+            self._pending.append(row)
+            self._appended += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return result_id
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or self._flush_requested
+                    or len(self._pending) >= self.batch_size,
+                    timeout=self.flush_interval
+                )
+                batch, self._pending = self._pending, []
+                self._flush_requested = False
+                closed = self._closed
+            if batch:
+                self._write(batch)
+            with self._cond:
+                self._written += len(batch)
+                self._cond.notify_all()
+                if closed and not self._pending:
+                    return
+
+    def _write(self, batch: List[tuple]):
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO results (result_id, kind, doc_id, query, created_at, confidence, result) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    batch
+                )
+                conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"Warning: could not log {len(batch)} result(s): {e}")
+
+    def flush(self):
+        """Block until every result appended so far has been written."""
+        with self._cond:
+            target = self._appended
+            if self._written >= target or not self._thread.is_alive():
+                return
+            self._flush_requested = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._written >= target)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    @staticmethod
+    def _to_entry(row: sqlite3.Row) -> Dict:
+        entry = dict(row)
+        entry.pop('seq', None)
+        entry['result'] = decode_result(entry['result'])
+        return entry
+
+    def get(self, result_id: str) -> Optional[Dict]:
+        self.flush()
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM results WHERE result_id = ?", (result_id,)).fetchone()
+        return self._to_entry(row) if row else None
+
+    def history(self, doc_id: str = None, query: str = None, kind: str = None,
+                since: str = None, until: str = None, limit: int = 50) -> List[Dict]:
+        """
+        Logged results matching every given filter, newest first.
+
+        since and until are ISO timestamps (or dates) bounding created_at.
+        """
+        self.flush()
+        conditions, values = [], []
+        for column, value in (('doc_id', doc_id), ('query', query), ('kind', kind)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                values.append(value)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            values.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            values.append(until)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM results {where}ORDER BY created_at DESC, seq DESC LIMIT ?",
+                (*values, limit)
+            ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def stats(self) -> Dict:
+        self.flush()
+        with self._connect() as conn:
+            rows = conn.execute("SELECT kind, COUNT(*) FROM results GROUP BY kind").fetchall()
+        return {kind: count for kind, count in rows}
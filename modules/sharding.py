@@ -0,0 +1,338 @@
+import os
+import heapq
+import hashlib
+import ipaddress
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener, Client
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .utils import load_config, ensure_dir
+from .metrics import MetricsRegistry
+from .lexical_index import reciprocal_rank_fusion, is_identifier_query
+
+# Shared secret for shard connections; takes precedence over sharding.authkey
+AUTHKEY_ENV = 'SHARD_AUTHKEY'
+
+# Published in earlier config.yaml files, so as good as no key
+_PUBLISHED_AUTHKEYS = (b'insurance-shards',)
+
+def shard_for(doc_id: str, num_shards: int) -> int:
+    """Stable shard of a document (the same in every process and run)."""
+    digest = hashlib.blake2b(doc_id.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % num_shards
+
+def parse_endpoint(endpoint: str) -> Tuple[str, int]:
+    host, _, port = endpoint.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+def shard_endpoints(config: Dict) -> List[str]:
+    """host:port per shard: sharding.endpoints, or local ports from base_port."""
+    shard_config = config.get('sharding', {})
+    if shard_config.get('endpoints'):
+        return list(shard_config['endpoints'])
+    host = shard_config.get('host', '127.0.0.1')
+    base_port = shard_config.get('base_port', 6100)
+    return [f"{host}:{base_port + i}" for i in range(shard_config.get('shards', 4))]
+
+def shard_authkey(config: Dict) -> bytes:
+    """
+    Shared secret of shards and coordinator, from $SHARD_AUTHKEY or sharding.authkey.
+
+    Requests are pickled, so whoever holds the key can run code on a
+    shard; there is deliberately no default.
+    """
+    authkey = os.environ.get(AUTHKEY_ENV) or config.get('sharding', {}).get('authkey')
+    if not authkey:
+        raise ValueError(
+            f"Sharding needs a shared secret: set the {AUTHKEY_ENV} environment "
+            f"variable or sharding.authkey in config.yaml"
+        )
+    return authkey.encode('utf-8')
+
+def is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # a hostname may resolve to any interface
+
+def check_bind_address(host: str, authkey: bytes):
+    """Refuse to listen beyond this machine with an empty or published key."""
+    if (not authkey or authkey in _PUBLISHED_AUTHKEYS) and not is_loopback(host):
+        raise ValueError(
+            f"Refusing to serve a shard on {host} with an empty or default authkey; "
+            f"set a secret in {AUTHKEY_ENV} or sharding.authkey, or bind to 127.0.0.1"
+        )
+
+class ShardServer:
+    """
+    One shard of the text and image indices, served to a ShardCoordinator.
+
+    Holds index-only retrievers (no encoders) for the documents routed to
+    this shard, saved under paths.embeddings/shard_<id>/. Queries arrive
+    already embedded, so a shard needs memory for its slice of the vectors
+    and nothing else. Requests are (op, kwargs) tuples over a
+    multiprocessing connection; each client connection gets a thread and
+    the retrievers' read/write locks keep concurrent calls safe.
+    """
+
+    def __init__(self, config_path: str, shard_id: int):
+        from .text_retriever import TextRetriever
+        from .image_retriever import ImageRetriever
+
+        self.config = load_config(config_path)
+        self.shard_id = shard_id
+        self.shard_dir = os.path.join(self.config['paths']['embeddings'], f"shard_{shard_id}")
+        ensure_dir(self.shard_dir)
+
+        self.text_retriever = TextRetriever(config_path, load_model=False)
+        self.image_retriever = ImageRetriever(config_path, load_model=False)
+        if os.path.exists(self._index_path('text')):
+            self.text_retriever.load_index(self._index_path('text'))
+        if os.path.exists(self._index_path('image')):
+            self.image_retriever.load_index(self._index_path('image'))
+
+    def _index_path(self, kind: str) -> str:
+        return os.path.join(self.shard_dir, f"{kind}_index.faiss")
+
+    def handle(self, op: str, **kwargs):
+        if op == 'search_text':
+            # Raw distances and BM25 scores; the coordinator fuses across shards
+            return self.text_retriever.search_candidates(
+                kwargs['query'], kwargs['top_k'], kwargs['query_embedding']
+            )
+        if op == 'search_image':
+            return self.image_retriever.search(
+                kwargs['query'], kwargs['top_k'], kwargs['query_embedding']
+            )
+        if op == 'add':
+            # A document already here is left alone; retried merges resend it
+            doc_id = kwargs.get('doc_id')
+            if kwargs.get('text') is not None and not self.text_retriever.has_document(doc_id):
+                self.text_retriever.add_encoded(*kwargs['text'])
+            if kwargs.get('image') is not None and not self.image_retriever.has_document(doc_id):
+                self.image_retriever.add_encoded(*kwargs['image'])
+            return self.stats()
+        if op == 'save':
+            self.text_retriever.save_index(self._index_path('text'))
+            self.image_retriever.save_index(self._index_path('image'))
+            return self.stats()
+        if op == 'stats':
+            return self.stats()
+        raise ValueError(f"Unknown shard operation '{op}'")
+
+    def stats(self) -> Dict:
+        return {
+            'shard': self.shard_id,
+            'text_chunks': len(self.text_retriever.text_chunks),
+            'images': len(self.image_retriever.image_paths),
+        }
+
+    def serve(self, address: Tuple[str, int], authkey: bytes):
+        check_bind_address(address[0], authkey)
+        with Listener(address, authkey=authkey) as listener:
+            stats = self.stats()
+            print(f"  Shard {self.shard_id} listening on {address[0]}:{address[1]} "
+                  f"({stats['text_chunks']} chunks, {stats['images']} images)")
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    op, kwargs = conn.recv()
+                except EOFError:
+                    return
+                try:
+                    conn.send(('ok', self.handle(op, **kwargs)))
+                except Exception as e:
+                    conn.send(('error', f"{type(e).__name__}: {e}"))
+
+def serve_shard(config_path: str, shard_id: int, endpoint: str, authkey: bytes):
+    """Process entry point for one shard server."""
+    host, port = parse_endpoint(endpoint)
+    ShardServer(config_path, shard_id).serve((host, port), authkey)
+
+def start_local_shards(config_path: str = "config.yaml",
+                       shard_ids: List[int] = None) -> List[multiprocessing.Process]:
+    """Start shard server processes on this machine (all shards by default)."""
+    config = load_config(config_path)
+    endpoints = shard_endpoints(config)
+    authkey = shard_authkey(config)
+    if shard_ids is None:
+        shard_ids = range(len(endpoints))
+    for shard_id in shard_ids:
+        # Fail here rather than in every child process
+        check_bind_address(parse_endpoint(endpoints[shard_id])[0], authkey)
+
+    processes = []
+    for shard_id in shard_ids:
+        process = multiprocessing.Process(
+            target=serve_shard, args=(config_path, shard_id, endpoints[shard_id], authkey),
+            name=f"shard-{shard_id}"
+        )
+        process.start()
+        processes.append(process)
+    return processes
+
+class ShardCoordinator:
+    """
+    Scatter-gather front end over shard servers.
+
+    Documents are routed to shard_for(doc_id); searches are sent to every
+    shard in parallel with the query embedded once here. Shards return raw
+    dense distances and BM25 scores for their candidates; the rankings are
+    merged across shards and fused with RRF once, here, exactly as
+    TextRetriever.search fuses a single index (BM25 statistics stay per
+    shard). Image hits are merged by distance. Shards are addressed by
+    host:port, so the same coordinator works for local processes and for
+    shards on other nodes. A shard that fails is left out of that search
+    (and counted in metrics as shard_errors) rather than failing the query.
+    """
+
+    def __init__(self, endpoints: List[str], authkey: bytes, config: Dict = None):
+        self.endpoints = [parse_endpoint(endpoint) for endpoint in endpoints]
+        self.authkey = authkey
+        self.config = config or {}
+        self.connections = [None] * len(self.endpoints)
+        self.locks = [threading.Lock() for _ in self.endpoints]
+        self.executor = ThreadPoolExecutor(
+            max_workers=len(self.endpoints), thread_name_prefix='shard'
+        )
+        retrieval_config = self.config.get('retrieval', {})
+        self.hybrid = retrieval_config.get('hybrid', True)
+        self.rrf_k = retrieval_config.get('rrf_k', 60)
+        self.hybrid_candidates = retrieval_config.get('hybrid_candidates', 4)
+        # Fan-out timings; the analyzer swaps in its shared registry
+        self.metrics = MetricsRegistry()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional['ShardCoordinator']:
+        shard_config = config.get('sharding', {})
+        if not shard_config.get('enabled', False):
+            return None
+        return cls(shard_endpoints(config), shard_authkey(config), config)
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.endpoints)
+
+    def _call(self, shard: int, op: str, **kwargs):
+        """One request to a shard; reconnects once if the connection dropped."""
+        with self.locks[shard]:
+            for attempt in range(2):
+                try:
+                    if self.connections[shard] is None:
+                        self.connections[shard] = Client(self.endpoints[shard], authkey=self.authkey)
+                    self.connections[shard].send((op, kwargs))
+                    status, payload = self.connections[shard].recv()
+                    break
+                except (EOFError, OSError):
+                    if self.connections[shard] is not None:
+                        self.connections[shard].close()
+                    self.connections[shard] = None
+                    if attempt:
+                        raise
+        if status == 'error':
+            raise RuntimeError(f"Shard {shard}: {payload}")
+        return payload
+
+    def _scatter(self, op: str, **kwargs) -> List:
+        """Send a request to every shard in parallel; None for shards that failed."""
+        futures = [
+            self.executor.submit(self._call, shard, op, **kwargs)
+            for shard in range(self.num_shards)
+        ]
+        results = []
+        for shard, future in enumerate(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Warning: shard {shard} failed on {op}: {e}")
+                self.metrics.count('shard_errors')
+                results.append(None)
+        return results
+
+    def _search(self, op: str, query: str, query_embedding: np.ndarray, top_k: int) -> List:
+        with self.metrics.span(f"shards.{op}"):
+            return self._scatter(
+                op, query=query, top_k=top_k,
+                query_embedding=np.asarray(query_embedding, dtype='float32')
+            )
+
+    def search_text(self, query: str, query_embedding: np.ndarray, top_k: int = None) -> List[Dict]:
+        """Hybrid text search over every shard, results shaped like TextRetriever.search."""
+        if top_k is None:
+            top_k = self.config['retrieval']['top_k_text']
+
+        # Candidates are keyed by (shard, chunk index)
+        dense, lexical, chunks = [], [], {}
+        for shard, candidates in enumerate(self._search('search_text', query, query_embedding, top_k)):
+            if not candidates:
+                continue
+            dense.extend(((shard, idx), distance) for idx, distance in candidates['dense'])
+            lexical.extend(((shard, idx), score) for idx, score in candidates['lexical'])
+            chunks.update(((shard, idx), chunk) for idx, chunk in candidates['chunks'].items())
+
+        candidates = top_k * self.hybrid_candidates if self.hybrid else top_k
+        dense = heapq.nsmallest(candidates, dense, key=lambda hit: hit[1])
+        lexical = heapq.nlargest(candidates, lexical, key=lambda hit: hit[1])
+        dense_scores = {key: 1 / (1 + distance) for key, distance in dense}
+        lexical_scores = dict(lexical)
+
+        if not self.hybrid:
+            fused = [(key, dense_scores[key]) for key, _ in dense]
+        elif lexical and is_identifier_query(query):
+            # Identifier fast path, as in TextRetriever.search
+            fused = reciprocal_rank_fusion([[key for key, _ in lexical]], self.rrf_k)
+            dense_scores = {}
+        else:
+            fused = reciprocal_rank_fusion(
+                [[key for key, _ in dense], [key for key, _ in lexical]], self.rrf_k
+            )
+
+        results = []
+        for key, score in fused[:top_k]:
+            result = dict(chunks[key], score=float(score))
+            for name, value in (('dense_score', dense_scores.get(key)),
+                                ('lexical_score', lexical_scores.get(key))):
+                if value is not None:
+                    result[name] = float(value)
+            results.append(result)
+        return results
+
+    def search_image(self, query: str, query_embedding: np.ndarray, top_k: int = None) -> List[Dict]:
+        """Image search over every shard; scores are 1 / (1 + L2 distance) on every shard."""
+        if top_k is None:
+            top_k = self.config['retrieval']['top_k_image']
+        results = self._search('search_image', query, query_embedding, top_k)
+        hits = [hit for shard_hits in results if shard_hits for hit in shard_hits]
+        return heapq.nlargest(top_k, hits, key=lambda hit: hit['score'])
+
+    def add(self, doc_id: str, text_encoded: tuple = None, image_encoded: tuple = None) -> Dict:
+        """Send a document's encoded chunks and pages to its shard."""
+        shard = shard_for(doc_id, self.num_shards)
+        return self._call(shard, 'add', doc_id=doc_id, text=text_encoded, image=image_encoded)
+
+    def save(self) -> List[Dict]:
+        """Save every shard; raises if any did not, so callers do not report success."""
+        results = self._scatter('save')
+        failed = [shard for shard, result in enumerate(results) if result is None]
+        if failed:
+            raise RuntimeError(f"Shard(s) {failed} did not save their indices")
+        return results
+
+    def stats(self) -> List[Dict]:
+        return self._scatter('stats')
+
+    def close(self):
+        for shard, conn in enumerate(self.connections):
+            if conn is not None:
+                conn.close()
+                self.connections[shard] = None
+        self.executor.shutdown(wait=False)
@@ -1,9 +1,16 @@
 from typing import Dict
-import json
-from .utils import load_config, save_json
-import os
+from .utils import load_config
+from .result_log import ResultLog
 from datetime import datetime
 
+# Fixed per agent so every request shares a cacheable prompt prefix
+SYSTEM_PROMPT = (
+    "You write the final answer of an insurance document analysis. Given the "
+    "question, the extracted fields and the text analysis, answer in at most "
+    "four sentences. Keep identifiers, amounts and dates exactly as given and "
+    "mention any inconsistency that was detected."
+)
+
 class SummarizerAgent:
     """
     Synthesizes all agent outputs into final structured result.
@@ -14,6 +21,10 @@ class SummarizerAgent:
         self.config = load_config(config_path)
         self.temperature = self.config['agents']['summarizer']['temperature']
         self.max_tokens = self.config['agents']['summarizer']['max_tokens']
+        # Shared with the analyzer; opened on first save otherwise
+        self.result_log = None
+        # LLMClient set by the analyzer when llm.enabled; rule-based summary otherwise
+        self.llm = None
     
     def process(self, query: str, general_context: Dict, critical_output: Dict,
                 text_output: Dict, image_output: Dict) -> Dict:
@@ -83,6 +94,12 @@ class SummarizerAgent:
                          critical_output: Dict, text_output: Dict, 
                          image_output: Dict) -> str:
         """Generate human-readable summary."""
+        if self.llm is not None:
+            try:
+                return self._summarize_with_llm(query, structured_data, text_output)
+            except Exception as e:
+                print(f"Warning: LLM summary failed, using rule-based summary: {e}")
+        
         summary_parts = []
         
         # Opening statement
@@ -135,6 +152,22 @@ class SummarizerAgent:
         
         return " ".join(summary_parts)
     
+    def _summarize_with_llm(self, query: str, structured_data: Dict, text_output: Dict) -> str:
+        fields = "\n".join(
+            f"{name}: {value}" for name, value in structured_data.items()
+            if value not in ('N/A', [], None)
+        )
+        issues = text_output.get('consistency', {}).get('issues', [])
+        return self.llm.generate(
+            f"Question: {query}\n\nExtracted fields:\n{fields or 'none'}\n\n"
+            f"Text analysis:\n{text_output.get('detailed_analysis', '')}\n\n"
+            f"Consistency issues: {'; '.join(issues) or 'none'}",
+            system=SYSTEM_PROMPT,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            agent='summarizer'
+        )
+    
     def _calculate_confidence(self, critical_output: Dict, 
                              text_output: Dict, image_output: Dict) -> float:
         """Calculate overall confidence score."""
@@ -159,15 +192,9 @@ class SummarizerAgent:
         
         return sum(scores) / len(scores) if scores else 0.5
     
-    def save_result(self, result: Dict, output_dir: str = None):
-        """Save result to file."""
-        if output_dir is None:
-            output_dir = self.config['paths']['results']
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"result_{timestamp}.json"
-        filepath = os.path.join(output_dir, filename)
-        
-        save_json(result, filepath)
+    def save_result(self, result: Dict, doc_id: str = None) -> str:
+        """Append result to the result log; returns its result_id."""
+        if self.result_log is None:
+            self.result_log = ResultLog.from_config(self.config)
         
-        return filepath
+        return self.result_log.append('query', result, doc_id=doc_id, query=result.get('query'))
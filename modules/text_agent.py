@@ -1,6 +1,14 @@
 from typing import Dict, List
 from .utils import load_config
 
+# Fixed per agent so every request shares a cacheable prompt prefix
+SYSTEM_PROMPT = (
+    "You answer questions about insurance documents from the excerpts given. "
+    "Quote policy, claim and invoice numbers, amounts and dates exactly as "
+    "written, cite the page of each fact as (page N), and say so when the "
+    "excerpts do not contain the answer."
+)
+
 class TextAgent:
     """
     Deep textual reasoning on insurance documents.
@@ -11,6 +19,8 @@ class TextAgent:
         self.config = load_config(config_path)
         self.temperature = self.config['agents']['text']['temperature']
         self.max_tokens = self.config['agents']['text']['max_tokens']
+        # LLMClient set by the analyzer when llm.enabled; keyword heuristics otherwise
+        self.llm = None
     
     def process(self, query: str, context: Dict, critical_fields: Dict) -> Dict:
         """
@@ -24,7 +34,8 @@ class TextAgent:
         Returns:
             Detailed textual analysis results
         """
-        text_results = context['text_results']
+        # Merged, budgeted spans (see ContextBuilder); raw hits for older callers
+        text_results = context.get('text_spans', context['text_results'])
         
         # Analyze text chunks for detailed information
         detailed_analysis = self._analyze_text_chunks(
@@ -47,6 +58,12 @@ class TextAgent:
     def _analyze_text_chunks(self, query: str, text_results: List[Dict], 
                             critical_fields: Dict) -> str:
         """Analyze text chunks for detailed information."""
+        if self.llm is not None:
+            try:
+                return self._answer_with_llm(query, text_results, critical_fields)
+            except Exception as e:
+                print(f"Warning: LLM analysis failed, using keyword heuristics: {e}")
+        
         analysis = []
         
         # Check for claim-related information
@@ -67,6 +84,20 @@ class TextAgent:
         
         return "\n\n".join(analysis) if analysis else "No specific textual details found."
     
+    def _answer_with_llm(self, query: str, text_results: List[Dict],
+                         critical_fields: Dict) -> str:
+        excerpts = "\n\n".join(
+            f"(page {r['metadata']['page_id']})\n{r['text']}" for r in text_results
+        )
+        fields = "\n".join(f"{name}: {value}" for name, value in critical_fields.items())
+        return self.llm.generate(
+            f"Extracted fields:\n{fields or 'none'}\n\nExcerpts:\n{excerpts}\n\nQuestion: {query}",
+            system=SYSTEM_PROMPT,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            agent='text'
+        )
+    
     def _extract_relationships(self, text_results: List[Dict], 
                               critical_fields: Dict) -> Dict:
         """Extract relationships between entities."""
@@ -1,75 +1,200 @@
 import os
-import faiss
+import time
 import numpy as np
-import torch
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict
-from .utils import load_config, save_json, load_json, ensure_dir
+from typing import List, Dict, Optional, Tuple
+from .utils import (
+    load_config, save_json, load_json, ensure_dir,
+    ReadWriteLock, read_locked, write_locked, page_event
+)
+from .vector_index import VectorIndex
+from .lexical_index import BM25Index, reciprocal_rank_fusion, is_identifier_query
+from .encoders import get_encoder_backend, load_text_encoder
+from .chunker import TokenChunker, ChunkStore, length_sorted_batches, page_key
+from .metrics import MetricsRegistry
 
 class TextRetriever:
     """Text embedding and retrieval using sentence transformers (CPU only)."""
     
-    def __init__(self, config_path: str = "config.yaml"):
+    def __init__(self, config_path: str = "config.yaml", load_model: bool = True):
         self.config = load_config(config_path)
         
-        print(f"  Text Retriever using device: CPU")
+        self.backend = get_encoder_backend(self.config)
         
-        # Load model on CPU
-        self.model = SentenceTransformer(
-            self.config['models']['text_encoder'],
-            device='cpu'
-        )
+        # Load model on CPU (index-only instances, e.g. the ingest writer, skip it)
+        self.model = None
+        if load_model:
+            print(f"  Text Retriever using device: CPU ({self.backend})")
+            self.model = load_text_encoder(
+                self.config['models']['text_encoder'],
+                self.backend
+            )
         self.embedding_dim = self.config['embeddings']['text_dim']
         
-        # Use CPU-only FAISS index
-        self.index = faiss.IndexFlatL2(self.embedding_dim)
+        # Token windows sized for this encoder (word-based stand-in without one)
+        self.chunker = TokenChunker.from_config(self.config, self.model)
+        
+        # CPU-only FAISS index, optionally compressed (see index.type)
+        self.index = VectorIndex.from_config(self.embedding_dim, self.config)
+        
+        # BM25 index over the same chunks for exact identifiers
+        retrieval_config = self.config['retrieval']
+        self.hybrid = retrieval_config.get('hybrid', True)
+        self.rrf_k = retrieval_config.get('rrf_k', 60)
+        self.hybrid_candidates = retrieval_config.get('hybrid_candidates', 4)
+        self.lexical_index = BM25Index()
         
-        self.text_chunks = []
+        self.text_chunks = ChunkStore()
         self.metadata = []
+        self.doc_ids = set()
+        
+        # Optional callable(query) -> embedding, e.g. a MicroBatcher.submit
+        self.query_encoder = None
+        
+        # Concurrent searches share the index; adds, loads and saves are exclusive
+        self.lock = ReadWriteLock()
+        
+        # Stage timings; the analyzer swaps in its shared registry
+        self.metrics = MetricsRegistry()
         
         ensure_dir(self.config['paths']['embeddings'])
     
-    def add_documents(self, doc_metadata: Dict):
+    def add_documents(self, doc_metadata: Dict, event_callback=None):
         """Add document chunks to the index with batch encoding."""
-        all_chunks = []
+        encoded = self.encode_documents(doc_metadata, event_callback)
+        if encoded is None:
+            print("No text chunks found to process")
+            return
+        
+        self.add_encoded(*encoded)
+    
+    def encode_documents(self, doc_metadata: Dict,
+                         event_callback=None) -> Optional[Tuple[np.ndarray, ChunkStore, List[Dict]]]:
+        """
+        Chunk and embed a document without touching the index.
+        
+        Args:
+            doc_metadata: Document metadata dictionary
+            event_callback: Optional callable(event) receiving an
+                'embedded_text' event once all of a page's chunks are encoded
+        
+        Returns:
+            (embeddings, chunks, chunk metadata), or None if there is no text.
+            Chunks are offsets into the document's page texts; chunk
+            metadata carries the same start/end.
+        """
+        chunks = ChunkStore()
         all_metadata = []
+        lengths = []
+        chunk_pages = []  # index into page_metadata per chunk
         
-        # Collect all chunks from all pages
-        for page in doc_metadata['page_metadata']:
-            text = page['text']
-            chunks = self._chunk_text(text)
+        # Collect all chunk spans from all pages
+        for page_index, page in enumerate(doc_metadata['page_metadata']):
+            key = page_key(doc_metadata['doc_id'], page['page_id'])
+            spans = self.chunker.spans(page['text'])
+            if spans:
+                chunks.add_page(key, page['text'])
             
-            for chunk_idx, chunk in enumerate(chunks):
-                all_chunks.append(chunk)
+            for chunk_idx, (start, end, tokens) in enumerate(spans):
+                chunks.add(key, start, end)
+                lengths.append(tokens)
+                chunk_pages.append(page_index)
                 all_metadata.append({
                     'doc_id': doc_metadata['doc_id'],
                     'page_id': page['page_id'],
                     'chunk_id': chunk_idx,
+                    'start': start,
+                    'end': end,
                     'image_path': page['image_path']
                 })
         
-        if not all_chunks:
-            print("No text chunks found to process")
-            return
+        if not len(chunks):
+            return None
         
-        # Batch encode all chunks at once
-        print(f"  Processing {len(all_chunks)} text chunks...")
-        embeddings = self.model.encode(
-            all_chunks,
-            convert_to_numpy=True,
-            batch_size=32,
-            show_progress_bar=False
-        )
+        print(f"  Processing {len(chunks)} text chunks...")
+        self.metrics.count('chunks', len(chunks))
+        page_ids = [page['page_id'] for page in doc_metadata['page_metadata']]
+        with self.metrics.span('text.embed_chunks'):
+            embeddings = self._encode_chunks(
+                chunks, lengths, chunk_pages, page_ids, event_callback
+            )
+        
+        return embeddings, chunks, all_metadata
+    
+    def _encode_chunks(self, chunks: ChunkStore, lengths: List[int], chunk_pages: List[int],
+                       page_ids: List[int], event_callback=None, batch_size: int = 32) -> np.ndarray:
+        """
+        Encode chunks in length-sorted batches, returning rows in chunk order.
+        
+        Batches hold chunks of similar token counts so little is spent on
+        padding; only the batch being encoded is materialised as strings.
+        With an event_callback, a page is reported once its last chunk is
+        encoded.
+        """
+        embeddings = None
+        remaining = np.bincount(chunk_pages, minlength=len(page_ids))
+        total = len(page_ids)
+        
+        # Pages without text have nothing to wait for
+        if event_callback is not None:
+            for page_index in np.flatnonzero(remaining == 0):
+                event_callback(page_event('embedded_text', page_ids[page_index], total, 0.0))
         
+        for batch in length_sorted_batches(lengths, batch_size):
+            batch_start = time.perf_counter()
+            encoded = self.model.encode(
+                [chunks[i] for i in batch],
+                convert_to_numpy=True,
+                batch_size=batch_size,
+                show_progress_bar=False
+            )
+            seconds = time.perf_counter() - batch_start
+            if embeddings is None:
+                embeddings = np.empty((len(chunks), encoded.shape[1]), dtype=encoded.dtype)
+            embeddings[batch] = encoded
+            
+            if event_callback is None:
+                continue
+            finished = []
+            for i in batch:
+                page_index = chunk_pages[i]
+                remaining[page_index] -= 1
+                if remaining[page_index] == 0:
+                    finished.append(page_ids[page_index])
+            for page_id in finished:
+                event_callback(page_event('embedded_text', page_id, total, seconds / len(finished)))
+        
+        return embeddings
+    
+    @write_locked
+    def add_encoded(self, embeddings: np.ndarray, chunks: ChunkStore, metadata: List[Dict]):
+        """
+        Add pre-computed chunk embeddings to the dense and BM25 indices.
+        
+        chunks may also be a plain list of strings (one page each).
+        """
         # Add all embeddings to index at once
         self.index.add(embeddings.astype('float32'))
+        self.lexical_index.add(chunks)
         
         # Store chunks and metadata
-        self.text_chunks.extend(all_chunks)
-        self.metadata.extend(all_metadata)
+        self.text_chunks.extend(chunks)
+        self.metadata.extend(metadata)
+        self.doc_ids.update(entry['doc_id'] for entry in metadata)
+    
+    @read_locked
+    def has_document(self, doc_id: str) -> bool:
+        """True if chunks of the document are already in the index."""
+        return doc_id in self.doc_ids
     
-    def search(self, query: str, top_k: int = None) -> List[Dict]:
-        """Search for relevant text chunks."""
+    @read_locked
+    def search(self, query: str, top_k: int = None,
+               query_embedding: np.ndarray = None) -> List[Dict]:
+        """
+        Search for relevant text chunks.
+        
+        query_embedding, if given, is used instead of encoding the query
+        here (e.g. on a shard without a model, see sharding.py).
+        """
         if top_k is None:
             top_k = self.config['retrieval']['top_k_text']
         
@@ -78,25 +203,140 @@ class TextRetriever:
         
         top_k = min(top_k, len(self.text_chunks))
         
+        if not self.hybrid:
+            return [
+                self._make_result(idx, 1 / (1 + distance))
+                for idx, distance in self._dense_search(query, top_k, query_embedding)
+            ]
+        
+        # Bare identifiers (e.g. "CLM-2024-0042") skip the encoder entirely
+        if is_identifier_query(query):
+            with self.metrics.span('text.bm25_search'):
+                lexical_hits = self.lexical_index.search(query, top_k)
+            if lexical_hits:
+                self.metrics.count('identifier_fast_path')
+                fused = reciprocal_rank_fusion([[idx for idx, _ in lexical_hits]], self.rrf_k)
+                lexical_scores = dict(lexical_hits)
+                return [
+                    self._make_result(idx, score, lexical_score=lexical_scores[idx])
+                    for idx, score in fused
+                ]
+        
+        candidates = min(top_k * self.hybrid_candidates, len(self.text_chunks))
+        dense_hits = self._dense_search(query, candidates, query_embedding)
+        with self.metrics.span('text.bm25_search'):
+            lexical_hits = self.lexical_index.search(query, candidates)
+        
+        fused = reciprocal_rank_fusion(
+            [[idx for idx, _ in dense_hits], [idx for idx, _ in lexical_hits]],
+            self.rrf_k
+        )
+        
+        dense_scores = {idx: 1 / (1 + distance) for idx, distance in dense_hits}
+        lexical_scores = dict(lexical_hits)
+        return [
+            self._make_result(
+                idx, score,
+                dense_score=dense_scores.get(idx),
+                lexical_score=lexical_scores.get(idx)
+            )
+            for idx, score in fused[:top_k]
+        ]
+    
+    @read_locked
+    def search_candidates(self, query: str, top_k: int = None,
+                          query_embedding: np.ndarray = None) -> Dict:
+        """
+        Unfused candidates for a search fused elsewhere (see sharding.py).
+        
+        Returns {'dense': [(chunk index, L2 distance)], 'lexical': [(chunk
+        index, BM25 score)], 'chunks': {chunk index: {'text', 'metadata'}}},
+        each ranking best first with as many candidates as search() fuses.
+        """
+        if top_k is None:
+            top_k = self.config['retrieval']['top_k_text']
+        
+        if not self.text_chunks:
+            return {'dense': [], 'lexical': [], 'chunks': {}}
+        
+        candidates = min(top_k * self.hybrid_candidates if self.hybrid else top_k,
+                         len(self.text_chunks))
+        dense_hits = self._dense_search(query, candidates, query_embedding)
+        lexical_hits = []
+        if self.hybrid:
+            with self.metrics.span('text.bm25_search'):
+                lexical_hits = self.lexical_index.search(query, candidates)
+        
+        return {
+            'dense': dense_hits,
+            'lexical': lexical_hits,
+            'chunks': {
+                idx: {'text': self.text_chunks[idx], 'metadata': self.metadata[idx]}
+                for idx, _ in dense_hits + lexical_hits
+            }
+        }
+    
+    @read_locked
+    def search_lexical(self, query: str, top_k: int = None) -> List[Dict]:
+        """BM25-only search, e.g. for exact policy/claim/invoice numbers."""
+        if top_k is None:
+            top_k = self.config['retrieval']['top_k_text']
+        
+        with self.metrics.span('text.bm25_search'):
+            hits = self.lexical_index.search(query, top_k)
+        fused = reciprocal_rank_fusion([[idx for idx, _ in hits]], self.rrf_k)
+        lexical_scores = dict(hits)
+        return [
+            self._make_result(idx, score, lexical_score=lexical_scores[idx])
+            for idx, score in fused
+        ]
+    
+    def _dense_search(self, query: str, top_k: int,
+                      query_embedding: np.ndarray = None) -> List[tuple]:
+        """Return (chunk index, L2 distance) pairs from the FAISS index."""
         # Encode query
-        query_embedding = self.model.encode(query, convert_to_numpy=True)
+        if query_embedding is None:
+            with self.metrics.span('text.encode_query'):
+                query_embedding = self.encode_query(query)
         query_embedding = np.array([query_embedding]).astype('float32')
         
         # Search
-        distances, indices = self.index.search(query_embedding, top_k)
-        
-        # Prepare results
-        results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            if idx < len(self.text_chunks):
-                results.append({
-                    'text': self.text_chunks[idx],
-                    'metadata': self.metadata[idx],
-                    'score': float(1 / (1 + distance))
-                })
+        with self.metrics.span('text.faiss_search'):
+            distances, indices = self.index.search(query_embedding, top_k)
         
-        return results
+        return [
+            (int(idx), float(distance))
+            for idx, distance in zip(indices[0], distances[0])
+            if 0 <= idx < len(self.text_chunks)
+        ]
+    
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode several queries in one forward pass."""
+        return self.model.encode(
+            queries,
+            convert_to_numpy=True,
+            batch_size=32,
+            show_progress_bar=False
+        )
     
+    def encode_query(self, query: str) -> np.ndarray:
+        """Embed one query, through query_encoder when one is set."""
+        if self.query_encoder is not None:
+            return self.query_encoder(query)
+        return self.model.encode(query, convert_to_numpy=True)
+    
+    def _make_result(self, idx: int, score: float, **scores) -> Dict:
+        result = {
+            'text': self.text_chunks[idx],
+            'metadata': self.metadata[idx],
+            'score': float(score)
+        }
+        for name, value in scores.items():
+            if value is not None:
+                result[name] = float(value)
+        return result
+    
+    @write_locked
     def save_index(self, index_path: str = None):
         """Save FAISS index and metadata."""
         if index_path is None:
@@ -105,16 +345,19 @@ class TextRetriever:
                 'text_index.faiss'
             )
         
-        faiss.write_index(self.index, index_path)
+        self.index.save(index_path)
         
         metadata_path = index_path.replace('.faiss', '_metadata.json')
         save_json({
-            'text_chunks': self.text_chunks,
+            'text_chunks': self.text_chunks.to_dict(),
             'metadata': self.metadata
         }, metadata_path)
         
+        self.lexical_index.save(index_path.replace('.faiss', '_bm25.npz'))
+        
         print(f"  ✓ Text index saved")
     
+    @write_locked
     def load_index(self, index_path: str = None):
         """Load FAISS index and metadata."""
         if index_path is None:
@@ -123,26 +366,20 @@ class TextRetriever:
                 'text_index.faiss'
             )
         
-        self.index = faiss.read_index(index_path)
+        self.index.load(index_path)
         
         metadata_path = index_path.replace('.faiss', '_metadata.json')
         data = load_json(metadata_path)
-        self.text_chunks = data['text_chunks']
+        self.text_chunks = ChunkStore.from_dict(data['text_chunks'])
         self.metadata = data['metadata']
+        self.doc_ids = {entry['doc_id'] for entry in self.metadata}
         
-        print(f"  ✓ Text index loaded: {len(self.text_chunks)} chunks")
-    
-    def _chunk_text(self, text: str) -> List[str]:
-        """Split text into overlapping chunks."""
-        chunk_size = self.config['embeddings']['chunk_size']
-        overlap = self.config['embeddings']['chunk_overlap']
-        
-        words = text.split()
-        chunks = []
+        lexical_path = index_path.replace('.faiss', '_bm25.npz')
+        self.lexical_index = BM25Index()
+        if os.path.exists(lexical_path):
+            self.lexical_index.load(lexical_path)
+        else:
+            # Index saved before BM25 existed: rebuild from the stored chunks
+            self.lexical_index.add(self.text_chunks)
         
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = ' '.join(words[i:i + chunk_size])
-            if chunk.strip():
-                chunks.append(chunk)
-        
-        return chunks
+        print(f"  ✓ Text index loaded: {len(self.text_chunks)} chunks")
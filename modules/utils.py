@@ -1,6 +1,11 @@
 import yaml
 import json
 import os
+import time
+import threading
+import functools
+import sqlite3
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, List, Any
 import numpy as np
@@ -32,6 +37,143 @@ def ensure_dir(directory: str):
     """Create directory if it doesn't exist."""
     Path(directory).mkdir(parents=True, exist_ok=True)
 
+@contextmanager
+def sqlite_connection(db_path: str, row_factory=None):
+    """Open a SQLite connection in autocommit mode (transactions are explicit); closed on exit."""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+class ReadWriteLock:
+    """Many concurrent readers or one exclusive writer (writers are preferred)."""
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+    
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+    
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+    
+    def acquire_write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+    
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+    
+    def read(self):
+        return _LockContext(self.acquire_read, self.release_read)
+    
+    def write(self):
+        return _LockContext(self.acquire_write, self.release_write)
+
+class _LockContext:
+    def __init__(self, acquire, release):
+        self._acquire = acquire
+        self._release = release
+    
+    def __enter__(self):
+        self._acquire()
+        return self
+    
+    def __exit__(self, *exc):
+        self._release()
+        return False
+
+def read_locked(method):
+    """Run a method holding self.lock (a ReadWriteLock) for reading."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def write_locked(method):
+    """Run a method holding self.lock (a ReadWriteLock) exclusively."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+# Display names for the per-page pipeline stages
+STAGE_LABELS = {
+    'rendered': 'Rendering',
+    'ocred': 'OCR',
+    'embedded_text': 'Text embedding',
+    'embedded_image': 'Image embedding',
+}
+
+def page_event(stage: str, page: int, total: int, seconds: float, **extra) -> Dict:
+    """
+    Per-page pipeline event.
+    
+    stage is 'started', 'rendered', 'ocred', 'embedded_text' or
+    'embedded_image'; seconds is the time spent on this page in that stage.
+    """
+    event = {'stage': stage, 'page': page, 'total': total, 'seconds': seconds}
+    event.update(extra)
+    return event
+
+class PipelineProgress:
+    """Turn per-page pipeline events into overall progress and throughput."""
+    
+    def __init__(self, stages: tuple = ('rendered', 'ocred', 'embedded_text', 'embedded_image')):
+        self.stages = stages
+        self.total = 0
+        self.done = {stage: 0 for stage in stages}
+        self.seconds = {stage: 0.0 for stage in stages}
+        self.started = time.perf_counter()
+    
+    def update(self, event: Dict):
+        if event['total']:
+            self.total = event['total']
+        if event['stage'] in self.done:
+            self.done[event['stage']] += 1
+            self.seconds[event['stage']] += event['seconds']
+    
+    @property
+    def fraction(self) -> float:
+        if not self.total:
+            return 0.0
+        finished = sum(min(done, self.total) for done in self.done.values())
+        return finished / (self.total * len(self.stages))
+    
+    def pages_per_second(self, stage: str) -> float:
+        """Wall-clock throughput of a stage since the first event."""
+        elapsed = time.perf_counter() - self.started
+        return self.done[stage] / elapsed if elapsed > 0 else 0.0
+    
+    def describe(self) -> str:
+        stage = next(
+            (stage for stage in self.stages if self.done[stage] < self.total),
+            self.stages[-1]
+        )
+        return (
+            f"{STAGE_LABELS.get(stage, stage)}: {self.done[stage]}/{self.total} pages "
+            f"({self.pages_per_second(stage):.2f} pages/s)"
+        )
+
 class DocumentMetadata:
     """Store metadata for processed documents."""
     def __init__(self, doc_id: str, filename: str, pages: int):
@@ -39,12 +181,26 @@ class DocumentMetadata:
         self.filename = filename
         self.pages = pages
         self.page_metadata = []
+        # Ingest-time CriticalAgent.extract_document_fields output
+        self.fields = {}
+        # Closest earlier document if this one is a near-duplicate (see dedup)
+        self.duplicate_of = None
+        # In-memory CLIP-sized page renders and PageLayouts, kept out of to_dict()
+        self.page_images = []
+        self.page_layouts = []
     
-    def add_page(self, page_id: int, text: str, image_path: str):
+    def add_page(self, page_id: int, text: str, image_path: str,
+                 width: int = None, height: int = None, thumbnails: Dict = None,
+                 layout_path: str = None, visual_elements: Dict = None):
         self.page_metadata.append({
             "page_id": page_id,
             "text": text,
-            "image_path": image_path
+            "image_path": image_path,
+            "width": width,
+            "height": height,
+            "thumbnails": thumbnails or {},
+            "layout_path": layout_path,
+            "visual_elements": visual_elements
         })
     
     def to_dict(self):
@@ -52,5 +208,7 @@ class DocumentMetadata:
             "doc_id": self.doc_id,
             "filename": self.filename,
             "pages": self.pages,
-            "page_metadata": self.page_metadata
+            "page_metadata": self.page_metadata,
+            "fields": self.fields,
+            "duplicate_of": self.duplicate_of
         }
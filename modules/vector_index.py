@@ -0,0 +1,203 @@
+import os
+import faiss
+import numpy as np
+from typing import Dict, Tuple
+
+INDEX_TYPES = ('flat', 'fp16', 'sq8', 'pq')
+
+class VectorIndex:
+    """
+    FAISS L2 index with optional vector compression.
+
+    Vectors can be held as fp32 (flat), fp16, scalar-quantized int8 (sq8)
+    or product-quantized codes (pq). sq8 and pq learn their ranges or
+    codebooks from min_train_size vectors; until then vectors are buffered
+    at full precision and searched exactly. Full-precision vectors are kept
+    in an append-only float32 file next to the index only while they are
+    needed: before the quantizer is trained, and for exact re-ranking of
+    compressed indices. It is memory-mapped on load.
+    """
+
+    def __init__(self, dim: int, index_type: str = 'flat', pq_subquantizers: int = 16,
+                 rerank: bool = False, rerank_factor: int = 4, min_train_size: int = 1024):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index type '{index_type}'. "
+                f"Choose one of: {', '.join(INDEX_TYPES)}"
+            )
+        self.dim = dim
+        self.index_type = index_type
+        self.pq_subquantizers = pq_subquantizers
+        self.rerank = rerank
+        self.rerank_factor = rerank_factor
+        # Only sq8 and pq need training (ranges, codebooks); flat and fp16 start trained
+        self.min_train_size = min_train_size
+
+        self.index = self._build_index()
+        self.stored = np.empty((0, dim), dtype='float32')  # memory-mapped on load
+        self.pending = []
+        self.store_path = None
+        self.has_store = self.keeps_store
+
+    @classmethod
+    def from_config(cls, dim: int, config: Dict) -> 'VectorIndex':
+        index_config = config.get('index', {})
+        return cls(
+            dim,
+            index_type=index_config.get('type', 'flat'),
+            pq_subquantizers=index_config.get('pq_subquantizers', 16),
+            rerank=index_config.get('rerank', False),
+            rerank_factor=index_config.get('rerank_factor', 4),
+            min_train_size=index_config.get('min_train_size', 1024)
+        )
+
+    @property
+    def keeps_store(self) -> bool:
+        """Full-precision vectors are needed to train the quantizer or to re-rank."""
+        if not self.index.is_trained:
+            return True
+        return self.rerank and self.index_type != 'flat'
+
+    @property
+    def ntotal(self) -> int:
+        if self.index.is_trained:
+            return self.index.ntotal
+        return len(self.stored) + sum(len(p) for p in self.pending)
+
+    def _build_index(self):
+        if self.index_type == 'fp16':
+            return faiss.IndexScalarQuantizer(
+                self.dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2
+            )
+        if self.index_type == 'sq8':
+            return faiss.IndexScalarQuantizer(
+                self.dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2
+            )
+        if self.index_type == 'pq':
+            return faiss.IndexPQ(self.dim, self.pq_subquantizers, 8, faiss.METRIC_L2)
+        return faiss.IndexFlatL2(self.dim)
+
+    def add(self, vectors: np.ndarray):
+        """Add vectors, training the quantizer once enough have been seen."""
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        if self.has_store:
+            self.pending.append(vectors)
+
+        if self.index.is_trained:
+            self.index.add(vectors)
+        elif self.ntotal >= self.min_train_size:
+            all_vectors = self._all_vectors()
+            self.index.train(all_vectors)
+            self.index.add(all_vectors)
+            if not self.keeps_store:
+                # Trained and not re-ranking: the buffered vectors are no longer needed
+                self.stored = np.empty((0, self.dim), dtype='float32')
+                self.pending = []
+                self.has_store = False
+
+    def search(self, queries: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (distances, indices) like faiss; missing hits are -1."""
+        queries = np.ascontiguousarray(queries, dtype='float32')
+
+        # Until the quantizer is trained the full-precision store is searched directly
+        if not self.index.is_trained:
+            return self._exact_search(queries, np.arange(self.ntotal), top_k)
+
+        if not (self.rerank and self.has_store) or self.index_type == 'flat':
+            return self.index.search(queries, top_k)
+
+        candidates_k = min(top_k * self.rerank_factor, self.ntotal)
+        _, candidates = self.index.search(queries, candidates_k)
+
+        distances = np.full((len(queries), top_k), np.inf, dtype='float32')
+        indices = np.full((len(queries), top_k), -1, dtype='int64')
+        for row, candidate_ids in enumerate(candidates):
+            candidate_ids = candidate_ids[candidate_ids >= 0]
+            d, i = self._exact_search(queries[row:row + 1], candidate_ids, top_k)
+            distances[row], indices[row] = d[0], i[0]
+        return distances, indices
+
+    def _exact_search(self, queries: np.ndarray, ids: np.ndarray, top_k: int):
+        vectors = self._get_vectors(ids)
+        distances = np.full((len(queries), top_k), np.inf, dtype='float32')
+        indices = np.full((len(queries), top_k), -1, dtype='int64')
+        if len(ids) == 0:
+            return distances, indices
+
+        dist = ((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=-1)
+        k = min(top_k, len(ids))
+        for row in range(len(queries)):
+            order = np.argsort(dist[row])[:k]
+            distances[row, :k] = dist[row, order]
+            indices[row, :k] = ids[order]
+        return distances, indices
+
+    def _get_vectors(self, ids: np.ndarray) -> np.ndarray:
+        ids = np.asarray(ids, dtype='int64')
+        stored_count = len(self.stored)
+        if not self.pending:
+            return np.asarray(self.stored[ids], dtype='float32')
+
+        pending = np.concatenate(self.pending)
+        vectors = np.empty((len(ids), self.dim), dtype='float32')
+        from_store = ids < stored_count
+        vectors[from_store] = self.stored[ids[from_store]]
+        vectors[~from_store] = pending[ids[~from_store] - stored_count]
+        return vectors
+
+    def _all_vectors(self) -> np.ndarray:
+        return np.concatenate([np.asarray(self.stored)] + self.pending)
+
+    def memory_bytes(self) -> int:
+        """Approximate resident size of the compressed vectors."""
+        return self.index.ntotal * self.index.sa_code_size()
+
+    def save(self, index_path: str):
+        """Write the FAISS index and append new vectors to the full-precision store, if kept."""
+        faiss.write_index(self.index, index_path)
+        if not self.has_store:
+            return
+
+        store_path = self._store_path(index_path)
+        if store_path != self.store_path:
+            # New location: write every vector, not just the unsaved ones
+            self.pending = [np.asarray(self.stored)] + self.pending
+            mode = 'wb'
+        else:
+            mode = 'ab'
+
+        with open(store_path, mode) as f:
+            for vectors in self.pending:
+                f.write(vectors.tobytes())
+
+        self.pending = []
+        self._map_store(store_path)
+
+    def load(self, index_path: str):
+        """Load the FAISS index and memory-map the full-precision store."""
+        self.index = faiss.read_index(index_path)
+        self.pending = []
+
+        store_path = self._store_path(index_path)
+        self.has_store = False
+        if self.keeps_store and os.path.exists(store_path):
+            self._map_store(store_path)
+            # A store that stopped being written (rerank was off) misses vectors
+            self.has_store = not self.index.is_trained or len(self.stored) == self.index.ntotal
+        if not self.has_store:
+            # Indices saved without a complete store cannot be re-ranked
+            self.stored = np.empty((0, self.dim), dtype='float32')
+            self.store_path = None
+
+    def _map_store(self, store_path: str):
+        count = os.path.getsize(store_path) // (4 * self.dim)
+        if count:
+            self.stored = np.memmap(store_path, dtype='float32', mode='r',
+                                    shape=(count, self.dim))
+        else:
+            self.stored = np.empty((0, self.dim), dtype='float32')
+        self.store_path = store_path
+
+    @staticmethod
+    def _store_path(index_path: str) -> str:
+        return index_path.replace('.faiss', '_vectors.f32')
@@ -0,0 +1,199 @@
+from typing import Dict, List
+import cv2
+import numpy as np
+from PIL import Image
+from .layout import empty_words
+from .ocr_preprocessing import binarize, median_text_height
+
+# Element kinds stored per page, in display order
+ELEMENT_KINDS = ('tables', 'stamps', 'signatures', 'logos')
+
+ELEMENT_LABELS = {
+    'tables': 'Table structure',
+    'stamps': 'Stamp',
+    'signatures': 'Signature',
+    'logos': 'Logo',
+}
+
+# Top share of the page treated as the letterhead, where logos sit
+HEADER_BAND = 0.18
+
+def _to_box(x: int, y: int, w: int, h: int, width: int, height: int) -> List[float]:
+    """Pixel rectangle as [x0, y0, x1, y1] page fractions (like OCR word boxes)."""
+    return [round(x / width, 4), round(y / height, 4),
+            round((x + w) / width, 4), round((y + h) / height, 4)]
+
+def _overlaps(box: List[float], others: List[List[float]], share: float = 0.5) -> bool:
+    """True if at least share of box lies inside one of others."""
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    for other in others:
+        width = min(box[2], other[2]) - max(box[0], other[0])
+        height = min(box[3], other[3]) - max(box[1], other[1])
+        if width > 0 and height > 0 and width * height >= share * area:
+            return True
+    return False
+
+def _word_mask(words: np.ndarray, shape: tuple, min_conf: int = 50) -> np.ndarray:
+    """Pixels covered by confidently read OCR words."""
+    height, width = shape
+    mask = np.zeros(shape, dtype=np.uint8)
+    for word in words[words['conf'] >= min_conf]:
+        x0, y0 = int(word['x0'] * width), int(word['y0'] * height)
+        x1, y1 = int(np.ceil(word['x1'] * width)), int(np.ceil(word['y1'] * height))
+        mask[y0:y1 + 1, x0:x1 + 1] = 255
+    return mask
+
+def line_masks(ink: np.ndarray) -> tuple:
+    """Horizontal and vertical rules: ink runs much longer than any glyph."""
+    height, width = ink.shape
+    horizontal = cv2.morphologyEx(
+        ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (max(10, width // 25), 1))
+    )
+    vertical = cv2.morphologyEx(
+        ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(10, height // 40)))
+    )
+    return horizontal, vertical
+
+def detect_tables(horizontal: np.ndarray, vertical: np.ndarray,
+                  min_joints: int = 6, min_area: float = 0.01) -> List[List[float]]:
+    """Ruled grids: regions where horizontal and vertical rules cross at min_joints points."""
+    height, width = horizontal.shape
+    kernel = np.ones((3, 3), np.uint8)
+    joints = cv2.bitwise_and(cv2.dilate(horizontal, kernel), cv2.dilate(vertical, kernel))
+    grid = cv2.dilate(cv2.bitwise_or(horizontal, vertical), kernel)
+    contours, _ = cv2.findContours(grid, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    tables = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w * h < min_area * width * height:
+            continue
+        count, _ = cv2.connectedComponents(joints[y:y + h, x:x + w])
+        if count - 1 >= min_joints:
+            tables.append(_to_box(x, y, w, h, width, height))
+    return tables
+
+def detect_colored_marks(rgb: np.ndarray) -> tuple:
+    """
+    Compact blobs of coloured ink: (stamps, logos).
+
+    Rubber stamps and seals are printed in red, blue or violet on black
+    text; a blob inside the header band is taken for a logo instead.
+    """
+    height, width = rgb.shape[:2]
+    hsv = cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)
+    mask = ((hsv[..., 1] >= 70) & (hsv[..., 2] >= 60)).astype(np.uint8) * 255
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((7, 7), np.uint8))
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    stamps, logos = [], []
+    page_area = width * height
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if not 0.001 * page_area <= w * h <= 0.1 * page_area:
+            continue
+        if not 0.4 <= w / h <= 2.5:
+            continue
+        box = _to_box(x, y, w, h, width, height)
+        if (y + h) / height <= HEADER_BAND:
+            logos.append(box)
+        else:
+            stamps.append(box)
+    return stamps, logos
+
+def detect_signatures(ink: np.ndarray, words_mask: np.ndarray,
+                      text_height: float) -> List[List[float]]:
+    """
+    Handwriting: sparse, wide ink clusters that OCR could not read.
+
+    Strokes are joined into clusters; a cluster counts when it is one to
+    six text lines tall, wider than tall, mostly not covered by confident
+    OCR words, only lightly inked (signatures are thin strokes, not
+    filled shapes) and made of a few long strokes rather than a row of
+    glyphs (printed text OCR failed on).
+    """
+    height, width = ink.shape
+    text_height = text_height or max(8.0, height / 100)
+    joined = cv2.dilate(ink, cv2.getStructuringElement(
+        cv2.MORPH_RECT, (max(3, int(text_height)), max(3, int(text_height / 2)))
+    ))
+    contours, _ = cv2.findContours(joined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    signatures = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if not 1.5 * text_height <= h <= 6 * text_height or w < 1.5 * h:
+            continue
+        area = w * h
+        if np.count_nonzero(words_mask[y:y + h, x:x + w]) > 0.3 * area:
+            continue
+        fill = np.count_nonzero(ink[y:y + h, x:x + w]) / area
+        if not 0.02 <= fill <= 0.3:
+            continue
+        strokes, _ = cv2.connectedComponents(ink[y:y + h, x:x + w])
+        if strokes - 1 <= max(4, w / (3 * text_height)):
+            signatures.append(_to_box(x, y, w, h, width, height))
+    return signatures
+
+def detect_header_logos(ink: np.ndarray, words_mask: np.ndarray,
+                        text_height: float) -> List[List[float]]:
+    """Dense, unread ink blocks in the header band (monochrome logos)."""
+    height, width = ink.shape
+    band = int(height * HEADER_BAND)
+    text_height = text_height or max(8.0, height / 100)
+    joined = cv2.morphologyEx(ink[:band], cv2.MORPH_CLOSE, np.ones((5, 5), np.uint8))
+    contours, _ = cv2.findContours(joined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    logos = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        area = w * h
+        if h < 2 * text_height or area < 0.002 * width * height or not 0.25 <= w / h <= 4:
+            continue
+        if np.count_nonzero(words_mask[y:y + h, x:x + w]) > 0.3 * area:
+            continue
+        if np.count_nonzero(joined[y:y + h, x:x + w]) >= 0.3 * area:
+            logos.append(_to_box(x, y, w, h, width, height))
+    return logos
+
+def detect_visual_elements(image: Image, words: np.ndarray = None,
+                           max_side: int = 1200) -> Dict[str, List[List[float]]]:
+    """
+    Tables, stamps, signatures and logos on a rendered page.
+
+    Runs once per page at ingest on a copy no longer than max_side
+    pixels. words (OCR word boxes, see layout.WORD_DTYPE) keep printed
+    text from being taken for handwriting or logos. Returns a box list
+    per kind in ELEMENT_KINDS, boxes as page fractions.
+    """
+    rgb = np.asarray(image.convert('RGB'))
+    scale = max_side / max(rgb.shape[:2])
+    if scale < 1:
+        rgb = cv2.resize(rgb, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    if words is None:
+        words = empty_words()
+
+    binary = binarize(cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY))
+    ink = 255 - binary
+    text_height = median_text_height(binary)
+    words_mask = _word_mask(words, ink.shape)
+
+    horizontal, vertical = line_masks(ink)
+    unruled = cv2.bitwise_and(ink, cv2.bitwise_not(cv2.bitwise_or(horizontal, vertical)))
+    stamps, logos = detect_colored_marks(rgb)
+    # Coloured marks are also dark enough to be ink; count each mark once
+    signatures = [
+        box for box in detect_signatures(unruled, words_mask, text_height)
+        if not _overlaps(box, stamps)
+    ]
+    logos += [
+        box for box in detect_header_logos(ink, words_mask, text_height)
+        if not _overlaps(box, logos)
+    ]
+
+    return {
+        'tables': detect_tables(horizontal, vertical),
+        'stamps': stamps,
+        'signatures': signatures,
+        'logos': logos,
+    }
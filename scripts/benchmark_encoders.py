@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark encoder backends (torch fp32, dynamic int8, ONNX Runtime).
+
+Reports throughput for the MiniLM text encoder and both CLIP towers, and
+checks every backend's embeddings against the fp32 reference.
+
+    python scripts/benchmark_encoders.py --backends torch int8 onnx
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from transformers import CLIPProcessor
+from modules.utils import load_config
+from modules.encoders import (
+    ENCODER_BACKENDS, load_text_encoder, load_image_encoder, compare_embeddings
+)
+from benchmark_image_storage import synthetic_pages
+
+SAMPLE_TEXTS = [
+    "Claim Number: CLM-2024-0042 submitted for water damage to the insured property.",
+    "Policy Number POL123456 covers fire, theft and natural calamities for one year.",
+    "Invoice No. INV-7781 Total Amount Due Rs. 45,300.00 payable within 30 days.",
+    "The surveyor inspected the vehicle and recommends replacement of the front bumper.",
+    "Please find enclosed the claim form, the repair estimate and the police report.",
+    "Deductible of 5,000 applies to each and every loss under section II of the policy.",
+    "Status: Under Review. The claimant will be notified once the assessment is complete.",
+    "Premium payable annually; renewal due on 01/04/2025 subject to no-claim bonus.",
+]
+
+def encode_clip_images(model, processor, images):
+    inputs = processor(images=images, return_tensors="pt")
+    with torch.no_grad():
+        features = model.get_image_features(**inputs)
+    return (features / features.norm(dim=-1, keepdim=True)).cpu().numpy()
+
+def encode_clip_texts(model, processor, texts):
+    inputs = processor(text=texts, return_tensors="pt", padding=True)
+    with torch.no_grad():
+        features = model.get_text_features(**inputs)
+    return (features / features.norm(dim=-1, keepdim=True)).cpu().numpy()
+
+def timed(fn, repeats: int):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeats
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark encoder backends")
+    parser.add_argument('--config', default='config.yaml', help='Path to configuration file')
+    parser.add_argument('--backends', nargs='+', default=list(ENCODER_BACKENDS),
+                        choices=ENCODER_BACKENDS)
+    parser.add_argument('--texts', type=int, default=256, help='Text inputs per run')
+    parser.add_argument('--images', type=int, default=16, help='Page images per run')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help='Optional path for JSON results')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    text_model = config['models']['text_encoder']
+    image_model = config['models']['image_encoder']
+    cache_dir = config['paths'].get('models')
+
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] + f" Ref {i}" for i in range(args.texts)]
+    images = synthetic_pages(args.images, dpi=100)
+    processor = CLIPProcessor.from_pretrained(image_model)
+
+    backends = ['torch'] + [b for b in args.backends if b != 'torch']
+    reference = {}
+    results = []
+
+    for backend in backends:
+        encoder = load_text_encoder(text_model, backend)
+        text_emb, text_time = timed(
+            lambda: encoder.encode(texts, convert_to_numpy=True, batch_size=32),
+            args.repeats
+        )
+
+        clip = load_image_encoder(image_model, backend, cache_dir)
+        image_emb, image_time = timed(
+            lambda: encode_clip_images(clip, processor, images), args.repeats
+        )
+        clip_text_emb, clip_text_time = timed(
+            lambda: encode_clip_texts(clip, processor, texts[:32]), args.repeats
+        )
+
+        if backend == 'torch':
+            reference = {
+                'text': text_emb, 'image': image_emb, 'clip_text': clip_text_emb
+            }
+
+        results.append({
+            'backend': backend,
+            'text_per_sec': len(texts) / text_time,
+            'image_per_sec': len(images) / image_time,
+            'clip_text_per_sec': 32 / clip_text_time,
+            'text_check': compare_embeddings(reference['text'], text_emb),
+            'image_check': compare_embeddings(reference['image'], image_emb),
+            'clip_text_check': compare_embeddings(reference['clip_text'], clip_text_emb),
+        })
+
+    print(f"{'backend':8s} {'text/s':>9s} {'pages/s':>9s} {'clip txt/s':>11s} "
+          f"{'text cos':>9s} {'image cos':>10s} {'ok':>4s}")
+    for r in results:
+        passed = all(r[k]['passed'] for k in ('text_check', 'image_check', 'clip_text_check'))
+        print(f"{r['backend']:8s} {r['text_per_sec']:9.1f} {r['image_per_sec']:9.2f} "
+              f"{r['clip_text_per_sec']:11.1f} {r['text_check']['min_cosine']:9.4f} "
+              f"{r['image_check']['min_cosine']:10.4f} {'yes' if passed else 'NO':>4s}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'torch_threads': torch.get_num_threads(), 'results': results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark page image storage options.
+
+Renders pages once (from a PDF, or synthetic pages when no PDF is given)
+and reports encode time and bytes per page for every storage format,
+including the thumbnail pyramid written at ingest.
+
+    python scripts/benchmark_image_storage.py --pdf data/raw_pdfs/claim.pdf
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+from modules.document_preprocessor import save_page_image, build_thumbnail_pyramid
+
+OPTIONS = [
+    ('png', None),
+    ('jpeg', 85),
+    ('jpeg', 70),
+    ('webp', 80),
+    ('webp', 60),
+]
+
+THUMBNAILS = {'clip': 224, 'preview': 600}
+
+def synthetic_pages(count: int, dpi: int):
+    """Generate text-heavy letter-size pages resembling scanned forms."""
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    pages = []
+    for page_num in range(count):
+        image = Image.new('RGB', (width, height), 'white')
+        draw = ImageDraw.Draw(image)
+        margin = dpi // 2
+        y = margin
+        draw.text((margin, y), f"CLAIM FORM - PAGE {page_num + 1}", fill='black')
+        y += dpi // 3
+        while y < height - margin:
+            draw.text(
+                (margin, y),
+                f"Field {y}: Policy Number POL-{page_num:03d}{y:06d}  Amount Rs. {y * 13},00",
+                fill='black'
+            )
+            draw.line((margin, y + 18, width - margin, y + 18), fill='gray')
+            y += dpi // 6
+        pages.append(image)
+    return pages
+
+def benchmark(pages, fmt: str, quality: int):
+    """Encode every page and its pyramid in memory and time it."""
+    page_bytes = 0
+    thumbnail_bytes = {name: 0 for name in THUMBNAILS}
+    start = time.perf_counter()
+
+    for page in pages:
+        buffer = io.BytesIO()
+        save_page_image(page, buffer, fmt, quality or 85)
+        page_bytes += buffer.tell()
+
+        for name, thumbnail in build_thumbnail_pyramid(page, THUMBNAILS).items():
+            buffer = io.BytesIO()
+            save_page_image(thumbnail, buffer, fmt, quality or 85)
+            thumbnail_bytes[name] += buffer.tell()
+
+    elapsed = time.perf_counter() - start
+    count = len(pages)
+    return {
+        'format': fmt,
+        'quality': quality,
+        'seconds_per_page': elapsed / count,
+        'page_bytes': page_bytes // count,
+        'thumbnail_bytes': {name: size // count for name, size in thumbnail_bytes.items()},
+        'total_bytes_per_page': (page_bytes + sum(thumbnail_bytes.values())) // count
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page image storage formats")
+    parser.add_argument('--pdf', help='PDF to render (synthetic pages if omitted)')
+    parser.add_argument('--pages', type=int, default=5, help='Synthetic page count')
+    parser.add_argument('--dpi', type=int, default=150, help='Render resolution')
+    parser.add_argument('--output', help='Optional path for JSON results')
+    args = parser.parse_args()
+
+    if args.pdf:
+        from pdf2image import convert_from_path
+        pages = convert_from_path(args.pdf, dpi=args.dpi)
+    else:
+        pages = synthetic_pages(args.pages, args.dpi)
+
+    results = [benchmark(pages, fmt, quality) for fmt, quality in OPTIONS]
+
+    print(f"{'format':10s} {'quality':>7s} {'ms/page':>9s} {'page KB':>9s} "
+          f"{'preview KB':>11s} {'clip KB':>8s} {'total KB':>9s}")
+    for r in results:
+        print(f"{r['format']:10s} {str(r['quality'] or '-'):>7s} "
+              f"{r['seconds_per_page'] * 1000:9.1f} {r['page_bytes'] / 1024:9.1f} "
+              f"{r['thumbnail_bytes']['preview'] / 1024:11.1f} "
+              f"{r['thumbnail_bytes']['clip'] / 1024:8.1f} "
+              f"{r['total_bytes_per_page'] / 1024:9.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'pages': len(pages), 'dpi': args.dpi, 'results': results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark vector index compression modes.
+
+Reports memory footprint, recall@k against exact fp32 search and query
+latency for every index type, with and without exact re-ranking. Uses the
+full-precision store written next to a saved index, or synthetic clustered
+vectors when none is given.
+
+    python scripts/benchmark_index_quantization.py --vectors data/embeddings/text_index_vectors.f32 --dim 384
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from modules.vector_index import VectorIndex, INDEX_TYPES
+
+def synthetic_vectors(count: int, dim: int, clusters: int = 64, seed: int = 0):
+    """Clustered vectors roughly shaped like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype('float32')
+    labels = rng.integers(0, clusters, count)
+    vectors = centers[labels] + 0.3 * rng.standard_normal((count, dim)).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+def benchmark(vectors, queries, truth, index_type, rerank, top_k, args):
+    index = VectorIndex(
+        vectors.shape[1], index_type,
+        pq_subquantizers=args.pq_subquantizers,
+        rerank=rerank, rerank_factor=args.rerank_factor,
+        min_train_size=min(args.min_train_size, len(vectors))
+    )
+    start = time.perf_counter()
+    index.add(vectors)
+    build_time = time.perf_counter() - start
+
+    # Round-trip through disk so re-ranking reads the memory-mapped store
+    workdir = tempfile.mkdtemp()
+    index_path = os.path.join(workdir, 'bench_index.faiss')
+    index.save(index_path)
+    index.load(index_path)
+
+    start = time.perf_counter()
+    found = np.vstack([index.search(q[None, :], top_k)[1] for q in queries])
+    query_time = (time.perf_counter() - start) / len(queries)
+
+    result = {
+        'type': index_type,
+        'rerank': rerank,
+        'bytes_per_vector': index.index.sa_code_size(),
+        'index_memory_mb': index.memory_bytes() / 2**20,
+        'index_file_mb': os.path.getsize(index_path) / 2**20,
+        'recall_at_k': recall_at_k(truth, found),
+        'build_seconds': build_time,
+        'query_ms': query_time * 1000
+    }
+    shutil.rmtree(workdir)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector index compression")
+    parser.add_argument('--vectors', help='Full-precision store (*_vectors.f32) to load')
+    parser.add_argument('--dim', type=int, default=384, help='Embedding dimension')
+    parser.add_argument('--count', type=int, default=50000, help='Synthetic vector count')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--pq-subquantizers', type=int, default=16)
+    parser.add_argument('--rerank-factor', type=int, default=4)
+    parser.add_argument('--min-train-size', type=int, default=10000)
+    parser.add_argument('--output', help='Optional path for JSON results')
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.fromfile(args.vectors, dtype='float32').reshape(-1, args.dim)
+    else:
+        vectors = synthetic_vectors(args.count, args.dim)
+
+    rng = np.random.default_rng(1)
+    picks = rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)
+    queries = vectors[picks] + 0.05 * rng.standard_normal((len(picks), args.dim)).astype('float32')
+
+    exact = VectorIndex(args.dim, 'flat')
+    exact.add(vectors)
+    truth = exact.search(queries, args.top_k)[1]
+
+    results = []
+    for index_type in INDEX_TYPES:
+        for rerank in ([False] if index_type == 'flat' else [False, True]):
+            results.append(benchmark(vectors, queries, truth, index_type, rerank, args.top_k, args))
+
+    print(f"{len(vectors)} vectors x {args.dim} dims, recall@{args.top_k}")
+    print(f"{'type':6s} {'rerank':>6s} {'B/vec':>6s} {'mem MB':>8s} {'recall':>7s} {'ms/query':>9s}")
+    for r in results:
+        print(f"{r['type']:6s} {str(r['rerank']):>6s} {r['bytes_per_vector']:6d} "
+              f"{r['index_memory_mb']:8.2f} {r['recall_at_k']:7.3f} {r['query_ms']:9.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'vectors': len(vectors), 'dim': args.dim, 'results': results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark on a synthetic insurance corpus.
+
+Generates claim forms, invoices, policies and inspection reports (see
+synthetic_documents.py), then runs the full pipeline against a scratch
+copy of the configuration so real indices are never touched. Reports
+ingest pages/sec, classification latency and accuracy, query p50/p95
+latency and answer hit rate, identifier lookup hit rate, peak RSS and
+on-disk index size, and writes them as JSON.
+
+    python scripts/benchmark_suite.py --docs 8 --pages 4 --output bench/baseline.json
+    python scripts/benchmark_suite.py --output bench/new.json --compare bench/baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import yaml
+from synthetic_documents import write_corpus
+from modules.utils import load_config, ensure_dir
+
+# Metric -> True if higher is better; used by --compare
+TRACKED_METRICS = {
+    'ingest.pages_per_second': True,
+    'classify.p50_seconds': False,
+    'classify.accuracy': True,
+    'query.p50_seconds': False,
+    'query.p95_seconds': False,
+    'query.answer_hit_rate': True,
+    'lookup.hit_rate': True,
+    'memory.peak_rss_mb': False,
+    'index.bytes': False,
+}
+
+def scratch_config(config_path: str, workdir: str) -> str:
+    """Copy the config with every data path redirected into workdir."""
+    config = load_config(config_path)
+    for name in config['paths']:
+        if name == 'models':
+            continue  # exported encoders can be shared
+        config['paths'][name] = os.path.join(workdir, name) + '/'
+        ensure_dir(config['paths'][name])
+    # A cache warmed by earlier runs would make ingest look faster than it is
+    if 'ocr' in config:
+        config['ocr']['cache_path'] = os.path.join(workdir, 'ocr_cache.sqlite')
+    config.setdefault('identifiers', {})['db_path'] = os.path.join(workdir, 'identifiers.sqlite')
+    config.setdefault('result_log', {})['db_path'] = os.path.join(workdir, 'results.sqlite')
+    # Synthetic documents share boilerplate; keep every one indexed and measured
+    config.setdefault('dedup', {}).update(
+        db_path=os.path.join(workdir, 'dedup.sqlite'), documents='flag', pages='flag'
+    )
+    config_copy = os.path.join(workdir, 'config.yaml')
+    with open(config_copy, 'w') as f:
+        yaml.safe_dump(config, f)
+    return config_copy
+
+def corpus_queries(corpus: list) -> list:
+    """(query, expected answer) pairs built from the ground-truth fields."""
+    queries = []
+    for truth in corpus:
+        fields = truth['fields']
+        queries.append(("What is the policy number?", fields['policy_number']))
+        if 'claim_number' in fields:
+            queries.append(("What is the claim number?", fields['claim_number']))
+        if 'invoice_number' in fields:
+            queries.append(("What is the invoice number?", fields['invoice_number']))
+    return queries
+
+def corpus_identifiers(corpus: list) -> list:
+    """(identifier, pdf_path) pairs: every ground-truth number and the document carrying it."""
+    return [
+        (truth['fields'][name], truth['pdf_path'])
+        for truth in corpus
+        for name in ('policy_number', 'claim_number', 'invoice_number')
+        if name in truth['fields']
+    ]
+
+def answer_hit(result: dict, expected: str) -> bool:
+    """
+    True if the answer itself carries the expected value.
+
+    Only the structured fields and the summary count: the result also
+    echoes the query and the retrieved evidence, which would contain the
+    value whatever was extracted.
+    """
+    if not result:
+        return False
+    answer = [result.get('structured_data'), result.get('summary')]
+    return expected in json.dumps(answer, default=str)
+
+def directory_bytes(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path) for name in files
+    )
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def latency_summary(latencies: list) -> dict:
+    return {
+        'count': len(latencies),
+        'mean_seconds': float(np.mean(latencies)),
+        'p50_seconds': float(np.percentile(latencies, 50)),
+        'p95_seconds': float(np.percentile(latencies, 95)),
+    }
+
+def run_benchmark(args) -> dict:
+    workdir = args.workdir or tempfile.mkdtemp(prefix='idp_bench_')
+    corpus = write_corpus(os.path.join(workdir, 'corpus'), args.docs, args.pages, args.dpi, args.seed)
+    config_path = scratch_config(args.config, workdir)
+
+    # Pipeline progress output is noise here unless asked for
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with quiet:
+        from main import InsuranceDocumentAnalyzer
+        start = time.perf_counter()
+        analyzer = InsuranceDocumentAnalyzer(config_path)
+        startup_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        doc_ids = {}
+        for truth in corpus:
+            doc_ids[truth['pdf_path']] = analyzer.process_document(truth['pdf_path']).doc_id
+        ingest_seconds = time.perf_counter() - start
+        total_pages = sum(truth['pages'] for truth in corpus)
+
+        classify_latencies = []
+        correct = 0
+        for truth in corpus:
+            start = time.perf_counter()
+            classification = analyzer.classify_document(truth['pdf_path'])
+            classify_latencies.append(time.perf_counter() - start)
+            correct += classification['document_type'] == truth['document_type']
+
+        query_latencies = []
+        hits = 0
+        queries = corpus_queries(corpus)
+        for repeat in range(args.repeats):
+            for query, expected in queries:
+                start = time.perf_counter()
+                result = analyzer.query_document(query)
+                query_latencies.append(time.perf_counter() - start)
+                if repeat == 0:
+                    hits += answer_hit(result, expected)
+
+        lookup_latencies = []
+        lookup_hits = 0
+        identifiers = corpus_identifiers(corpus)
+        for identifier, pdf_path in identifiers:
+            start = time.perf_counter()
+            matches = analyzer.lookup_identifier(identifier)
+            lookup_latencies.append(time.perf_counter() - start)
+            lookup_hits += any(match['doc_id'] == doc_ids[pdf_path] for match in matches)
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'platform': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'settings': {
+            'docs': args.docs,
+            'pages_per_doc': args.pages,
+            'dpi': args.dpi,
+            'seed': args.seed,
+            'repeats': args.repeats,
+            'encoder_backend': analyzer.config['models'].get('encoder_backend', 'torch'),
+            'index_type': analyzer.config.get('index', {}).get('type', 'flat'),
+        },
+        'startup_seconds': startup_seconds,
+        'ingest': {
+            'documents': len(corpus),
+            'pages': total_pages,
+            'seconds': ingest_seconds,
+            'pages_per_second': total_pages / ingest_seconds,
+        },
+        'classify': {
+            **latency_summary(classify_latencies),
+            'accuracy': correct / len(corpus),
+        },
+        'query': {
+            **latency_summary(query_latencies),
+            'answer_hit_rate': hits / len(queries),
+        },
+        'lookup': {
+            **latency_summary(lookup_latencies),
+            'hit_rate': lookup_hits / len(identifiers),
+        },
+        'memory': {'peak_rss_mb': peak_rss_mb()},
+        'index': {'bytes': directory_bytes(analyzer.config['paths']['embeddings'])},
+        'stages': analyzer.metrics.to_dict(),
+    }
+
+def lookup(results: dict, dotted: str):
+    value = results
+    for key in dotted.split('.'):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Print changes against a baseline run; returns True if nothing regressed."""
+    print(f"\n{'metric':26s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    ok = True
+    for metric, higher_is_better in TRACKED_METRICS.items():
+        old, new = lookup(baseline, metric), lookup(results, metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        regressed = (change < -tolerance) if higher_is_better else (change > tolerance)
+        ok = ok and not regressed
+        print(f"{metric:26s} {old:12.4g} {new:12.4g} {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic PDFs")
+    parser.add_argument('--config', default='config.yaml', help='Path to configuration file')
+    parser.add_argument('--docs', type=int, default=8, help='Synthetic documents to ingest')
+    parser.add_argument('--pages', type=int, default=4, help='Pages per document')
+    parser.add_argument('--dpi', type=int, default=150, help='Synthetic render resolution')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=3, help='Passes over the query set')
+    parser.add_argument('--workdir', help='Scratch directory (a temporary one by default)')
+    parser.add_argument('--output', help='Optional path for JSON results')
+    parser.add_argument('--compare', metavar='BASELINE', help='Earlier JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Relative change counted as a regression (default 0.2)')
+    parser.add_argument('--verbose', action='store_true', help='Show pipeline output')
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+
+    print(f"Ingest:   {results['ingest']['pages_per_second']:.2f} pages/s "
+          f"({results['ingest']['pages']} pages in {results['ingest']['seconds']:.1f}s)")
+    print(f"Classify: p50 {results['classify']['p50_seconds'] * 1000:.0f} ms, "
+          f"accuracy {results['classify']['accuracy']:.0%}")
+    print(f"Query:    p50 {results['query']['p50_seconds'] * 1000:.0f} ms, "
+          f"p95 {results['query']['p95_seconds'] * 1000:.0f} ms, "
+          f"answer hit rate {results['query']['answer_hit_rate']:.0%}")
+    print(f"Lookup:   p50 {results['lookup']['p50_seconds'] * 1000:.1f} ms, "
+          f"hit rate {results['lookup']['hit_rate']:.0%}")
+    print(f"Memory:   peak RSS {results['memory']['peak_rss_mb']:.0f} MB")
+    print(f"Index:    {results['index']['bytes'] / 1024:.0f} KB on disk")
+
+    if args.output:
+        ensure_dir(os.path.dirname(args.output) or '.')
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
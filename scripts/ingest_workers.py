@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Run the document ingestion worker pool.
+
+Worker processes OCR and embed queued PDFs; this process is the single
+writer that merges their output into the FAISS/BM25 indices. Jobs are
+queued from the Streamlit app (or JobQueue.enqueue) and tracked in the
+SQLite database configured under jobs.db_path.
+
+    python scripts/ingest_workers.py --workers 4
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.job_queue import JobQueue, run_pool
+from modules.utils import load_config
+
+def main():
+    parser = argparse.ArgumentParser(description="Run document ingestion workers")
+    parser.add_argument('--config', default='config.yaml', help='Path to configuration file')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: jobs.workers)')
+    parser.add_argument('--enqueue', nargs='+', metavar='PDF', help='Queue PDFs and exit')
+    args = parser.parse_args()
+
+    if args.enqueue:
+        queue = JobQueue(load_config(args.config)['jobs']['db_path'])
+        for pdf_path in args.enqueue:
+            print(f"Queued {pdf_path}: {queue.enqueue(pdf_path)}")
+        return
+
+    run_pool(args.config, args.workers)
+
+if __name__ == "__main__":
+    main()
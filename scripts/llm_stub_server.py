@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Minimal OpenAI-compatible chat server for testing the LLM client.
+
+Answers POST /v1/chat/completions with a deterministic reply built from
+the last user message, and GET /v1/models with the configured model.
+Token counts are whitespace words; --tokens-per-second paces replies
+like a real server so batching and throughput metrics can be checked.
+Point llm.base_url at it and set llm.enabled: true.
+
+    python scripts/llm_stub_server.py --port 8001 --tokens-per-second 50
+"""
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubHandler(BaseHTTPRequestHandler):
+    model = 'stub'
+    tokens_per_second = 0.0
+
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/v1/models':
+            self._send(200, {'object': 'list', 'data': [{'id': self.model, 'object': 'model'}]})
+        else:
+            self._send(404, {'error': {'message': f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            self._send(404, {'error': {'message': f"Unknown path {self.path}"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        messages = request.get('messages', [])
+        prompt_tokens = sum(len(str(m.get('content', '')).split()) for m in messages)
+        user = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+        words = ['Stub', 'answer:'] + str(user).split()
+        words = words[:max(1, int(request.get('max_tokens') or 256))]
+
+        if self.tokens_per_second > 0:
+            time.sleep(len(words) / self.tokens_per_second)
+
+        self._send(200, {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', self.model),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': ' '.join(words)},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': len(words),
+                'total_tokens': prompt_tokens + len(words)
+            }
+        })
+
+    def log_message(self, format, *args):
+        pass  # one line per request would drown the agents' output
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub OpenAI-compatible chat server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--model', default='stub', help='Model name reported by /v1/models')
+    parser.add_argument('--tokens-per-second', type=float, default=0.0,
+                        help='Simulated generation speed (0 = reply immediately)')
+    args = parser.parse_args()
+
+    StubHandler.model = args.model
+    StubHandler.tokens_per_second = args.tokens_per_second
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Stub LLM server on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
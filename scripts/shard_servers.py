@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Run retrieval shard servers.
+
+Each shard is a process holding the text and image indices for the
+documents whose doc_id hashes to it (see modules/sharding.py). With
+sharding.enabled, the analyzer embeds queries once and fans searches out
+to every shard. Run all shards on one machine, or a subset per node with
+--shard-ids and list every node's host:port under sharding.endpoints.
+Shards and the analyzer share a secret from SHARD_AUTHKEY (or
+sharding.authkey); there is no default.
+
+    export SHARD_AUTHKEY=$(openssl rand -hex 32)  # same value for the analyzer
+    python scripts/shard_servers.py
+    python scripts/shard_servers.py --shard-ids 2 3
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.sharding import start_local_shards
+
+def main():
+    parser = argparse.ArgumentParser(description="Run retrieval shard servers")
+    parser.add_argument('--config', default='config.yaml', help='Path to configuration file')
+    parser.add_argument('--shard-ids', type=int, nargs='+',
+                        help='Shards to serve on this machine (default: all)')
+    args = parser.parse_args()
+
+    processes = start_local_shards(args.config, args.shard_ids)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic insurance PDFs for benchmarks, fully offline.
+
+Each document is a claim form, invoice, policy document or inspection
+report with randomised (seeded) identifiers, amounts and dates. Every PDF
+is written with a JSON sidecar holding its type, key fields and the exact
+text drawn on each page, which benchmarks use as ground truth.
+
+    python scripts/synthetic_documents.py --output data/synthetic --docs 8 --pages 4
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFont
+from modules.utils import ensure_dir
+
+DOCUMENT_TYPES = ('Claim Form', 'Invoice', 'Policy Document', 'Inspection Report')
+
+# Boilerplate repeated across documents of a type, as in real bundles
+BOILERPLATE = {
+    'Claim Form': [
+        "I hereby declare that the information given in this claim form is true and complete.",
+        "The claimant must attach the original bills, the FIR copy and the surveyor report.",
+        "Please fill in the description of loss and the date of loss in block letters.",
+        "Claims must be intimated within seven days from the date of the incident.",
+    ],
+    'Invoice': [
+        "Payment is due within thirty days of the invoice date unless agreed otherwise.",
+        "Please quote the invoice number on all remittances and correspondence.",
+        "Bank transfer details are printed overleaf. Late payments attract interest.",
+        "All charges are inclusive of applicable taxes unless stated separately.",
+    ],
+    'Policy Document': [
+        "This policy is subject to the terms, conditions and exclusions set out below.",
+        "The insured must pay the premium before the effective date of coverage.",
+        "The deductible applies to each and every loss under this policy.",
+        "Coverage limits are shown in the schedule and may not be exceeded on renewal.",
+    ],
+    'Inspection Report': [
+        "The surveyor carried out a site inspection in the presence of the insured.",
+        "Findings are based on the physical condition observed on the inspection date.",
+        "Photographs of the damage are attached as annexures to this report.",
+        "Recommendations are made without prejudice to the terms of the policy.",
+    ],
+}
+
+def load_font(size: int):
+    """A scalable font so OCR sees realistic glyph sizes at any DPI."""
+    for path in ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 'DejaVuSans.ttf'):
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            pass
+    return ImageFont.load_default(size=size)
+
+def document_fields(doc_type: str, rng: random.Random) -> dict:
+    """Key fields for one document; these are what queries ask for."""
+    issued = date(2024, 1, 1) + timedelta(days=rng.randrange(365))
+    fields = {
+        'policy_number': f"POL-{rng.randrange(10**7):07d}",
+        'date': issued.strftime('%d/%m/%Y'),
+        'amount': f"Rs. {rng.randrange(5000, 900000):,}.00",
+        'insured_name': rng.choice(['Asha Rao', 'Vikram Mehta', 'Lena Fischer', 'Omar Haddad']),
+    }
+    if doc_type == 'Claim Form':
+        fields['claim_number'] = f"CLM-{issued.year}-{rng.randrange(10**5):05d}"
+    elif doc_type == 'Invoice':
+        fields['invoice_number'] = f"INV-{rng.randrange(10**6):06d}"
+        fields['vendor_name'] = rng.choice(['Apex Motors', 'City Hospital', 'BuildRight Contractors'])
+    elif doc_type == 'Inspection Report':
+        fields['surveyor'] = rng.choice(['R. Iyer', 'M. Costa', 'J. Park'])
+    return fields
+
+def page_lines(doc_type: str, fields: dict, page_num: int, pages: int,
+               rng: random.Random) -> list:
+    """Text lines for one page: a field block on page 1, boilerplate and tables after."""
+    lines = [f"{doc_type.upper()}  -  PAGE {page_num} OF {pages}"]
+    if page_num == 1:
+        for name, value in fields.items():
+            lines.append(f"{name.replace('_', ' ').title()}: {value}")
+        lines.append("")
+    boilerplate = BOILERPLATE[doc_type]
+    for _ in range(3):
+        lines.extend(boilerplate)
+        lines.append(
+            f"Item {rng.randrange(1, 99):02d}   Qty {rng.randrange(1, 20)}   "
+            f"Rate {rng.randrange(100, 9999)}.00   Ref {fields['policy_number']}"
+        )
+    return lines
+
+def render_page(lines: list, dpi: int) -> Image.Image:
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    font = load_font(max(8, dpi // 8))
+    margin = dpi // 2
+    line_height = int(dpi * 0.22)
+    y = margin
+    for line in lines:
+        if y > height - margin:
+            break
+        draw.text((margin, y), line, fill='black', font=font)
+        y += line_height
+    return image
+
+def generate_document(doc_type: str, pages: int, dpi: int = 150, seed: int = 0):
+    """Return (page images, ground truth dict) for one synthetic document."""
+    rng = random.Random(f"{doc_type}-{seed}")
+    fields = document_fields(doc_type, rng)
+    page_texts = []
+    images = []
+    for page_num in range(1, pages + 1):
+        lines = page_lines(doc_type, fields, page_num, pages, rng)
+        images.append(render_page(lines, dpi))
+        page_texts.append('\n'.join(lines))
+    truth = {'document_type': doc_type, 'fields': fields, 'pages': pages, 'page_texts': page_texts}
+    return images, truth
+
+def write_corpus(output_dir: str, docs: int, pages: int, dpi: int = 150, seed: int = 0) -> list:
+    """Write docs PDFs (cycling through document types) plus JSON sidecars."""
+    ensure_dir(output_dir)
+    corpus = []
+    for doc_num in range(docs):
+        doc_type = DOCUMENT_TYPES[doc_num % len(DOCUMENT_TYPES)]
+        images, truth = generate_document(doc_type, pages, dpi, seed + doc_num)
+        stem = f"{doc_num:03d}_{doc_type.lower().replace(' ', '_')}"
+        pdf_path = os.path.join(output_dir, f"{stem}.pdf")
+        images[0].save(pdf_path, 'PDF', resolution=dpi, save_all=True, append_images=images[1:])
+        truth['pdf_path'] = pdf_path
+        with open(os.path.join(output_dir, f"{stem}.json"), 'w') as f:
+            json.dump(truth, f, indent=2)
+        corpus.append(truth)
+    return corpus
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic insurance PDFs")
+    parser.add_argument('--output', default='data/synthetic', help='Output directory')
+    parser.add_argument('--docs', type=int, default=8, help='Number of documents')
+    parser.add_argument('--pages', type=int, default=4, help='Pages per document')
+    parser.add_argument('--dpi', type=int, default=150, help='Render resolution')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = write_corpus(args.output, args.docs, args.pages, args.dpi, args.seed)
+    for truth in corpus:
+        print(f"{truth['pdf_path']}  ({truth['document_type']}, {truth['pages']} pages)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import threading
+import pytest
+from modules.batching import MicroBatcher
+
+def run_concurrently(batcher, items):
+    results = {}
+
+    def call(item):
+        try:
+            results[item] = batcher.submit(item)
+        except Exception as e:
+            results[item] = e
+
+    threads = [threading.Thread(target=call, args=(item,)) for item in items]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_items_are_batched_and_answered_in_order():
+    batches = []
+
+    def double(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=50)
+    results = run_concurrently(batcher, range(6))
+    assert results == {item: item * 2 for item in range(6)}
+    assert sum(len(batch) for batch in batches) == 6
+    assert len(batches) < 6
+
+def test_failed_item_raises_only_in_its_caller():
+    def fail_odd(items):
+        return [ValueError(item) if item % 2 else item for item in items]
+
+    batcher = MicroBatcher(fail_odd, max_batch_size=8, max_wait_ms=50)
+    results = run_concurrently(batcher, range(4))
+    assert results[0] == 0 and results[2] == 2
+    assert isinstance(results[1], ValueError) and isinstance(results[3], ValueError)
+
+def test_failed_batch_raises_in_every_caller():
+    def fail(items):
+        raise RuntimeError("backend down")
+
+    batcher = MicroBatcher(fail, max_batch_size=8, max_wait_ms=10)
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
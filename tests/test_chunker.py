@@ -0,0 +1,85 @@
+import re
+from modules.chunker import ChunkStore, TokenChunker, length_sorted_batches
+
+TEXT = ' '.join(
+    f"Claim CLM-2024-{i:04d} under policy POL-{123456 + i} was filed on 12/05/2024."
+    for i in range(40)
+)
+
+class FastTokenizer:
+    """Wordpiece-like stand-in: splits at punctuation and into 3-letter pieces."""
+    is_fast = True
+
+    def __call__(self, text, **kwargs):
+        offsets = []
+        for match in re.finditer(r'\w+|[^\w\s]', text):
+            for start in range(match.start(), match.end(), 3):
+                offsets.append((start, min(start + 3, match.end())))
+        return {'offset_mapping': offsets}
+
+def word_starts(text):
+    return {match.start() for match in re.finditer(r'\S+', text)}
+
+def word_ends(text):
+    return {match.end() for match in re.finditer(r'\S+', text)}
+
+def check_spans(chunker, text):
+    spans = chunker.spans(text)
+    starts, ends = word_starts(text), word_ends(text)
+    for start, end, tokens in spans:
+        assert start in starts, text[start:start + 20]
+        assert end in ends, text[end - 20:end]
+        assert tokens <= chunker.max_tokens - 2
+    # Windows cover the text in order and each moves forward by whole words
+    assert spans[0][0] == 0 and spans[-1][1] == len(text.rstrip())
+    for (start, end, _), (next_start, next_end, _) in zip(spans, spans[1:]):
+        assert start < next_start <= end < next_end
+    return spans
+
+def test_fallback_spans_start_and_end_on_words():
+    check_spans(TokenChunker(max_tokens=34, overlap=8), TEXT)
+
+def test_fast_tokenizer_spans_never_start_mid_word():
+    spans = check_spans(TokenChunker(FastTokenizer(), max_tokens=34, overlap=8), TEXT)
+    # Identifiers split into several tokens stay whole
+    for start, end, _ in spans:
+        assert not TEXT[start:end].startswith(('-', '/'))
+        assert re.match(r'\S+', TEXT[start:])
+
+def test_consecutive_windows_overlap_by_about_the_overlap():
+    chunker = TokenChunker(max_tokens=34, overlap=8)
+    offsets, _ = chunker.tokenize(TEXT)
+    token_at = {start: i for i, (start, _) in enumerate(offsets)}
+    spans = chunker.spans(TEXT)
+    for (start, _, tokens), (next_start, _, _) in zip(spans, spans[1:]):
+        advance = token_at[next_start] - token_at[start]
+        # At least step tokens apart, so windows are never near-duplicates
+        assert advance >= 32 - 8
+        assert advance <= tokens
+
+def test_word_longer_than_budget_is_cut():
+    text = '-'.join(['x'] * 50)
+    spans = TokenChunker(max_tokens=12, overlap=2).spans(text)
+    assert spans[0] == (0, 10, 10)
+    assert spans[-1][1] == len(text)
+
+def test_hyphenated_identifier_is_one_word():
+    _, word_ids = TokenChunker(FastTokenizer()).tokenize("policy POL-123456 ok")
+    # policy (pol, icy), POL - 123 456, ok
+    assert word_ids == [0, 0, 1, 1, 1, 1, 2]
+
+def test_short_text_is_one_chunk():
+    assert TokenChunker().chunk("Short page.") == ["Short page."]
+
+def test_length_sorted_batches_group_similar_lengths():
+    batches = length_sorted_batches([5, 1, 4, 2], 2)
+    assert [list(batch) for batch in batches] == [[1, 3], [2, 0]]
+
+def test_chunk_store_round_trip():
+    store = ChunkStore()
+    store.add_page('doc:1', "hello world")
+    store.add('doc:1', 0, 5)
+    store.add('doc:1', 6, 11)
+    loaded = ChunkStore.from_dict(store.to_dict())
+    assert list(loaded) == ['hello', 'world']
+    assert list(ChunkStore.from_dict(['a', 'b'])) == ['a', 'b']
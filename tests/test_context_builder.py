@@ -0,0 +1,60 @@
+from modules.context_builder import ContextBuilder
+
+PAGE = "The policy covers water damage from burst pipes. Flood damage is excluded. " \
+       "Claims must be filed within thirty days."
+
+def hit(start, end, score, page_id=1, doc_id='doc-1', chunk_id=None):
+    return {
+        'text': PAGE[start:end],
+        'score': score,
+        'metadata': {'doc_id': doc_id, 'page_id': page_id, 'start': start, 'end': end,
+                     'chunk_id': chunk_id if chunk_id is not None else start}
+    }
+
+def test_overlapping_chunks_merge_into_page_text():
+    spans = ContextBuilder().merge([hit(30, 80, 0.4), hit(0, 50, 0.9)])
+    assert len(spans) == 1
+    span = spans[0]
+    assert span['text'] == PAGE[0:80]
+    assert span['score'] == 0.9
+    assert span['metadata']['start'] == 0 and span['metadata']['end'] == 80
+    assert span['metadata']['chunk_ids'] == [0, 30]
+    assert 'chunk_id' not in span['metadata']
+
+def test_adjacent_chunks_within_max_gap_are_joined():
+    spans = ContextBuilder(max_gap=2).merge([hit(0, 48, 0.5), hit(49, 74, 0.6)])
+    assert [span['text'] for span in spans] == [PAGE[0:48] + ' ' + PAGE[49:74]]
+
+def test_distant_chunks_and_other_pages_stay_apart():
+    spans = ContextBuilder(max_gap=2).merge([
+        hit(0, 20, 0.3), hit(75, 115, 0.8), hit(0, 20, 0.5, page_id=2)
+    ])
+    assert [(span['metadata']['page_id'], span['score']) for span in spans] == [
+        (1, 0.8), (2, 0.5), (1, 0.3)
+    ]
+
+def test_contained_chunk_adds_nothing():
+    spans = ContextBuilder().merge([hit(0, 80, 0.5), hit(10, 40, 0.7)])
+    assert spans[0]['text'] == PAGE[0:80]
+    assert spans[0]['score'] == 0.7
+
+def test_chunks_without_offsets_are_kept_as_they_are():
+    legacy = {'text': 'old chunk', 'score': 0.2, 'metadata': {'doc_id': 'doc-1', 'page_id': 1}}
+    spans = ContextBuilder().merge([legacy, hit(0, 20, 0.4)])
+    assert [span['text'] for span in spans] == [PAGE[0:20], 'old chunk']
+
+def test_build_keeps_best_spans_within_budget():
+    builder = ContextBuilder(max_chars=60)
+    spans = builder.build([hit(0, 48, 0.9), hit(75, 115, 0.3), hit(105, 115, 0.2, page_id=3)])
+    # 48 + 40 > 60, so the second span is skipped for the smaller third one
+    assert [span['score'] for span in spans] == [0.9, 0.2]
+    assert sum(len(span['text']) for span in spans) <= 60
+
+def test_build_cuts_an_oversized_best_span():
+    spans = ContextBuilder(max_chars=10).build([hit(0, 48, 0.9)])
+    assert spans[0]['text'] == PAGE[0:10]
+    assert spans[0]['metadata']['end'] == 10
+
+def test_format_adds_page_headers():
+    text = ContextBuilder.format(ContextBuilder().merge([hit(0, 20, 0.5)]))
+    assert text == f"[Page 1, Score: 0.500]\n{PAGE[0:20]}"
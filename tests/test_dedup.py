@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from modules.dedup import DuplicateDetector, LSHIndex, MinHasher, choose_bands, shingle_hashes
+
+POLICY = [
+    "Policy POL-123456 covers the insured dwelling at 12 Oak Street against fire, "
+    "windstorm and hail, subject to the deductible stated in the declarations page.",
+    "Exclusions: flood, earthquake, wear and tear, and intentional loss are not covered "
+    "under this policy unless an endorsement is attached and the premium is paid.",
+    "Claims must be reported within thirty days of the loss with an itemised inventory "
+    "of damaged property, receipts where available and photographs of the damage.",
+    "The insurer may cancel this policy for non-payment of premium with ten days written "
+    "notice mailed to the named insured at the address shown in the declarations.",
+]
+
+def document(doc_id, pages):
+    return SimpleNamespace(
+        doc_id=doc_id, duplicate_of=None,
+        page_metadata=[{'page_id': i + 1, 'text': text} for i, text in enumerate(pages)]
+    )
+
+@pytest.fixture
+def detector(tmp_path):
+    return DuplicateDetector(str(tmp_path / 'dedup.sqlite'), documents='skip', pages='flag')
+
+def test_check_does_not_register(detector):
+    first = document('a', POLICY)
+    assert detector.check(first) is False
+    # Not registered yet, so a copy is not a duplicate of it
+    copy = document('b', POLICY)
+    assert detector.check(copy) is False
+    assert copy.duplicate_of is None
+
+def test_registered_document_is_found(detector):
+    detector.register('a', document('a', POLICY).page_metadata)
+    copy = document('b', POLICY)
+    assert detector.check(copy) is True
+    assert copy.duplicate_of['doc_id'] == 'a'
+    assert copy.duplicate_of['similarity'] == pytest.approx(1.0)
+    assert all(page['duplicate_of']['doc_id'] == 'a' for page in copy.page_metadata)
+
+def test_new_cover_page_counts_by_page_overlap(detector):
+    detector.register('a', document('a', POLICY).page_metadata)
+    forwarded = document('b', ["Fax cover sheet for Jane Doe, attention claims desk, "
+                               "three pages follow regarding the renewal notice"] + POLICY)
+    assert detector.check(forwarded) is True
+    assert forwarded.duplicate_of['doc_id'] == 'a'
+    assert forwarded.duplicate_of['matched_pages'] == len(POLICY)
+    assert forwarded.page_metadata[0]['duplicate_of'] is None
+
+def test_shared_page_is_flagged_but_document_kept(detector):
+    detector.register('a', document('a', POLICY).page_metadata)
+    other = document('b', [POLICY[1], "A different invoice INV-9 for roof repairs at "
+                           "12 Oak Street, labour and materials itemised below."])
+    assert detector.check(other) is False
+    assert other.duplicate_of is None
+    assert other.page_metadata[0]['duplicate_of']['doc_id'] == 'a'
+
+def test_flag_mode_never_skips(tmp_path):
+    detector = DuplicateDetector(str(tmp_path / 'dedup.sqlite'), documents='flag')
+    detector.register('a', document('a', POLICY).page_metadata)
+    copy = document('b', POLICY)
+    assert detector.check(copy) is False
+    assert copy.duplicate_of['doc_id'] == 'a'
+
+def test_document_without_text_is_ignored(detector):
+    empty = document('a', ['', '   '])
+    assert detector.check(empty) is False
+    detector.register('a', empty.page_metadata)
+
+def test_remove_document_forgets_it(tmp_path):
+    index = LSHIndex(str(tmp_path / 'lsh.sqlite'))
+    signature = MinHasher().signature(shingle_hashes(POLICY[0]))
+    index.add([('a', 'document', 'a', None, signature)])
+    assert index.query(signature, 'document')[0]['doc_id'] == 'a'
+    assert index.query(signature, 'document', exclude_doc='a') == []
+    index.remove_document('a')
+    assert index.query(signature, 'document') == []
+
+def test_minhash_estimates_jaccard():
+    hasher = MinHasher(256)
+    first = np.arange(0, 1000, dtype=np.uint64)
+    second = np.arange(500, 1500, dtype=np.uint64)  # Jaccard 1/3
+    estimate = np.mean(hasher.signature(first) == hasher.signature(second))
+    assert estimate == pytest.approx(1 / 3, abs=0.08)
+
+def test_bands_multiply_to_signature_length():
+    bands, rows = choose_bands(128, 0.9)
+    assert bands * rows == 128
+    assert (1 / bands) ** (1 / rows) == pytest.approx(0.9, abs=0.1)
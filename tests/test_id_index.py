@@ -0,0 +1,49 @@
+import pytest
+from modules.id_index import IdentifierIndex, normalize_identifier
+
+@pytest.fixture
+def index(tmp_path):
+    return IdentifierIndex(str(tmp_path / 'identifiers.sqlite'))
+
+def entry(id_type, value, page_id=1):
+    return {'id_type': id_type, 'value': value, 'page_id': page_id}
+
+def test_normalize_ignores_case_and_separators():
+    for value in ('clm-2024-0042', 'CLM 2024 0042', 'CLM/2024/0042', ' Clm.2024_0042 '):
+        assert normalize_identifier(value) == 'CLM20240042'
+    assert normalize_identifier('--') == ''
+
+def test_lookup_finds_every_page(index):
+    index.add_document('doc-1', [entry('policy_number', 'POL-123456', 1),
+                                 entry('policy_number', 'POL 123456', 3)], 'policy.pdf')
+    index.add_document('doc-2', [entry('policy_number', 'pol-123456', 2)], 'claim.pdf')
+    matches = index.lookup('pol/123456')
+    assert [(m['doc_id'], m['page_id']) for m in matches] == [
+        ('doc-1', 1), ('doc-1', 3), ('doc-2', 2)
+    ]
+    assert matches[0]['raw_value'] == 'POL-123456'
+    assert matches[0]['filename'] == 'policy.pdf'
+    assert index.lookup('POL-999999') == []
+    assert index.lookup('') == []
+
+def test_lookup_by_id_type(index):
+    # The same number can be a claim on one form and an invoice on another
+    index.add_document('doc-1', [entry('claim_number', 'A-100'), entry('invoice_number', 'A-100', 2)])
+    assert [m['page_id'] for m in index.lookup('A100', 'invoice_number')] == [2]
+    assert [m['page_id'] for m in index.lookup('A100', 'claim_number')] == [1]
+    assert len(index.lookup('A100')) == 2
+    assert index.lookup('A100', 'policy_number') == []
+
+def test_readding_a_document_replaces_its_rows(index):
+    index.add_document('doc-1', [entry('claim_number', 'CLM-1'), entry('claim_number', 'CLM-2')])
+    index.add_document('doc-2', [entry('claim_number', 'CLM-1')])
+    assert index.add_document('doc-1', [entry('claim_number', 'CLM-3'), entry('claim_number', '--')]) == 1
+    assert index.lookup('CLM-2') == []
+    assert [m['doc_id'] for m in index.lookup('CLM-1')] == ['doc-2']
+    assert [m['doc_id'] for m in index.lookup('CLM-3')] == ['doc-1']
+    assert index.stats() == {'entries': 2, 'identifiers': 2, 'documents': 2}
+
+def test_remove_document(index):
+    index.add_document('doc-1', [entry('policy_number', 'POL-1')])
+    index.remove_document('doc-1')
+    assert index.lookup('POL-1') == []
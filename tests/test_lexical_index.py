@@ -0,0 +1,38 @@
+import pytest
+from modules.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+def test_rrf_first_in_every_list_scores_one():
+    fused = reciprocal_rank_fusion([[3, 1, 2], [3, 2]], k=60)
+    assert fused[0] == (3, pytest.approx(1.0))
+
+def test_rrf_orders_by_summed_reciprocal_rank():
+    fused = dict(reciprocal_rank_fusion([[1, 2, 3], [2, 3, 1]], k=60))
+    # 2 is ranked 2nd and 1st, 1 is ranked 1st and 3rd
+    assert fused[2] > fused[1] > fused[3]
+    best_possible = 2 / 61
+    assert fused[2] == pytest.approx((1 / 62 + 1 / 61) / best_possible)
+
+def test_rrf_ignores_empty_rankings():
+    assert reciprocal_rank_fusion([[], []]) == []
+    assert reciprocal_rank_fusion([[5], []]) == [(5, pytest.approx(1.0))]
+
+def test_rrf_accepts_any_hashable_id():
+    fused = reciprocal_rank_fusion([[('a', 0), ('b', 0)], [('b', 0)]])
+    assert fused[0][0] == ('b', 0)
+
+def test_tokenize_indexes_identifiers_whole_and_in_parts():
+    tokens = tokenize("Claim CLM-2024-0042")
+    assert 'clm-2024-0042' in tokens
+    assert 'clm20240042' in tokens
+    assert '2024' in tokens
+
+def test_bm25_ranks_matching_chunk_first():
+    index = BM25Index()
+    index.add([
+        "the policy covers water damage",
+        "claim number CLM-2024-0042 was filed",
+        "premium is due monthly",
+    ])
+    assert index.search("CLM20240042", 2)[0][0] == 1
+    assert index.search("water damage", 1)[0][0] == 0
+    assert index.search("unrelated", 3) == []
@@ -0,0 +1,57 @@
+import numpy as np
+from PIL import Image
+from modules.layout import WORD_DTYPE
+from modules.ocr_cache import OCRCache, page_hash
+from modules.ocr_preprocessing import ocr_settings
+
+OPTIONS = {'deskew': True, 'denoise': False, 'binarize': True}
+
+def page(value=255):
+    return Image.fromarray(np.full((40, 30), value, dtype=np.uint8))
+
+def words():
+    words = np.zeros(2, dtype=WORD_DTYPE)
+    words['x0'], words['x1'] = [0.1, 0.5], [0.4, 0.9]
+    words['conf'] = [96, -1]
+    words['line'] = [0, 1]
+    words['start'], words['end'] = [0, 7], [6, 16]
+    return words
+
+def test_text_and_words_round_trip(tmp_path):
+    path = str(tmp_path / 'ocr.sqlite')
+    key = page_hash(page(), ocr_settings('eng', '--psm 3', True, OPTIONS))
+    OCRCache(path).put(key, "Policy POL-123456", words())
+
+    # Another process opening the same file sees the entry
+    cache = OCRCache(path)
+    text, cached_words = cache.get(key)
+    assert text == "Policy POL-123456"
+    assert cached_words.dtype == WORD_DTYPE
+    np.testing.assert_array_equal(cached_words, words())
+    assert cache.get('missing') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5,
+                             'entries': 1, 'lifetime_hits': 1}
+
+def test_entry_without_words_reads_back_empty(tmp_path):
+    cache = OCRCache(str(tmp_path / 'ocr.sqlite'))
+    cache.put('key', "text only")
+    text, cached_words = cache.get('key')
+    assert text == "text only"
+    assert len(cached_words) == 0 and cached_words.dtype == WORD_DTYPE
+
+def test_changed_settings_miss_the_cache(tmp_path):
+    cache = OCRCache(str(tmp_path / 'ocr.sqlite'))
+    settings = ocr_settings('eng', '--psm 3', True, OPTIONS)
+    cache.put(page_hash(page(), settings), "read with deskew", words())
+
+    changed = [
+        ocr_settings('deu', '--psm 3', True, OPTIONS),
+        ocr_settings('eng', '--psm 6', True, OPTIONS),
+        ocr_settings('eng', '--psm 3', False, OPTIONS),
+        ocr_settings('eng', '--psm 3', True, dict(OPTIONS, deskew=False)),
+    ]
+    for other in changed:
+        assert cache.get(page_hash(page(), other)) is None
+    # So does a different page under the same settings
+    assert cache.get(page_hash(page(254), settings)) is None
+    assert cache.get(page_hash(page(), settings))[0] == "read with deskew"
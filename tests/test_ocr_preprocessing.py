@@ -0,0 +1,33 @@
+import cv2
+import numpy as np
+import pytest
+from modules.layout import WORD_DTYPE
+from modules.ocr_preprocessing import unrotate_words
+
+def make_words(*boxes):
+    words = np.zeros(len(boxes), dtype=WORD_DTYPE)
+    for word, box in zip(words, boxes):
+        word['x0'], word['y0'], word['x1'], word['y1'] = box
+    return words
+
+def test_small_angles_leave_boxes_unchanged():
+    words = make_words((0.1, 0.1, 0.2, 0.15))
+    assert unrotate_words(words, 0.1, 800, 1000) is words
+
+def test_boxes_map_back_to_the_original_render():
+    width, height, angle = 800, 1000, 5.0
+    # A word at (600, 200) on the render lands here after deskew() rotates the page
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    x, y = matrix @ np.array([600.0, 200.0, 1.0])
+    words = make_words(((x - 10) / width, (y - 5) / height, (x + 10) / width, (y + 5) / height))
+
+    mapped = unrotate_words(words, angle, width, height)[0]
+    assert (mapped['x0'] + mapped['x1']) / 2 * width == pytest.approx(600, abs=0.5)
+    assert (mapped['y0'] + mapped['y1']) / 2 * height == pytest.approx(200, abs=0.5)
+    # The rotated box is enclosed, so it grows slightly rather than shifting
+    assert (mapped['x1'] - mapped['x0']) * width > 20
+
+def test_boxes_are_clipped_to_the_page():
+    words = make_words((0.0, 0.0, 0.05, 0.02))
+    mapped = unrotate_words(words, 10.0, 800, 1000)
+    assert mapped['x0'] >= 0 and mapped['y0'] >= 0
@@ -0,0 +1,58 @@
+import pytest
+from modules.result_log import ResultLog, decode_result, encode_result
+
+@pytest.fixture
+def log(tmp_path):
+    log = ResultLog(str(tmp_path / 'results.sqlite'), batch_size=2, flush_interval=60)
+    yield log
+    log.close()
+
+def test_encode_decode_round_trip():
+    result = {'answer': 'Covered', 'confidence_score': 0.8, 'pages': [1, 2], 'note': None}
+    assert decode_result(encode_result(result)) == result
+
+def test_append_then_get(log):
+    result = {'answer': 'Policy POL-123456 is active', 'confidence_score': 0.92}
+    result_id = log.append('query', result, doc_id='doc-1', query='Is the policy active?')
+    # Below batch_size and long before flush_interval: get() flushes first
+    entry = log.get(result_id)
+    assert entry['result'] == result
+    assert entry['kind'] == 'query'
+    assert entry['doc_id'] == 'doc-1'
+    assert entry['query'] == 'Is the policy active?'
+    assert entry['confidence'] == pytest.approx(0.92)
+    assert log.get('missing') is None
+
+def test_history_filters_newest_first(log):
+    first = log.append('query', {'answer': 'a'}, doc_id='doc-1', query='q1')
+    second = log.append('classification', {'document_type': 'invoice', 'confidence': 0.7},
+                        doc_id='doc-1')
+    third = log.append('query', {'answer': 'b'}, doc_id='doc-2', query='q1')
+
+    assert [e['result_id'] for e in log.history()] == [third, second, first]
+    assert [e['result_id'] for e in log.history(doc_id='doc-1')] == [second, first]
+    assert [e['result_id'] for e in log.history(query='q1')] == [third, first]
+    assert [e['result_id'] for e in log.history(kind='classification')] == [second]
+    assert len(log.history(limit=1)) == 1
+    assert log.history(since='2999-01-01') == []
+    assert log.stats() == {'query': 2, 'classification': 1}
+
+def test_later_changes_to_the_dict_are_not_logged(log):
+    result = {'answer': 'before'}
+    result_id = log.append('query', result)
+    result['answer'] = 'after'
+    assert log.get(result_id)['result'] == {'answer': 'before'}
+
+def test_rows_survive_reopening(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    log = ResultLog(path, flush_interval=60)
+    result_id = log.append('query', {'answer': 'kept'})
+    log.close()
+
+    reopened = ResultLog(path)
+    try:
+        assert reopened.get(result_id)['result'] == {'answer': 'kept'}
+    finally:
+        reopened.close()
+    with pytest.raises(RuntimeError):
+        log.append('query', {})
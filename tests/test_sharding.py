@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from modules.sharding import (
+    AUTHKEY_ENV, ShardCoordinator, ShardServer, check_bind_address, shard_authkey, shard_for
+)
+
+CONFIG = {'retrieval': {'top_k_text': 3, 'top_k_image': 2, 'hybrid': True,
+                        'rrf_k': 60, 'hybrid_candidates': 4}}
+
+def chunk(name):
+    return {'text': name, 'metadata': {'doc_id': name}}
+
+def coordinator(responses, config=CONFIG):
+    shards = ShardCoordinator(['127.0.0.1:1'] * len(responses), b'secret', config)
+    shards._search = lambda op, query, query_embedding, top_k: responses
+    return shards
+
+def candidates(dense, lexical):
+    names = {idx: name for idx, _, name in dense + lexical}
+    return {
+        'dense': [(idx, value) for idx, value, _ in dense],
+        'lexical': [(idx, value) for idx, value, _ in lexical],
+        'chunks': {idx: chunk(name) for idx, name in names.items()}
+    }
+
+def test_text_results_fused_once_over_raw_scores():
+    shards = coordinator([
+        # Shard 0 holds the closest vector, shard 1 the best BM25 match
+        candidates([(0, 0.1, 'a'), (1, 0.9, 'b')], [(1, 2.0, 'b')]),
+        candidates([(0, 0.5, 'c')], [(0, 9.0, 'c'), (1, 4.0, 'd')]),
+    ])
+    results = shards.search_text("water damage", np.zeros(4), top_k=3)
+    names = [result['text'] for result in results]
+    # c is 2nd by distance and 1st by BM25 across shards; b is 3rd in both,
+    # which beats a, found only by distance
+    assert names == ['c', 'b', 'a']
+    assert results[0]['score'] == pytest.approx((1 / 62 + 1 / 61) / (2 / 61))
+    assert results[0]['dense_score'] == pytest.approx(1 / 1.5)
+    assert results[0]['lexical_score'] == pytest.approx(9.0)
+    assert 'lexical_score' not in results[2]
+
+def test_identifier_query_uses_bm25_only():
+    shards = coordinator([
+        candidates([(0, 0.1, 'a')], []),
+        candidates([(0, 0.5, 'c')], [(0, 7.0, 'c')]),
+    ])
+    results = shards.search_text("CLM-2024-0042", np.zeros(4))
+    assert [result['text'] for result in results] == ['c']
+    assert results[0]['score'] == pytest.approx(1.0)
+    assert 'dense_score' not in results[0]
+
+def test_dense_only_when_hybrid_is_off():
+    config = {'retrieval': dict(CONFIG['retrieval'], hybrid=False)}
+    shards = coordinator([
+        candidates([(0, 0.4, 'a')], []),
+        candidates([(0, 0.2, 'b')], []),
+    ], config)
+    results = shards.search_text("water damage", np.zeros(4))
+    assert [result['text'] for result in results] == ['b', 'a']
+    assert results[0]['score'] == pytest.approx(1 / 1.2)
+
+def test_failed_shard_is_left_out():
+    shards = coordinator([None, candidates([(0, 0.2, 'b')], [])])
+    assert [result['text'] for result in shards.search_text("roof", np.zeros(4))] == ['b']
+
+def test_image_hits_merged_by_score():
+    shards = coordinator([
+        [{'image_path': 'a', 'score': 0.5}],
+        [{'image_path': 'b', 'score': 0.9}, {'image_path': 'c', 'score': 0.1}],
+    ])
+    results = shards.search_image("stamp", np.zeros(4))
+    assert [hit['image_path'] for hit in results] == ['b', 'a']
+
+def test_authkey_is_required(monkeypatch):
+    monkeypatch.delenv(AUTHKEY_ENV, raising=False)
+    with pytest.raises(ValueError):
+        shard_authkey({'sharding': {}})
+    with pytest.raises(ValueError):
+        shard_authkey({'sharding': {'authkey': ''}})
+    assert shard_authkey({'sharding': {'authkey': 'abc'}}) == b'abc'
+    monkeypatch.setenv(AUTHKEY_ENV, 'from-env')
+    assert shard_authkey({'sharding': {'authkey': 'abc'}}) == b'from-env'
+
+def test_weak_keys_only_bind_loopback():
+    for host in ('127.0.0.1', 'localhost', '::1'):
+        check_bind_address(host, b'insurance-shards')
+        check_bind_address(host, b'')
+    for host in ('0.0.0.0', '10.0.0.5', 'shard-1.internal'):
+        with pytest.raises(ValueError):
+            check_bind_address(host, b'insurance-shards')
+        with pytest.raises(ValueError):
+            check_bind_address(host, b'')
+        check_bind_address(host, b'a-real-secret')
+
+def test_shard_for_is_stable_and_in_range():
+    assert shard_for('doc-1', 4) == shard_for('doc-1', 4)
+    assert {shard_for(f"doc-{i}", 4) for i in range(100)} == {0, 1, 2, 3}
+
+class FakeRetriever:
+    def __init__(self):
+        self.added = []
+
+    def has_document(self, doc_id):
+        return any(entry['doc_id'] == doc_id for batch in self.added for entry in batch)
+
+    def add_encoded(self, embeddings, metadata):
+        self.added.append(metadata)
+
+def test_shard_add_skips_documents_it_already_has():
+    server = ShardServer.__new__(ShardServer)
+    server.text_retriever, server.image_retriever = FakeRetriever(), FakeRetriever()
+    server.stats = lambda: {}
+    pages = (np.zeros((1, 4)), [{'doc_id': 'doc-1'}])
+    # A writer restarted after saving resends the same document
+    for _ in range(2):
+        server.handle('add', doc_id='doc-1', text=pages, image=pages)
+    server.handle('add', doc_id='doc-2', image=(np.zeros((1, 4)), [{'doc_id': 'doc-2'}]))
+    assert len(server.text_retriever.added) == 1
+    assert len(server.image_retriever.added) == 2
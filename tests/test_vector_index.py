@@ -0,0 +1,77 @@
+import os
+import numpy as np
+import pytest
+from modules.vector_index import INDEX_TYPES, VectorIndex
+
+DIM = 16
+
+def make_vectors(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((count, DIM)).astype('float32')
+
+@pytest.mark.parametrize('index_type', INDEX_TYPES)
+def test_train_add_search(index_type):
+    vectors = make_vectors(300)
+    index = VectorIndex(DIM, index_type, pq_subquantizers=4, min_train_size=256)
+
+    index.add(vectors[:200])
+    # Before training (sq8, pq) the buffered vectors are searched exactly
+    distances, ids = index.search(vectors[:5], 1)
+    assert ids[:, 0].tolist() == [0, 1, 2, 3, 4]
+    assert index.index.is_trained == (index_type in ('flat', 'fp16'))
+
+    index.add(vectors[200:])
+    assert index.index.is_trained
+    assert index.ntotal == 300
+    distances, ids = index.search(vectors[:20], 5)
+    assert ids.shape == (20, 5)
+    # Compressed codes are approximate; most queries still find themselves first
+    assert (ids[:, 0] == np.arange(20)).mean() >= 0.8
+
+@pytest.mark.parametrize('index_type', ('sq8', 'pq'))
+def test_quantizer_waits_for_training_sample(index_type):
+    index = VectorIndex(DIM, index_type, pq_subquantizers=4, min_train_size=256)
+    index.add(make_vectors(1))
+    assert not index.index.is_trained
+    assert index.ntotal == 1
+
+@pytest.mark.parametrize('index_type, rerank, store', [
+    ('flat', True, False),
+    ('fp16', False, False),
+    ('sq8', False, False),
+    ('sq8', True, True),
+    ('pq', True, True),
+])
+def test_store_written_only_when_needed(tmp_path, index_type, rerank, store):
+    index_path = str(tmp_path / 'index.faiss')
+    index = VectorIndex(DIM, index_type, pq_subquantizers=4, rerank=rerank, min_train_size=256)
+    index.add(make_vectors(300))
+    index.save(index_path)
+    assert os.path.exists(tmp_path / 'index_vectors.f32') == store
+
+def test_untrained_index_round_trips_through_store(tmp_path):
+    index_path = str(tmp_path / 'index.faiss')
+    vectors = make_vectors(300)
+    index = VectorIndex(DIM, 'sq8', min_train_size=256)
+    index.add(vectors[:100])
+    index.save(index_path)
+
+    loaded = VectorIndex(DIM, 'sq8', min_train_size=256)
+    loaded.load(index_path)
+    assert loaded.ntotal == 100
+    loaded.add(vectors[100:])
+    assert loaded.index.is_trained
+    assert loaded.index.ntotal == 300
+
+def test_rerank_returns_exact_distances(tmp_path):
+    index_path = str(tmp_path / 'index.faiss')
+    vectors = make_vectors(300)
+    index = VectorIndex(DIM, 'pq', pq_subquantizers=4, rerank=True, min_train_size=256)
+    index.add(vectors)
+    index.save(index_path)
+
+    loaded = VectorIndex(DIM, 'pq', pq_subquantizers=4, rerank=True, min_train_size=256)
+    loaded.load(index_path)
+    distances, ids = loaded.search(vectors[:10], 3)
+    exact = ((vectors[ids[:, 0]] - vectors[:10]) ** 2).sum(axis=1)
+    np.testing.assert_allclose(distances[:, 0], exact, rtol=1e-5)
@@ -0,0 +1,58 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+from modules.layout import WORD_DTYPE
+from modules.ocr_preprocessing import unrotate_words
+from modules.visual_elements import ELEMENT_KINDS, detect_visual_elements
+
+WIDTH, HEIGHT = 850, 1100
+SIGNATURE = (140, 860, 460, 940)
+
+@pytest.fixture(scope='module')
+def page():
+    page = np.full((HEIGHT, WIDTH, 3), 255, np.uint8)
+    for i in range(8):
+        cv2.putText(page, "Policy number POL-123456 issued", (100, 150 + 30 * i),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
+    for y in range(500, 701, 50):
+        cv2.line(page, (100, y), (700, y), (0, 0, 0), 2)
+    for x in range(100, 701, 150):
+        cv2.line(page, (x, 500), (x, 700), (0, 0, 0), 2)
+    xs = np.arange(150, 450)
+    ys = (900 + 25 * np.sin(xs / 12.0)).astype(int)
+    cv2.polylines(page, [np.stack([xs, ys], 1).astype(np.int32)], False, (0, 0, 0), 2)
+    cv2.circle(page, (650, 950), 60, (220, 30, 30), 6)
+    return Image.fromarray(page)
+
+def word(x0, y0, x1, y1):
+    words = np.zeros(1, dtype=WORD_DTYPE)
+    words['x0'], words['y0'] = x0 / WIDTH, y0 / HEIGHT
+    words['x1'], words['y1'] = x1 / WIDTH, y1 / HEIGHT
+    words['conf'] = 95
+    return words
+
+def test_detects_each_kind(page):
+    elements = detect_visual_elements(page)
+    assert set(elements) == set(ELEMENT_KINDS)
+    assert len(elements['tables']) == 1
+    assert len(elements['stamps']) == 1
+    assert len(elements['signatures']) == 1
+    assert elements['logos'] == []
+    # Printed text lines are not taken for handwriting
+    assert elements['signatures'][0][1] > 0.75
+
+def test_ocr_words_suppress_handwriting(page):
+    assert detect_visual_elements(page, word(*SIGNATURE))['signatures'] == []
+
+def test_words_from_a_deskewed_page_line_up_after_unrotating(page):
+    # OCR read the page rotated by deskew(); map its box back to the render
+    angle = 8.0
+    matrix = cv2.getRotationMatrix2D((WIDTH / 2, HEIGHT / 2), angle, 1.0)
+    x0, y0, x1, y1 = SIGNATURE
+    corners = np.array([[x0, y0, 1], [x1, y0, 1], [x0, y1, 1], [x1, y1, 1]], dtype=float)
+    rotated = corners @ matrix.T
+    words = word(*rotated.min(axis=0), *rotated.max(axis=0))
+
+    words = unrotate_words(words, angle, WIDTH, HEIGHT)
+    assert detect_visual_elements(page, words)['signatures'] == []